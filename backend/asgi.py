@@ -0,0 +1,388 @@
+# Punto de entrada ASGI de la API:
+#   uvicorn asgi:app --workers 4
+#
+# Las rutas más frecuentes se sirven con handlers async sobre el cliente
+# asyncio de pymongo, así que una petición que espera a Mongo no ocupa un hilo
+# y la concurrencia de E/S ya no está limitada por el número de hilos:
+#   - lecturas públicas: estado, listado de posts, post por id y por slug,
+#     varios posts a la vez y comentarios de primer nivel de un post;
+#   - sesión: login con Google y comprobación del token (/api/auth/check);
+#   - likes: dar y quitar like y su estado (de un post o de una página).
+#
+# El resto de rutas (crear, editar y borrar posts y comentarios, respuestas
+# de un hilo, búsqueda, posts de un autor, administración, /metrics...) las
+# atiende la aplicación de Flask de server.py a través de a2wsgi, en su pool
+# de hilos. Sus escrituras actualizan además el índice de búsqueda y los
+# contadores, que solo tienen versión síncrona.
+#
+# El enrutado usa el url_map de Flask, así que las rutas y su prioridad son las
+# mismas en ambas, y la validación, la forma de las respuestas, la caché y el
+# contador de vistas son los de server.py (posts.py, likes.py, comments.py).
+# Las rutas con @jwt_required solo se atienden aquí con un token de acceso
+# válido: sin él la petición va a Flask, que responde el mismo error de
+# flask_jwt_extended. Las métricas por petición (en curso, duración, comandos y
+# tiempo de Mongo, Server-Timing) son las mismas que con Flask.
+#
+# Es una alternativa experimental: el despliegue de producción sigue siendo
+# gunicorn (gunicorn.conf.py). a2wsgi añade coste por petición a las rutas de
+# Flask y la comparación de p99 con gunicorn (benchmarks/asgi_benchmark.py,
+# con un mongod) está pendiente de medir.
+import asyncio
+import logging
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+from a2wsgi import WSGIMiddleware
+from bson.objectid import ObjectId
+from flask_jwt_extended import create_access_token, decode_token
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+from cache import comments_tag, post_tag, user_tag
+from comments import top_level_comments_async
+from config import AsyncMongoConnection, LazyDatabase, mongo
+from counters import get_count_async, status_key
+from likes import add_like_async, remove_like_async, parse_status_ids, liked_post_ids_async
+from pagination import fetch_page_async, parse_pagination
+from posts import (
+    SUMMARY_FIELDS, Representation, parse_fields, projection, parse_list_args, list_filter, list_response,
+    post_response, with_view, parse_batch_keys, batch_filter, batch_projection, batch_response
+)
+from http_cache import NO_CACHE, matching_etag
+from mongo_monitor import command_monitor
+from schema import ensure_indexes
+from slugs import slug_filter
+import server
+
+flask_app = server.app
+async_mongo = AsyncMongoConnection(mongo)
+db = LazyDatabase(async_mongo)
+
+# Hilos para las rutas de Flask (como los de un worker gthread)
+FLASK_THREADS = 32
+flask_fallback = WSGIMiddleware(flask_app, workers=FLASK_THREADS)
+
+logger = logging.getLogger(__name__)
+
+class Request:
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        # Como request.args.get de Flask: el primer valor de cada argumento
+        self.args = {}
+        for key, value in parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True):
+            self.args.setdefault(key, value)
+        # Usuario del token (rutas autenticadas) y cuerpo (POST y DELETE)
+        self.user_id = None
+        self.body = b""
+
+    def get_json(self):
+        return flask_app.json.loads(self.body)
+
+##############################################
+############### Handlers async ###############
+##############################################
+
+async def health(request):
+    return server.health()
+
+async def get_posts(request):
+    try:
+        status, page, limit, cursor, with_total = parse_list_args(request.args)
+    except ValueError:
+        return {"error": "Invalid pagination values"}, HTTPStatus.BAD_REQUEST
+    fields = parse_fields(request.args, SUMMARY_FIELDS)
+
+    filter_query = list_filter(status)
+
+    async def load():
+        total = await get_count_async(db, status_key(status), filter_query) if with_total else None
+        posts, next_cursor = await fetch_page_async(db.posts, filter_query, projection(fields), page, limit, cursor)
+        return list_response(status, posts, total, page, limit, next_cursor, fields)
+
+    key = (status, page, limit, cursor, with_total, fields)
+    return await server.response_cache.get_or_load_async("posts", key, load), HTTPStatus.OK
+
+async def get_posts_batch(request):
+    if request.method == "POST":
+        keys = parse_batch_keys((request.get_json() or {}).get("ids"))
+    else:
+        keys = parse_batch_keys(request.args.get("ids", ""))
+    fields = parse_fields(request.args, SUMMARY_FIELDS)
+    posts = await db.posts.find(batch_filter(keys), batch_projection(fields)).to_list()
+    return batch_response(keys, posts, fields), HTTPStatus.OK
+
+async def get_post_by_id(request, id):
+    fields = parse_fields(request.args)
+    post = await db.posts.find_one({"_id": ObjectId(id)}, projection(fields))
+    if post:
+        return with_view(post, post["_id"], server.view_counter, fields), HTTPStatus.OK
+    return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
+
+async def get_post_by_slug(request, slug):
+    fields = parse_fields(request.args)
+
+    async def load():
+        post = await db.posts.find_one(slug_filter(slug), projection(fields))
+        return post_response(post, server.view_counter, fields)
+
+    representation = await server.response_cache.get_or_load_async("post_by_slug", (slug, fields), load)
+    if representation:
+        server.view_counter.record(representation.body["_id"])
+        return representation, HTTPStatus.OK
+    return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
+
+async def get_comments(request, post_id):
+    try:
+        page, limit, cursor = parse_pagination(request.args)
+    except ValueError:
+        return {"error": "Invalid pagination values"}, HTTPStatus.BAD_REQUEST
+
+    async def load():
+        response = await top_level_comments_async(db, post_id, page, limit, cursor)
+        return response, [comments_tag(post_id)] if response else ()
+
+    response = await server.response_cache.get_or_load_async("comments", (post_id, page, limit, cursor), load)
+    if response is None:
+        return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
+    return response, HTTPStatus.OK
+
+# Perfil del usuario (o de la caché de perfiles, como server.get_user_data)
+async def get_user_data(user_id):
+    async def load():
+        user = await db.users.find_one({"userId": user_id})
+        if user:
+            return server.user_profile(user), [user_tag(user_id)]
+        return None, ()
+
+    profile = await server.user_cache.get_or_load_async("users", user_id, load)
+    return dict(profile) if profile else None
+
+async def login(request):
+    try:
+        token = request.get_json().get("token")
+        if not token:
+            return {"error": "Token is required"}, HTTPStatus.BAD_REQUEST
+
+        # Si el token no se verificó antes puede hacer falta descargar los
+        # certificados de Google: la verificación va en un hilo
+        idinfo = await asyncio.to_thread(server.google_tokens.verify, token)
+        user = server.google_user(idinfo)
+        user_id = user["userId"]
+
+        existing_user = await db.users.find_one({"userId": user_id})
+        if not existing_user or any(user.get(k) != existing_user.get(k) for k in user):
+            await db.users.update_one({"userId": user_id}, {"$set": user}, upsert=True)
+        if existing_user and any(user[k] != existing_user.get(k) for k in server.PROFILE_FIELDS):
+            server.user_cache.invalidate(user_tag(user_id))
+
+        with flask_app.app_context():
+            token = create_access_token(identity=user_id)
+        return {"accessToken": token, "user": user}, HTTPStatus.OK
+    except Exception as e:
+        return {"error": str(e)}, HTTPStatus.UNAUTHORIZED
+
+async def check_auth(request):
+    try:
+        user_data = await get_user_data(request.user_id)
+        if user_data:
+            return user_data, HTTPStatus.OK
+        return {"error": "User not found"}, HTTPStatus.UNAUTHORIZED
+    except Exception as e:
+        return {"error": str(e)}, HTTPStatus.UNAUTHORIZED
+
+async def like_post(request, post_id):
+    added = await add_like_async(db, post_id, request.user_id)
+    if added is False:
+        return {"message": "Post already liked"}, HTTPStatus.OK
+    if added is None:
+        return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
+    server.response_cache.invalidate(post_tag(post_id))
+    return {"message": "Post liked successfully"}, HTTPStatus.OK
+
+async def unlike_post(request, post_id):
+    if not await remove_like_async(db, post_id, request.user_id):
+        return {"message": "Post was not liked"}, HTTPStatus.OK
+    server.response_cache.invalidate(post_tag(post_id))
+    return {"message": "Post unliked successfully"}, HTTPStatus.OK
+
+async def check_likes(request):
+    post_ids = parse_status_ids(request.get_json())
+    liked = await liked_post_ids_async(db, request.user_id, post_ids)
+    return {"liked": {post_id: post_id in liked for post_id in post_ids}}, HTTPStatus.OK
+
+async def check_like(request, post_id):
+    like = await db.post_likes.find_one({"postId": post_id, "userId": request.user_id})
+    return {"liked": like is not None}, HTTPStatus.OK
+
+# Endpoints de server.py servidos aquí; el resto va a Flask
+HANDLERS = {
+    "api.health": health,
+    "api.get_posts": get_posts,
+    "api.get_posts_batch": get_posts_batch,
+    "api.get_post_by_id": get_post_by_id,
+    "api.get_post_by_slug": get_post_by_slug,
+    "api.get_comments": get_comments,
+    "api.login": login,
+    "api.check_auth": check_auth,
+    "api.like_post": like_post,
+    "api.unlike_post": unlike_post,
+    "api.check_likes": check_likes,
+    "api.check_like": check_like,
+}
+
+# Los que en server.py llevan @jwt_required()
+AUTHENTICATED = {"api.check_auth", "api.like_post", "api.unlike_post", "api.check_likes", "api.check_like"}
+# Métodos con handlers async (HEAD y OPTIONS, el preflight de CORS, los resuelve Flask)
+METHODS = {"GET", "POST", "DELETE"}
+
+##############################################
+################# Aplicación #################
+##############################################
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    rule, values = match(scope)
+    if rule is None:
+        await flask_fallback(scope, receive, send)
+        return
+
+    started = time.perf_counter()
+    request = Request(scope)
+    if rule.endpoint in AUTHENTICATED:
+        request.user_id = token_identity(request)
+        if request.user_id is None:
+            await flask_fallback(scope, receive, send)
+            return
+    if request.method != "GET":
+        request.body = await read_body(receive)
+
+    # Las mismas métricas que registran los hooks de Flask (metrics.py y
+    # mongo_monitor.py) para cada petición
+    metrics = server.metrics
+    labels = (("method", request.method), ("route", rule.rule))
+    if metrics.enabled:
+        metrics.inc("http_requests_in_flight", labels)
+    command_monitor.begin_request()
+    status, size = HTTPStatus.INTERNAL_SERVER_ERROR, 0
+    try:
+        status, headers, body = await respond(request, rule, values)
+        timing = command_monitor.record_request(labels if metrics.enabled else None)
+        if timing:
+            headers.append((b"server-timing", timing.encode()))
+        await send({"type": "http.response.start", "status": int(status), "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+        size = len(body)
+    finally:
+        command_monitor.end_request()
+        if metrics.enabled:
+            metrics.inc("http_requests_in_flight", labels, -1)
+            observe(metrics, labels, status, size, time.perf_counter() - started)
+
+# Ejecutar el handler y construir la respuesta: (estado, cabeceras, cuerpo)
+async def respond(request, rule, values):
+    try:
+        payload, status = await HANDLERS[rule.endpoint](request, **values)
+    except Exception as e:
+        payload, status = {"error": str(e)}, HTTPStatus.BAD_REQUEST
+
+    # Las respuestas con ETag (posts.Representation) admiten 304 y se comprimen
+    # como en http_cache.py
+    headers = []
+    etag = None
+    if isinstance(payload, Representation):
+        etag = payload.etag
+        matched = matching_etag(request.headers.get("if-none-match"), etag)
+        if matched:
+            etag, status = matched, HTTPStatus.NOT_MODIFIED
+        payload = payload.body
+        headers.append((b"cache-control", NO_CACHE.encode()))
+
+    if status == HTTPStatus.NOT_MODIFIED:
+        body = b""
+    else:
+        # Misma serialización que jsonify (proveedor JSON de la aplicación, salida compacta)
+        body = flask_app.json.dumps(payload, separators=(",", ":")).encode() + b"\n"
+        headers += [(b"content-type", b"application/json"), (b"vary", b"Accept-Encoding")]
+        body, encoding = server.compressor.encode(body, request.headers.get("accept-encoding", ""), etag)
+        if encoding:
+            headers.append((b"content-encoding", encoding.encode()))
+            if etag:
+                etag = f"{etag}-{encoding}"
+        headers.append((b"content-length", str(len(body)).encode()))
+    if etag:
+        headers.append((b"etag", f'"{etag}"'.encode()))
+
+    # Las mismas cabeceras CORS que flask_cors con la configuración de server.py
+    origin = request.headers.get("origin")
+    if origin:
+        headers += [(b"access-control-allow-origin", origin.encode("latin-1")), (b"vary", b"Origin")]
+    else:
+        headers.append((b"access-control-allow-origin", b"*"))
+    return status, headers, body
+
+# Regla de Flask de la petición si tiene handler async, o (None, None).
+# Los errores de enrutado (404, 405...) los resuelve Flask.
+def match(scope):
+    if scope["method"] not in METHODS:
+        return None, None
+    try:
+        rule, values = flask_app.url_map.bind("").match(scope["path"], scope["method"], return_rule=True)
+    except (HTTPException, RequestRedirect):
+        return None, None
+    return (rule, values) if rule.endpoint in HANDLERS else (None, None)
+
+# Usuario del token de acceso de la cabecera Authorization (como
+# get_jwt_identity), o None si falta, no es válido, caducó o no es de acceso
+def token_identity(request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme != "Bearer" or not token:
+        return None
+    try:
+        with flask_app.app_context():
+            claims = decode_token(token)
+    except Exception:
+        return None
+    if claims.get("type") != "access":
+        return None
+    return claims.get(flask_app.config["JWT_IDENTITY_CLAIM"])
+
+async def read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return bytes(body)
+
+# Métricas de una petición servida aquí (un error sin respuesta cuenta como 500)
+def observe(metrics, labels, status, size, seconds):
+    status_label = (("status", str(int(status))),)
+    metrics.inc("http_requests_total", labels + status_label)
+    if status >= 400:
+        metrics.inc("http_request_errors_total", labels + status_label)
+    metrics.observe("http_response_size_bytes", labels, size)
+    metrics.observe("http_request_duration_seconds", labels, seconds)
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Lo mismo que `python server.py`: índices y refresco de certificados de Google
+            try:
+                await asyncio.to_thread(ensure_indexes, server.db)
+            except Exception as e:
+                logger.error("Could not ensure Mongo indexes (run `flask --app server schema-ensure`): %s", e)
+            server.google_certs.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            # Volcar las vistas pendientes y cerrar los clientes
+            await asyncio.to_thread(server.view_counter.stop)
+            await async_mongo.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
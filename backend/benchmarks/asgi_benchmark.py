@@ -0,0 +1,45 @@
+# Comparación de la API de Flask con gunicorn (gthread) y de asgi.py con
+# uvicorn a alta concurrencia.
+#
+# Uso (requiere un mongod local, la base de datos indicada se borra):
+#   python benchmarks/asgi_benchmark.py --workers 2 --clients 256
+#
+# Ambos servidores usan el mismo número de workers y la misma carga que
+# gunicorn_benchmark.py (listado de posts y posts por slug, sin caché de
+# respuestas salvo con --cache). Con gthread la concurrencia por worker está
+# limitada por --threads; con asyncio, por el pool de conexiones de Mongo.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pymongo
+from gunicorn_benchmark import parser, run_profile, run_server, seed, server_env
+
+def run_asgi(args):
+    env = {**server_env(args), "MONGO_MAX_POOL_SIZE": str(args.pool_size)}
+    command = [
+        sys.executable, "-m", "uvicorn", "asgi:app",
+        "--host", "127.0.0.1", "--port", str(args.port),
+        "--workers", str(args.workers), "--no-access-log"
+    ]
+    return run_server(command, env, args)
+
+def main():
+    arguments = parser("Flask/gunicorn vs ASGI/uvicorn load test")
+    arguments.set_defaults(clients=256)
+    arguments.add_argument("--pool-size", type=int, default=100, help="maxPoolSize de cada worker ASGI")
+    args = arguments.parse_args()
+
+    seed(pymongo.MongoClient(args.uri)[args.db], args.posts)
+
+    print(f"{'server':>16} {'requests/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, run in (("flask gthread", lambda: run_profile("gthread", args)), ("asgi uvicorn", lambda: run_asgi(args))):
+        result = run()
+        print(
+            f"{name:>16} {result['requests/s']:>11.0f} {result['p50 ms']:>8.1f} "
+            f"{result['p99 ms']:>8.1f} {result['errors']:>7}"
+        )
+
+if __name__ == "__main__":
+    main()
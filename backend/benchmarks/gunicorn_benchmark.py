@@ -0,0 +1,171 @@
+# Prueba de carga de los perfiles de gunicorn.conf.py (sync, gthread, gevent).
+#
+# Uso (requiere un mongod local, la base de datos indicada se borra):
+#   python benchmarks/gunicorn_benchmark.py --profiles sync,gthread --workers 2 --clients 32
+#
+# Para cada perfil arranca gunicorn con gunicorn.conf.py contra la base de
+# datos de prueba y lanza --clients clientes con conexiones keep-alive que
+# alternan la lista de posts y posts individuales durante --duration
+# segundos. La caché de respuestas se desactiva (salvo con --cache) para que
+# cada petición llegue a Mongo.
+import argparse
+import datetime
+import http.client
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import pymongo
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND)
+
+from schema import ensure_indexes
+
+def seed(database, posts):
+    database.posts.drop()
+    created_at = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+    database.posts.insert_many([{
+        "title": f"Post {number}",
+        "content": "Lorem ipsum dolor sit amet. " * 40,
+        "slug": f"post-{number}",
+        "status": "published",
+        "authorId": f"author-{number % 20}",
+        "createdAt": (created_at + datetime.timedelta(minutes=number)).isoformat(),
+        "views": 0
+    } for number in range(posts)])
+    ensure_indexes(database, "posts")
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/api/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"The server did not start on port {port}")
+
+# Un cliente: conexión keep-alive, reconecta si el servidor la cierra (sync)
+def client_loop(port, paths, stop, latencies, errors):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    while not stop.is_set():
+        path = random.choice(paths)
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+            if response.getheader("Connection", "").lower() == "close":
+                connection.close()
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+
+# Entorno común de los servidores: base de datos de prueba, sin métricas ni perfilador
+def server_env(args):
+    env = {
+        **os.environ,
+        "MONGO_URI": args.uri,
+        "MONGO_DB_NAME": args.db,
+        "METRICS_ENABLED": "0",
+        "PROFILER_ENABLED": "0",
+    }
+    if not args.cache:
+        env["RESPONSE_CACHE_TTL"] = "0"
+    return env
+
+# Arrancar el servidor, lanzar la carga y pararlo
+def run_server(command, env, args):
+    server = subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(args.port)
+        return load_test(args)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+def load_test(args):
+    paths = [f"/api/posts?limit={args.limit}"] + [f"/api/posts/slug/post-{number}" for number in range(min(args.posts, 200))]
+    stop = threading.Event()
+    latencies, errors = [], []
+    clients = [
+        threading.Thread(target=client_loop, args=(args.port, paths, stop, latencies, errors))
+        for _ in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    time.sleep(args.duration)
+    stop.set()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests/s": len(latencies) / elapsed,
+        "p50 ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99 ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+        "errors": len(errors)
+    }
+
+def run_profile(profile, args):
+    env = {
+        **server_env(args),
+        "GUNICORN_PROFILE": profile,
+        "GUNICORN_BIND": f"127.0.0.1:{args.port}",
+        "GUNICORN_WORKERS": str(args.workers),
+        "GUNICORN_THREADS": str(args.threads),
+        "GUNICORN_ACCESS_LOG": "",
+    }
+    return run_server([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], env, args)
+
+def parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8, help="hilos por worker (gthread)")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--cache", action="store_true", help="mantener la caché de respuestas")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="talkify_bench")
+    return parser
+
+def main():
+    arguments = parser("gunicorn profile load test")
+    arguments.add_argument("--profiles", default="sync,gthread,gevent")
+    args = arguments.parse_args()
+
+    seed(pymongo.MongoClient(args.uri)[args.db], args.posts)
+
+    print(f"{'profile':>8} {'requests/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for profile in args.profiles.split(","):
+        if profile == "gevent":
+            try:
+                import gevent  # noqa: F401
+            except ImportError:
+                print(f"{profile:>8}  skipped (pip install gevent)")
+                continue
+        result = run_profile(profile, args)
+        print(
+            f"{profile:>8} {result['requests/s']:>11.0f} {result['p50 ms']:>8.1f} "
+            f"{result['p99 ms']:>8.1f} {result['errors']:>7}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Benchmark de serialización de una página de 50 posts.
+#
+# Uso:
+#   python benchmarks/json_benchmark.py --number 500
+#
+# Compara la respuesta de antes (convertir cada _id a texto con fix_ids y
+# serializar con el proveedor JSON por defecto de Flask) con la actual
+# (OrjsonProvider, que serializa ObjectId y datetime sin recorrer los posts).
+import argparse
+import datetime
+import os
+import sys
+import timeit
+from bson.objectid import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from json_provider import OrjsonProvider
+from pagination import page_info
+
+def make_page(size):
+    created_at = datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+    posts = [{
+        "_id": ObjectId(),
+        "title": f"Post número {number}",
+        "slug": f"post-numero-{number}",
+        "author": {"userId": f"user-{number % 7}", "name": "Autora de prueba", "profilePicture": "https://example.com/pic.jpg"},
+        "createdAt": (created_at + datetime.timedelta(hours=number)).isoformat(),
+        "updatedAt": (created_at + datetime.timedelta(hours=number)).isoformat(),
+        "status": "published",
+        "readTime": 3,
+        "views": number * 11,
+        "likes": number,
+        "commentCount": number % 5,
+        "coverImage": None
+    } for number in range(size)]
+    return posts
+
+# Antes: fix_ids convertía cada _id de los documentos recién leídos
+def fix_ids(objects):
+    for obj in objects:
+        obj["_id"] = str(obj["_id"])
+    return objects
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON serialization benchmark")
+    parser.add_argument("--size", type=int, default=50)
+    parser.add_argument("--number", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    posts = make_page(args.size)
+    pagination = page_info(1000, 1, args.size, None)
+
+    before_app = Flask("before")
+    before_app.json = DefaultJSONProvider(before_app)
+    after_app = Flask("after")
+    after_app.json = OrjsonProvider(after_app)
+
+    # fix_ids modifica los documentos: una copia nueva para cada llamada, fuera del tiempo medido
+    copies = iter([[dict(post) for post in posts] for _ in range(args.number * args.repeat + 1)])
+
+    def before():
+        with before_app.app_context():
+            return before_app.json.response({"posts": fix_ids(next(copies)), "pagination": pagination}).data
+
+    def after():
+        with after_app.app_context():
+            return after_app.json.response({"posts": posts, "pagination": pagination}).data
+
+    print(f"{'':>22} {'µs/page':>10} {'bytes':>8}")
+    for name, serialize in (("fix_ids + json", before), ("orjson provider", after)):
+        seconds = min(timeit.repeat(serialize, number=args.number, repeat=args.repeat)) / args.number
+        print(f"{name:>22} {seconds * 1_000_000:>10.1f} {len(serialize()):>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Benchmark de latencia de búsqueda a medida que crece la colección de posts.
+#
+# Uso (requiere un mongod local, la base de datos indicada se borra):
+#   python benchmarks/search_benchmark.py --sizes 1000,10000,100000,1000000
+#
+# El corpus se rellena con palabras de relleno y siempre contiene el mismo
+# número de posts con el término buscado, así que una búsqueda sobre el índice
+# invertido debería mantener una latencia plana mientras que $regex crece con N.
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+import pymongo
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from search import bulk_index, ensure_search_indexes, search_page
+
+VOCABULARY = [f"palabra{i}" for i in range(20000)]
+NEEDLE = "zepelín"
+NEEDLE_POSTS = 50
+WORDS_PER_POST = 12
+INSERT_BATCH = 5000
+
+def make_post(number, with_needle=False):
+    words = random.choices(VOCABULARY, k=WORDS_PER_POST)
+    if with_needle:
+        words[random.randrange(WORDS_PER_POST)] = NEEDLE
+    created_at = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC) + datetime.timedelta(seconds=number)
+    return {
+        "title": f"Post {number}",
+        "content": " ".join(words),
+        "slug": f"post-{number}",
+        "status": "published",
+        "createdAt": created_at.isoformat()
+    }
+
+# Insertar posts (y sus postings) hasta llegar a `target`
+def grow_corpus(db, start, target, needle_positions):
+    for batch_start in range(start, target, INSERT_BATCH):
+        batch_end = min(batch_start + INSERT_BATCH, target)
+        posts = [make_post(n, n in needle_positions) for n in range(batch_start, batch_end)]
+        db.posts.insert_many(posts)
+        bulk_index(db, posts)
+
+def measure(fn, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+def regex_search(db, query):
+    return list(db.posts.find({
+        "$or": [
+            {"title": {"$regex": query, "$options": "i"}},
+            {"content": {"$regex": query, "$options": "i"}}
+        ],
+        "status": "published"
+    }).sort("createdAt", -1))
+
+def main():
+    parser = argparse.ArgumentParser(description="Search latency benchmark")
+    parser.add_argument("--uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="talkify_bench")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--regex", action="store_true", help="medir también la búsqueda antigua con $regex")
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    client = pymongo.MongoClient(args.uri)
+    client.drop_database(args.database)
+    db = client[args.database]
+    ensure_search_indexes(db)
+
+    # Los posts con el término buscado caen dentro del corpus más pequeño
+    needle_positions = set(random.sample(range(sizes[0]), NEEDLE_POSTS))
+
+    print(f"{'posts':>10} {'index p50':>10} {'index p95':>10} {'regex p50':>10} {'regex p95':>10}")
+    size = 0
+    for target in sizes:
+        grow_corpus(db, size, target, needle_positions)
+        size = target
+
+        assert search_page(db, NEEDLE, 1, 10)[1] == NEEDLE_POSTS
+        index_p50, index_p95 = measure(lambda: search_page(db, NEEDLE, 1, 10), args.runs)
+        row = f"{size:>10} {index_p50:>8.2f}ms {index_p95:>8.2f}ms"
+        if args.regex:
+            regex_p50, regex_p95 = measure(lambda: regex_search(db, "zepel"), max(1, args.runs // 20))
+            row += f" {regex_p50:>8.2f}ms {regex_p95:>8.2f}ms"
+        print(row)
+
+    client.drop_database(args.database)
+
+if __name__ == "__main__":
+    main()
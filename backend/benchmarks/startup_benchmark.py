@@ -0,0 +1,82 @@
+# Benchmark del arranque: tiempo de importar server y de la primera petición.
+#
+# Uso:
+#   python benchmarks/startup_benchmark.py --runs 20
+#   python benchmarks/startup_benchmark.py --mongo   # primera petición con Mongo (mongod local)
+#   python benchmarks/startup_benchmark.py --imports # módulos que más tardan en importarse
+#
+# Cada ejecución es un proceso nuevo (como un worker de gunicorn recién
+# arrancado), así que incluye todo el coste de importación. La primera
+# petición a /api/posts incluye crear el cliente de Mongo y conectar.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+import server
+imported = time.perf_counter()
+client = server.app.test_client()
+client.get("/api/health")
+first_request = time.perf_counter()
+result = {"import": imported - started, "first_request": first_request - imported}
+if MONGO:
+    client.get("/api/posts")
+    result["first_mongo_request"] = time.perf_counter() - first_request
+print(json.dumps(result))
+"""
+
+def run_child(mongo, env):
+    output = subprocess.run(
+        [sys.executable, "-c", f"MONGO = {mongo}\n{CHILD}"],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def import_profile(env, top):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Solo los módulos importados directamente desde server o sus paquetes de primer nivel
+        if len(name) - len(name.lstrip()) <= 3:
+            modules.append((int(cumulative) / 1000, name.strip()))
+    for milliseconds, name in sorted(modules, reverse=True)[:top]:
+        print(f"{milliseconds:>9.1f}ms  {name}")
+
+def summary(values):
+    values = sorted(value * 1000 for value in values)
+    return statistics.median(values), values[max(0, int(len(values) * 0.95) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--mongo", action="store_true", help="medir también la primera petición a Mongo")
+    parser.add_argument("--uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--imports", type=int, nargs="?", const=15, help="mostrar los N imports más lentos")
+    args = parser.parse_args()
+
+    env = {**os.environ, "MONGO_URI": args.uri, "MONGO_DB_NAME": "talkify_bench"}
+    if args.imports:
+        import_profile(env, args.imports)
+        return
+
+    results = [run_child(args.mongo, env) for _ in range(args.runs)]
+    print(f"{'phase':>20} {'p50':>10} {'p95':>10}")
+    for phase in results[0]:
+        p50, p95 = summary([result[phase] for result in results])
+        print(f"{phase:>20} {p50:>8.1f}ms {p95:>8.1f}ms")
+
+if __name__ == "__main__":
+    main()
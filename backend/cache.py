@@ -0,0 +1,175 @@
+# Caché de respuestas en memoria para los endpoints de lectura.
+#
+# Cada endpoint tiene su propia caché LRU con TTL (cachetools.TTLCache) de
+# tamaño acotado, con claves formadas por los argumentos ya normalizados
+# (página, límite, cursor, estado...). Cada entrada se guarda con etiquetas
+# de los datos de los que depende:
+#   posts:status:<estado>             la lista global de ese estado
+#   posts:author:<usuario>:<estado>   la lista de un autor
+#   post:<id>                         cada post incluido en la respuesta
+#   comments:<post_id>                los comentarios de un post
+#   views:<post_id>                   el contador de vistas ya volcado
+# y los endpoints de escritura invalidan exactamente esas etiquetas.
+#
+# La invalidación es local al proceso: con varios workers, el TTL acota
+# cuánto tiempo puede ver otro worker una respuesta antigua.
+#
+# La misma clase guarda los perfiles de usuario (etiqueta user:<id>) que leen
+# check_auth, save_post y create_comment, con más entradas y un TTL mayor.
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from cachetools import TTLCache
+
+CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 256))  # entradas por endpoint
+CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 30))  # segundos
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 300))
+
+def list_tag(status):
+    return f"posts:status:{status}"
+
+def author_tag(user_id, status):
+    return f"posts:author:{user_id}:{status}"
+
+def post_tag(post_id):
+    return f"post:{post_id}"
+
+def comments_tag(post_id):
+    return f"comments:{post_id}"
+
+def views_tag(post_id):
+    return f"views:{post_id}"
+
+def user_tag(user_id):
+    return f"user:{user_id}"
+
+# Etiquetas de las listas en las que aparece (o aparecía) un post
+def post_list_tags(post, status=None):
+    status = status or post.get("status")
+    return [list_tag(status), author_tag(post["author"]["userId"], status)]
+
+# TTLCache que avisa de las entradas que expulsa (por LRU o por TTL)
+class EndpointCache(TTLCache):
+    def __init__(self, maxsize, ttl, on_evict, timer=time.monotonic):
+        super().__init__(maxsize, ttl, timer)
+        self._on_evict = on_evict
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_evict(key, value)
+        return key, value
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, value in expired:
+            self._on_evict(key, value)
+        return expired
+
+class ResponseCache:
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL, timer=time.monotonic):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._caches = {}
+        self._tags = defaultdict(set)  # etiqueta -> {(endpoint, clave)}
+        # Cambia en cada invalidación: una respuesta leída antes de una
+        # invalidación no se guarda, aunque termine después
+        self._generation = 0
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = Counter()
+
+    # Devolver la respuesta guardada o calcularla con load(), que devuelve
+    # (respuesta, etiquetas). Las respuestas None (no encontrado) no se guardan.
+    def get_or_load(self, endpoint, key, load):
+        found, value = self._lookup(endpoint, key)
+        if found:
+            return value
+        payload, tags = load()
+        return self._store(endpoint, key, value, payload, tags)
+
+    # Lo mismo con un load() asíncrono (asgi.py)
+    async def get_or_load_async(self, endpoint, key, load):
+        found, value = self._lookup(endpoint, key)
+        if found:
+            return value
+        payload, tags = await load()
+        return self._store(endpoint, key, value, payload, tags)
+
+    # (True, respuesta) si está guardada; si no, (False, generación actual)
+    def _lookup(self, endpoint, key):
+        with self._lock:
+            entry = self._cache(endpoint).get(key)
+            if entry is not None:
+                self.hits[endpoint] += 1
+                return True, entry[0]
+            self.misses[endpoint] += 1
+            return False, self._generation
+
+    def _store(self, endpoint, key, generation, payload, tags):
+        if payload is None:
+            return None
+        with self._lock:
+            if generation == self._generation:
+                tags = frozenset(tags)
+                self._cache(endpoint)[key] = (payload, tags)
+                for tag in tags:
+                    self._tags[tag].add((endpoint, key))
+        return payload
+
+    # Eliminar todas las entradas que dependen de alguna de las etiquetas
+    def invalidate(self, *tags):
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for endpoint, key in self._tags.pop(tag, ()):
+                    entry = self._caches[endpoint].pop(key, None)
+                    if entry is not None:
+                        self._untag(endpoint, key, entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._caches.clear()
+            self._tags.clear()
+            self.hits.clear()
+            self.misses.clear()
+            self.evictions.clear()
+
+    def stats(self):
+        with self._lock:
+            for cache in self._caches.values():
+                cache.expire()
+            return {
+                endpoint: {
+                    "entries": len(cache),
+                    "hits": self.hits[endpoint],
+                    "misses": self.misses[endpoint],
+                    "evictions": self.evictions[endpoint]
+                }
+                for endpoint, cache in self._caches.items()
+            }
+
+    def _cache(self, endpoint):
+        if endpoint not in self._caches:
+            self._caches[endpoint] = EndpointCache(
+                self._maxsize, self._ttl,
+                lambda key, entry: self._evicted(endpoint, key, entry),
+                self._timer
+            )
+        return self._caches[endpoint]
+
+    def _evicted(self, endpoint, key, entry):
+        self.evictions[endpoint] += 1
+        self._untag(endpoint, key, entry[1])
+
+    def _untag(self, endpoint, key, tags):
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard((endpoint, key))
+                if not keys:
+                    del self._tags[tag]
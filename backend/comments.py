@@ -0,0 +1,142 @@
+# Comentarios de los posts.
+#
+# Los comentarios viven en su propia colección (indexada por postId y fecha)
+# en lugar de en el array posts.comments, que crecía sin límite hacia los 16MB
+# por documento y obligaba a leer el post entero para ver sus comentarios.
+# El post solo guarda el total en commentCount.
+#
+# Las respuestas forman hilos con una ruta materializada: cada comentario
+# guarda en `path` los _id de sus ancestros y el suyo, separados por "/"
+# ("<raíz>/<respuesta>/<respuesta>"). Como los ObjectId tienen longitud fija y
+# crecen con el tiempo, ordenar por path da el orden de lectura del hilo
+# (cada comentario seguido de sus respuestas, en orden cronológico) y un
+# subárbol entero es un único rango del índice (postId, path).
+import base64
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from pagination import fetch_page, fetch_page_async
+from schema import ensure_indexes
+
+MIGRATION_BATCH_SIZE = 100
+PATH_SEPARATOR = "/"
+# Carácter siguiente a "/" en ASCII: [path + "/", path + "0") son los descendientes
+PATH_END = "0"
+
+def ensure_comment_indexes(db):
+    ensure_indexes(db, "comments")
+
+# Ruta, profundidad y padre de un comentario nuevo (parent None = primer nivel)
+def thread_fields(comment_id, parent=None):
+    if parent is None:
+        return {"path": str(comment_id), "depth": 0, "parentId": None}
+    return {
+        "path": f"{parent['path']}{PATH_SEPARATOR}{comment_id}",
+        "depth": parent["depth"] + 1,
+        "parentId": parent["_id"]
+    }
+
+# Filtro de los descendientes de un comentario (sin incluirlo)
+def descendants_filter(post_id, path):
+    return {"postId": post_id, "path": {"$gt": path + PATH_SEPARATOR, "$lt": path + PATH_END}}
+
+def encode_path_cursor(path):
+    return base64.urlsafe_b64encode(path.encode()).decode().rstrip("=")
+
+def decode_path_cursor(cursor):
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+# Página de respuestas de un comentario en orden de lectura del hilo, con una
+# sola consulta por rango. Devuelve (respuestas, next_cursor).
+def fetch_replies(collection, post_id, path, limit, cursor=None):
+    query = descendants_filter(post_id, path)
+    if cursor:
+        query["path"]["$gt"] = max(query["path"]["$gt"], decode_path_cursor(cursor))
+
+    replies = list(collection.find(query, {"postId": 0}).sort("path", ASCENDING).limit(limit + 1))
+    has_more = len(replies) > limit
+    replies = replies[:limit]
+    return replies, encode_path_cursor(replies[-1]["path"]) if has_more else None
+
+# Página de comentarios de primer nivel en orden cronológico, sin leer el
+# documento del post (las respuestas se piden aparte, ver replyCount).
+# Solo si no hay comentarios se comprueba que el post exista: None si no existe.
+def top_level_comments(db, post_id, page, limit, cursor=None):
+    comments, next_cursor = fetch_page(
+        db.comments, {"postId": ObjectId(post_id), "depth": 0}, {"postId": 0}, page, limit, cursor, ascending=True
+    )
+    if not comments and not cursor and not db.posts.find_one({"_id": ObjectId(post_id)}, {"_id": 1}):
+        return None
+    return {"comments": comments, "nextCursor": next_cursor}
+
+async def top_level_comments_async(db, post_id, page, limit, cursor=None):
+    comments, next_cursor = await fetch_page_async(
+        db.comments, {"postId": ObjectId(post_id), "depth": 0}, {"postId": 0}, page, limit, cursor, ascending=True
+    )
+    if not comments and not cursor and not await db.posts.find_one({"_id": ObjectId(post_id)}, {"_id": 1}):
+        return None
+    return {"comments": comments, "nextCursor": next_cursor}
+
+# Los comentarios antiguos tenían un _id de texto; los nuevos son ObjectId
+def comment_object_id(comment_id):
+    return ObjectId(comment_id) if ObjectId.is_valid(comment_id) else comment_id
+
+# Convertir un comentario embebido del post al documento de la colección
+def comment_document(post_id, comment):
+    comment_id = comment_object_id(comment["_id"])
+    return {
+        **comment,
+        **thread_fields(comment_id),
+        "_id": comment_id,
+        "postId": post_id
+    }
+
+# Mover los comentarios embebidos a la colección comments en lotes de posts.
+# Es idempotente: un comentario ya migrado no se duplica y el array solo se
+# elimina del post cuando sus comentarios están guardados.
+def migrate_embedded_comments(db, batch_size=MIGRATION_BATCH_SIZE):
+    ensure_comment_indexes(db)
+    cursor = db.posts.find(
+        {"comments.0": {"$exists": True}},
+        {"comments": 1}
+    ).batch_size(batch_size)
+
+    migrated = 0
+    batch = []
+    for post in cursor:
+        batch.append(post)
+        if len(batch) == batch_size:
+            migrated += migrate_batch(db, batch)
+            batch = []
+    if batch:
+        migrated += migrate_batch(db, batch)
+
+    # Los posts sin comentarios también necesitan el contador
+    db.posts.update_many(
+        {"commentCount": {"$exists": False}},
+        {"$set": {"commentCount": 0}, "$unset": {"comments": ""}}
+    )
+    # Comentarios migrados antes de existir los hilos: pasan a primer nivel
+    db.comments.update_many(
+        {"path": {"$exists": False}},
+        [{"$set": {"path": {"$toString": "$_id"}, "depth": 0, "parentId": None}}]
+    )
+    return migrated
+
+def migrate_batch(db, posts):
+    comments = [
+        UpdateOne({"_id": document["_id"]}, {"$setOnInsert": document}, upsert=True)
+        for post in posts
+        for document in (comment_document(post["_id"], c) for c in post["comments"])
+    ]
+    db.comments.bulk_write(comments, ordered=False)
+    db.posts.bulk_write([
+        UpdateOne(
+            {"_id": post["_id"]},
+            {"$unset": {"comments": ""}, "$inc": {"commentCount": len(post["comments"])}}
+        )
+        for post in posts
+    ], ordered=False)
+    return len(comments)
@@ -0,0 +1,80 @@
+# Metadatos del contenido de un post calculados al guardarlo.
+#
+# Al crear o editar un post se guardan junto al contenido su número de
+# palabras, el tiempo de lectura, un extracto en texto plano (sin markdown)
+# y un hash del contenido. Así los listados muestran la vista previa con
+# `excerpt` sin leer nunca `content`, y el hash permite saber si el
+# contenido cambió sin compararlo entero.
+#
+# Los posts guardados antes de esto se completan por lotes con
+# flask --app server content-backfill
+import hashlib
+import re
+from pymongo import ASCENDING, UpdateOne
+
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 200  # caracteres
+BACKFILL_BATCH_SIZE = 500
+
+# Markdown que no forma parte del texto
+CODE_BLOCK_RE = re.compile(r"```.*?(```|$)", re.DOTALL)
+IMAGE_RE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+LINE_MARKER_RE = re.compile(r"^\s*(#{1,6}\s+|>\s?|[-*+]\s+|\d+[.)]\s+)", re.MULTILINE)
+EMPHASIS_RE = re.compile(r"[*_~`]+")
+SPACES_RE = re.compile(r"\s+")
+
+# Texto plano de un contenido en markdown
+def plain_text(content):
+    text = CODE_BLOCK_RE.sub(" ", content or "")
+    text = IMAGE_RE.sub(r"\1", text)
+    text = LINK_RE.sub(r"\1", text)
+    text = HTML_TAG_RE.sub(" ", text)
+    text = LINE_MARKER_RE.sub("", text)
+    text = EMPHASIS_RE.sub("", text)
+    return SPACES_RE.sub(" ", text).strip()
+
+# Primeros `length` caracteres del texto, cortando en una palabra completa
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    if len(text) <= length:
+        return text
+    cut = text[:length + 1]
+    cut = cut.rsplit(" ", 1)[0] if " " in cut else text[:length]
+    return cut.rstrip(" .,;:") + "…"
+
+def content_hash(content):
+    return hashlib.blake2b((content or "").encode(), digest_size=16).hexdigest()
+
+# Campos que se guardan junto a `content`
+def content_metadata(content):
+    text = plain_text(content)
+    words = len(text.split())
+    return {
+        "wordCount": words,
+        "readTime": max(1, round(words / WORDS_PER_MINUTE)),
+        "excerpt": make_excerpt(text),
+        "contentHash": content_hash(content)
+    }
+
+# Completar los metadatos de los posts que no los tienen (o de todos con
+# force=True), por lotes de `batch_size`. Cada actualización solo se aplica si
+# el post no se editó mientras tanto (mismo updatedAt); una edición ya guarda
+# sus propios metadatos. Devuelve el número de posts actualizados.
+def backfill_metadata(db, batch_size=BACKFILL_BATCH_SIZE, force=False):
+    query = {} if force else {"contentHash": {"$exists": False}}
+    cursor = db.posts.find(query, {"content": 1, "updatedAt": 1}).sort("_id", ASCENDING).batch_size(batch_size)
+
+    updated = 0
+    batch = []
+    for post in cursor:
+        batch.append(UpdateOne(
+            {"_id": post["_id"], "updatedAt": post.get("updatedAt")},
+            {"$set": content_metadata(post.get("content", ""))}
+        ))
+        if len(batch) == batch_size:
+            updated += db.posts.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += db.posts.bulk_write(batch, ordered=False).modified_count
+    return updated
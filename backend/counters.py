@@ -0,0 +1,105 @@
+# Contadores de posts por estado y por autor.
+#
+# Los listados necesitan el total de posts para la paginación. En lugar de
+# ejecutar count_documents en cada petición, se mantienen contadores en la
+# colección post_counters que se actualizan al crear, editar y borrar posts:
+#   status:<estado>                  posts con ese estado
+#   author:<userId>                  posts del autor (cualquier estado)
+#   author:<userId>:status:<estado>  posts del autor con ese estado
+#
+# Los contadores solo se crean al escribir (un $inc con upsert al crear,
+# editar o borrar un post), así que solo existen para estados y autores que
+# tienen o tuvieron posts, y no hay una inicialización que compita con los $inc.
+# Las lecturas nunca escriben: si el contador no existe se cuenta con
+# count_documents y el resultado se guarda en memoria durante COUNT_CACHE_TTL.
+#
+# Para crear los contadores de los posts existentes (al actualizar una base de
+# datos anterior) o si alguna vez se desajustan: flask --app server counters-rebuild
+import os
+import threading
+from cachetools import TTLCache
+from pymongo import UpdateOne
+
+COUNT_CACHE_SIZE = int(os.getenv("COUNT_CACHE_SIZE", 1024))
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", 30))  # segundos
+
+# Totales sin contador (estados o autores sin posts), por clave
+uncounted = TTLCache(maxsize=COUNT_CACHE_SIZE, ttl=COUNT_CACHE_TTL)
+uncounted_lock = threading.Lock()
+
+def status_key(status):
+    return f"status:{status}"
+
+def author_key(user_id, status=None):
+    if status:
+        return f"author:{user_id}:status:{status}"
+    return f"author:{user_id}"
+
+# Claves que cuentan un post con ese autor y estado
+def post_keys(user_id, status):
+    return [status_key(status), author_key(user_id), author_key(user_id, status)]
+
+# Sumar `amount` a los contadores, creándolos si aún no existen
+def increment(db, keys, amount):
+    if keys:
+        db.post_counters.bulk_write([
+            UpdateOne({"_id": key}, {"$inc": {"count": amount}}, upsert=True)
+            for key in keys
+        ], ordered=False)
+
+def record_post_created(db, post):
+    increment(db, post_keys(post["author"]["userId"], post["status"]), 1)
+
+def record_post_deleted(db, post):
+    increment(db, post_keys(post["author"]["userId"], post["status"]), -1)
+
+def record_status_change(db, user_id, old_status, new_status):
+    if old_status == new_status:
+        return
+    increment(db, [status_key(old_status), author_key(user_id, old_status)], -1)
+    increment(db, [status_key(new_status), author_key(user_id, new_status)], 1)
+
+def cached_count(key):
+    with uncounted_lock:
+        return uncounted.get(key)
+
+def cache_count(key, count):
+    with uncounted_lock:
+        uncounted[key] = count
+    return count
+
+# Leer un contador; si no existe se calcula con el filtro equivalente (sin guardarlo)
+def get_count(db, key, filter_query):
+    counter = db.post_counters.find_one({"_id": key})
+    if counter:
+        return counter["count"]
+    count = cached_count(key)
+    if count is None:
+        count = cache_count(key, db.posts.count_documents(filter_query))
+    return count
+
+# Igual que get_count, con la base de datos de asgi.py
+async def get_count_async(db, key, filter_query):
+    counter = await db.post_counters.find_one({"_id": key})
+    if counter:
+        return counter["count"]
+    count = cached_count(key)
+    if count is None:
+        count = cache_count(key, await db.posts.count_documents(filter_query))
+    return count
+
+# Recalcular todos los contadores a partir de la colección de posts
+def rebuild_counters(db):
+    totals = {}
+    pipeline = [{"$group": {"_id": {"author": "$author.userId", "status": "$status"}, "count": {"$sum": 1}}}]
+    for group in db.posts.aggregate(pipeline):
+        for key in post_keys(group["_id"]["author"], group["_id"]["status"]):
+            totals[key] = totals.get(key, 0) + group["count"]
+
+    if totals:
+        db.post_counters.bulk_write([
+            UpdateOne({"_id": key}, {"$set": {"count": count}}, upsert=True)
+            for key, count in totals.items()
+        ], ordered=False)
+    db.post_counters.delete_many({"_id": {"$nin": list(totals)}})
+    return len(totals)
@@ -0,0 +1,180 @@
+# Verificación de los ID tokens de Google para el login.
+#
+# verify_oauth2_token descarga los certificados de Google en cada llamada y
+# comprueba la firma cada vez. Aquí:
+#   - CertificateCache se pasa como "request" a verify_oauth2_token y sirve
+#     los certificados desde memoria. Un hilo en segundo plano los renueva
+#     antes de que caduquen según el Cache-Control de la respuesta, así que
+#     un login solo espera una descarga en frío o si la renovación falló.
+#   - GoogleTokenVerifier guarda los tokens ya verificados (por su hash
+#     SHA-256) hasta su `exp`, de modo que reintentos y ráfagas del mismo
+#     token no repiten la verificación.
+#
+# GOOGLE_CERTS_URL permite apuntar a un servidor local en lugar de Google
+# (pruebas sin red).
+#
+# google-auth y requests tardan en importarse: se importan en el primer
+# login, no al arrancar el servidor.
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from cachetools import TLRUCache
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+CERTS_SOURCE_URL = os.getenv("GOOGLE_CERTS_URL", GOOGLE_CERTS_URL)
+DEFAULT_MAX_AGE = 300  # segundos, si la respuesta no trae max-age
+REFRESH_MARGIN = 60  # renovar este tiempo antes de que caduquen
+RETRY_INTERVAL = 10  # reintentar tras un fallo de renovación
+TOKEN_CACHE_SIZE = int(os.getenv("GOOGLE_TOKEN_CACHE_SIZE", 1024))
+
+logger = logging.getLogger(__name__)
+
+# Segundos de validez de una respuesta según Cache-Control (y Age)
+def max_age(headers):
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    match = re.search(r"max-age=(\d+)", headers.get("cache-control", ""))
+    if not match:
+        return DEFAULT_MAX_AGE
+    age = headers.get("age", "0")
+    return max(0, int(match.group(1)) - (int(age) if age.isdigit() else 0))
+
+class CachedResponse:
+    def __init__(self, status, headers, data):
+        self.status = status
+        self.headers = headers
+        self.data = data
+
+class CertificateCache:
+    def __init__(self, transport=None, url=GOOGLE_CERTS_URL, source_url=CERTS_SOURCE_URL, timer=time.time):
+        # transport: google.auth.transport.requests.Request (u otro con la misma firma),
+        # creado en el primer uso si no se indica
+        self._transport = transport
+        self._url = url
+        self._source_url = source_url
+        self._timer = timer
+        self._lock = threading.Lock()
+        # Una sola descarga a la vez: una ráfaga de logins en frío espera a la misma
+        self._refresh_lock = threading.Lock()
+        self._response = None
+        self._expires = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self.fetches = 0
+        self.failed_fetches = 0
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    # Interfaz de google.auth.transport.Request: solo se interceptan los certificados
+    def __call__(self, url, method="GET", **kwargs):
+        if url != self._url or method != "GET":
+            return self.transport()(url, method=method, **kwargs)
+        self.start()
+        # Solo se descarga aquí en frío o si la renovación en segundo plano falló
+        return self._fresh() or self.refresh(force=False)
+
+    # Descargar los certificados y guardarlos hasta que caduquen
+    # (sin force, no se descargan si otro hilo acaba de hacerlo)
+    def refresh(self, force=True):
+        with self._refresh_lock:
+            cached = None if force else self._fresh()
+            if cached:
+                return cached
+            response = self.transport()(self._source_url, method="GET")
+            self.fetches += 1
+            if response.status != 200:
+                self.failed_fetches += 1
+                # verify_oauth2_token informa del error de transporte
+                return response
+            cached = CachedResponse(response.status, dict(response.headers), response.data)
+            with self._lock:
+                self._response = cached
+                self._expires = self._timer() + max_age(response.headers)
+            return cached
+
+    def transport(self):
+        if self._transport is None:
+            from google.auth.transport import requests as google_requests
+            self._transport = google_requests.Request()
+        return self._transport
+
+    def _fresh(self):
+        with self._lock:
+            return self._response if self._timer() < self._expires else None
+
+    # Segundos hasta la próxima renovación
+    def next_refresh(self):
+        with self._lock:
+            if self._response is None:
+                return 0
+            return max(0, self._expires - self._timer() - REFRESH_MARGIN)
+
+    # Arrancar el hilo de renovación (también sirve para precalentar al arrancar)
+    def start(self):
+        if self._thread or self._stop.is_set():
+            return
+        with self._lock:
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name="google-certs", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.next_refresh()):
+            try:
+                if self.refresh().status != 200:
+                    raise RuntimeError("unexpected status")
+            except Exception:
+                logger.exception("Failed to refresh Google certificates")
+                self._stop.wait(RETRY_INTERVAL)
+
+class GoogleTokenVerifier:
+    def __init__(self, client_id, certs, maxsize=TOKEN_CACHE_SIZE, timer=time.time):
+        self._client_id = client_id
+        self._certs = certs
+        # Cada token caduca de la caché en su exp (hora Unix, igual que timer)
+        self._tokens = TLRUCache(maxsize, ttu=lambda key, idinfo, now: idinfo["exp"], timer=timer)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token):
+        key = hashlib.sha256(token.encode()).hexdigest()
+        with self._lock:
+            idinfo = self._tokens.get(key)
+            if idinfo is not None:
+                self.hits += 1
+                return idinfo
+            self.misses += 1
+
+        # Los tokens inválidos lanzan una excepción y no se guardan
+        from google.oauth2 import id_token
+        idinfo = id_token.verify_oauth2_token(token, self._certs, self._client_id)
+        if "exp" in idinfo:
+            with self._lock:
+                self._tokens[key] = idinfo
+        return idinfo
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tokens": len(self._tokens),
+                "hits": self.hits,
+                "misses": self.misses,
+                "certFetches": self._certs.fetches,
+                "failedCertFetches": self._certs.failed_fetches
+            }
@@ -0,0 +1,94 @@
+# Configuración de gunicorn para producción.
+#
+# Uso:
+#   gunicorn -c gunicorn.conf.py
+#   GUNICORN_PROFILE=sync gunicorn -c gunicorn.conf.py
+#
+# Perfiles (GUNICORN_PROFILE):
+#   sync     un proceso por petición en curso; sin keep-alive. Para CPU o
+#            para depurar.
+#   gthread  (por defecto) GUNICORN_THREADS hilos por worker; las esperas a
+#            Mongo liberan el GIL, así que es el que mejor aprovecha la memoria.
+#   gevent   GUNICORN_WORKER_CONNECTIONS greenlets por worker. Requiere
+#            `pip install gevent` (pymongo funciona con el monkey patching).
+#
+# Cada worker tiene su propio MongoClient (config.py lo olvida tras el fork).
+# Su pool se dimensiona a la concurrencia del worker más un margen para los
+# hilos en segundo plano (volcado de vistas, explain de consultas lentas), de
+# modo que workers * maxPoolSize sea el máximo de conexiones al servidor.
+# MONGO_MAX_POOL_SIZE, si está definida, tiene prioridad.
+import multiprocessing
+import os
+
+PROFILE = os.getenv("GUNICORN_PROFILE", "gthread")
+PROFILES = ("sync", "gthread", "gevent")
+if PROFILE not in PROFILES:
+    raise ValueError(f"GUNICORN_PROFILE must be one of {', '.join(PROFILES)}, not {PROFILE!r}")
+
+# Conexiones de Mongo extra para los hilos en segundo plano de cada worker
+POOL_HEADROOM = int(os.getenv("MONGO_POOL_HEADROOM", 2))
+
+wsgi_app = "server:app"
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', 5000)}")
+worker_class = PROFILE
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+if PROFILE == "gthread":
+    threads = int(os.getenv("GUNICORN_THREADS", 4))
+    concurrency = threads
+elif PROFILE == "gevent":
+    worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 100))
+    concurrency = worker_connections
+else:
+    concurrency = 1
+
+# Los workers heredan el entorno del master: create_app lee de aquí el tamaño del pool
+os.environ.setdefault("MONGO_MAX_POOL_SIZE", str(concurrency + POOL_HEADROOM))
+
+# Keep-alive (no aplica a sync): algo mayor que el intervalo del balanceador
+# entre peticiones de la misma conexión
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+# Una petición bloqueada más de `timeout` reinicia el worker; al apagar o
+# recargar, los workers tienen `graceful_timeout` para terminar las peticiones
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+
+# El heartbeat de los workers en memoria (en Docker /tmp puede ser un disco lento)
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+
+# Abrir la conexión a Mongo al arrancar el worker y no en su primera petición
+def connect_mongo(worker):
+    from config import mongo
+    client = mongo.client()
+    try:
+        client.admin.command("ping")
+    except Exception as e:
+        # El worker arranca igualmente: pymongo reconecta en la siguiente consulta
+        worker.log.warning("Mongo is not reachable yet: %s", e)
+    worker.log.info("Mongo client ready (maxPoolSize=%s)", mongo.settings["MONGO_MAX_POOL_SIZE"])
+
+def post_fork(server, worker):
+    # Con gevent el monkey patching ocurre después de este hook: pymongo no
+    # puede importarse aquí y se conecta en post_worker_init
+    if PROFILE != "gevent":
+        connect_mongo(worker)
+
+def post_worker_init(worker):
+    if PROFILE == "gevent":
+        connect_mongo(worker)
+    # Lo mismo que `python server.py`: índices y refresco de certificados de Google
+    from server import db, ensure_indexes, google_certs
+    try:
+        ensure_indexes(db)
+    except Exception as e:
+        worker.log.warning("Could not ensure Mongo indexes: %s", e)
+    google_certs.start()
+
+# Volcar las vistas pendientes antes de que el worker termine
+def worker_exit(server, worker):
+    import sys
+    if "server" in sys.modules:
+        sys.modules["server"].view_counter.stop()
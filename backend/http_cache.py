@@ -0,0 +1,114 @@
+# Validadores HTTP (ETag / If-None-Match) y compresión de las respuestas.
+#
+# Los endpoints de posts guardan junto a cada respuesta un ETag fuerte
+# calculado a partir de los campos que determinan el cuerpo (ver
+# posts.post_etag). Si el cliente envía ese ETag en If-None-Match se responde
+# 304 sin serializar nada.
+#
+# Compressor comprime con brotli (si está instalado) o gzip las respuestas
+# JSON de más de COMPRESS_MIN_SIZE bytes según Accept-Encoding. Cada
+# codificación es una representación distinta, así que su ETag lleva un
+# sufijo ("<etag>-gzip", "<etag>-br"), y el cuerpo comprimido se guarda por
+# ETag para no volver a comprimirlo mientras no cambie.
+import gzip
+import hashlib
+import os
+import threading
+from cachetools import LRUCache
+from flask import current_app, jsonify, request
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header, parse_etags
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))  # bytes
+COMPRESS_CACHE_SIZE = int(os.getenv("COMPRESS_CACHE_SIZE", 256))  # cuerpos comprimidos guardados
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # rápido para respuestas dinámicas, cerca de gzip -9 en tamaño
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+NO_CACHE = "no-cache"  # el cliente guarda la respuesta pero la revalida siempre
+
+# ETag opaco a partir de los valores que determinan una respuesta
+def etag_for(*parts):
+    raw = "\x1f".join(str(part) for part in parts).encode()
+    return hashlib.blake2b(raw, digest_size=12).hexdigest()
+
+# La variante de `etag` (sin codificar o comprimida) que el cliente ya tiene
+# según su If-None-Match, o None
+def matching_etag(if_none_match, etag):
+    if not if_none_match:
+        return None
+    etags = parse_etags(if_none_match)
+    if etags.star_tag:
+        return etag
+    for tag in (etag, *(f"{etag}-{encoding}" for encoding in ENCODINGS)):
+        # If-None-Match usa la comparación débil (RFC 9110, 13.1.2)
+        if etags.contains_weak(tag):
+            return tag
+    return None
+
+# Respuesta de Flask de una posts.Representation: 304 sin cuerpo si el
+# cliente ya la tiene, o el JSON con su ETag
+def conditional_response(representation):
+    etag = matching_etag(request.headers.get("If-None-Match"), representation.etag)
+    if etag:
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(representation.body)
+        etag = representation.etag
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = NO_CACHE
+    response.vary.add("Accept-Encoding")
+    return response
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+class Compressor:
+    def __init__(self, min_size=COMPRESS_MIN_SIZE, cache_size=COMPRESS_CACHE_SIZE):
+        self.min_size = min_size
+        self._lock = threading.Lock()
+        self._cache = LRUCache(maxsize=cache_size)  # (etag, codificación) -> cuerpo
+
+    def init_app(self, app):
+        app.after_request(self._after_request)
+
+    # Codificar un cuerpo según Accept-Encoding.
+    # Devuelve (cuerpo, codificación); codificación es None si no se comprime.
+    def encode(self, data, accept_encoding, etag=None):
+        encoding = negotiate(accept_encoding)
+        if encoding is None or len(data) < self.min_size:
+            return data, None
+        if etag is None:
+            return compress(data, encoding), encoding
+        key = (etag, encoding)
+        with self._lock:
+            body = self._cache.get(key)
+        if body is None:
+            body = compress(data, encoding)
+            with self._lock:
+                self._cache[key] = body
+        return body, encoding
+
+    def _after_request(self, response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or response.mimetype != "application/json" or "Content-Encoding" in response.headers):
+            return response
+        response.vary.add("Accept-Encoding")
+        etag, _ = response.get_etag()
+        body, encoding = self.encode(response.get_data(), request.headers.get("Accept-Encoding", ""), etag)
+        if encoding:
+            response.set_data(body)
+            response.headers["Content-Encoding"] = encoding
+            if etag:
+                response.set_etag(f"{etag}-{encoding}")
+        return response
+
+# Codificación preferida por el cliente entre las disponibles (brotli antes que gzip)
+def negotiate(accept_encoding):
+    return parse_accept_header(accept_encoding, Accept).best_match(ENCODINGS)
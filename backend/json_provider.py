@@ -0,0 +1,50 @@
+# Serialización JSON de las respuestas (app.json de Flask, usado por jsonify y
+# al devolver un dict desde una vista).
+#
+# OrjsonProvider serializa con orjson, que escribe bytes directamente y es
+# varias veces más rápido que el módulo json. ObjectId se escribe como su
+# cadena hexadecimal y datetime/date en ISO 8601, así que los documentos de
+# Mongo se devuelven tal cual, sin recorrerlos antes para convertir cada _id.
+#
+# Si orjson no está instalado se usa el proveedor de Flask con las mismas
+# conversiones (MongoJSONProvider).
+import datetime
+from bson.objectid import ObjectId
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Tipos que no son JSON nativo
+def default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class MongoJSONProvider(DefaultJSONProvider):
+    default = staticmethod(default)
+
+class OrjsonProvider(JSONProvider):
+    # Claves no textuales como con json.dumps; el orden de las claves es el del documento
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    # Las opciones de json.dumps (indent, separators...) no aplican a orjson
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    # La respuesta se construye con los bytes de orjson, sin pasar por str
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=default, option=self.option), mimetype="application/json"
+        )
+
+def json_provider(app):
+    return OrjsonProvider(app) if orjson else MongoJSONProvider(app)
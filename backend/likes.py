@@ -0,0 +1,114 @@
+# Likes de los posts.
+#
+# Cada like es un documento de post_likes con un índice único (postId, userId):
+# dar like es un insert que falla con DuplicateKeyError si ya existía, y quitarlo
+# es un delete_one, así que no hace falta comprobar antes y no hay carreras que
+# cuenten un like dos veces.
+#
+# Cada operación tiene su versión async (AsyncMongoClient) para asgi.py.
+import datetime
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from bson.objectid import ObjectId
+from schema import ensure_indexes
+
+MAX_STATUS_IDS = 100
+
+def ensure_like_indexes(db):
+    ensure_indexes(db, "post_likes")
+
+def like_document(post_id, user_id):
+    return {"postId": post_id, "userId": user_id, "createdAt": datetime.datetime.now(datetime.UTC).isoformat()}
+
+# Dar like: True si se añadió, False si ya lo tenía y None si el post no existe.
+# El like se inserta antes de contarlo; si el post no existe se deshace.
+# Un id mal formado lanza InvalidId antes de insertar nada.
+def add_like(db, post_id, user_id):
+    object_id = ObjectId(post_id)
+    try:
+        db.post_likes.insert_one(like_document(post_id, user_id))
+    except DuplicateKeyError:
+        return False
+    result = db.posts.update_one({"_id": object_id}, {"$inc": {"likes": 1}})
+    if not result.matched_count:
+        db.post_likes.delete_one({"postId": post_id, "userId": user_id})
+        return None
+    return True
+
+async def add_like_async(db, post_id, user_id):
+    object_id = ObjectId(post_id)
+    try:
+        await db.post_likes.insert_one(like_document(post_id, user_id))
+    except DuplicateKeyError:
+        return False
+    result = await db.posts.update_one({"_id": object_id}, {"$inc": {"likes": 1}})
+    if not result.matched_count:
+        await db.post_likes.delete_one({"postId": post_id, "userId": user_id})
+        return None
+    return True
+
+# Quitar like: solo si existía se descuenta del post. Devuelve si existía.
+def remove_like(db, post_id, user_id):
+    result = db.post_likes.delete_one({"postId": post_id, "userId": user_id})
+    if not result.deleted_count:
+        return False
+    db.posts.update_one({"_id": ObjectId(post_id)}, {"$inc": {"likes": -1}})
+    return True
+
+async def remove_like_async(db, post_id, user_id):
+    result = await db.post_likes.delete_one({"postId": post_id, "userId": user_id})
+    if not result.deleted_count:
+        return False
+    await db.posts.update_one({"_id": ObjectId(post_id)}, {"$inc": {"likes": -1}})
+    return True
+
+# postIds del cuerpo de /api/posts/likes/status. Lanza ValueError si no es válido.
+def parse_status_ids(data):
+    post_ids = (data or {}).get("postIds")
+    if not isinstance(post_ids, list) or not all(isinstance(p, str) for p in post_ids):
+        raise ValueError("postIds must be a list of post ids")
+    if len(post_ids) > MAX_STATUS_IDS:
+        raise ValueError(f"At most {MAX_STATUS_IDS} post ids per request")
+    return post_ids
+
+# Posts de la lista a los que el usuario dio like, con una sola consulta $in
+def liked_post_ids(db, user_id, post_ids):
+    likes = db.post_likes.find(
+        {"userId": user_id, "postId": {"$in": list(post_ids)}},
+        {"postId": 1, "_id": 0}
+    )
+    return {like["postId"] for like in likes}
+
+async def liked_post_ids_async(db, user_id, post_ids):
+    likes = await db.post_likes.find(
+        {"userId": user_id, "postId": {"$in": list(post_ids)}},
+        {"postId": 1, "_id": 0}
+    ).to_list()
+    return {like["postId"] for like in likes}
+
+# Reparar los datos anteriores al índice único: borrar likes duplicados,
+# crear el índice y recalcular el contador de likes de cada post.
+def repair_likes(db):
+    duplicates = db.post_likes.aggregate([
+        {"$group": {"_id": {"postId": "$postId", "userId": "$userId"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ])
+    removed = 0
+    for duplicate in duplicates:
+        result = db.post_likes.delete_many({"_id": {"$in": duplicate["ids"][1:]}})
+        removed += result.deleted_count
+
+    ensure_like_indexes(db)
+
+    counts = {
+        ObjectId(count["_id"]): count["likes"]
+        for count in db.post_likes.aggregate([{"$group": {"_id": "$postId", "likes": {"$sum": 1}}}])
+        if ObjectId.is_valid(count["_id"])
+    }
+    if counts:
+        db.posts.bulk_write([
+            UpdateOne({"_id": post_id}, {"$set": {"likes": likes}})
+            for post_id, likes in counts.items()
+        ], ordered=False)
+    db.posts.update_many({"_id": {"$nin": list(counts)}, "likes": {"$ne": 0}}, {"$set": {"likes": 0}})
+    return removed
@@ -0,0 +1,156 @@
+# Métricas de las peticiones en formato de texto de Prometheus.
+#
+# Por cada ruta (la plantilla de la regla, p. ej. /api/posts/<id>, para que
+# los ids no disparen la cardinalidad) se cuentan las peticiones y los errores,
+# las peticiones en curso y los histogramas de latencia y tamaño de respuesta.
+# Registrar una petición son unas pocas sumas bajo un lock, sin E/S.
+#
+# Se desactiva con METRICS_ENABLED=0 (ni hooks ni endpoint /metrics).
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from flask import Response, g, request
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # segundos
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)  # bytes
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    # Pares (le, acumulado) como los espera Prometheus
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels) + "}"
+
+class Metrics:
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # nombre -> (tipo, ayuda, {etiquetas: valor o Histogram})
+        self._families = {}
+        self._collectors = []
+
+    # Registrar una familia de métricas (counter, gauge o histogram)
+    def define(self, name, kind, help_text, buckets=None):
+        if name in self._families:
+            return
+        samples = defaultdict(lambda: Histogram(buckets)) if kind == "histogram" else defaultdict(float)
+        self._families[name] = (kind, help_text, samples)
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._families[name][2][labels] += amount
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            self._families[name][2][labels].observe(value)
+
+    # Funciones que devuelven [(nombre, tipo, ayuda, [(etiquetas, valor)])]
+    # calculadas al exportar (estado de cachés, contador de vistas...)
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, samples) in self._families.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for labels, value in sorted(samples.items()):
+                    if kind == "histogram":
+                        for bound, count in value.cumulative():
+                            le = labels + (("le", format_value(float(bound))),)
+                            lines.append(f"{name}_bucket{format_labels(le)} {count}")
+                        lines.append(f"{name}_sum{format_labels(labels)} {format_value(value.sum)}")
+                        lines.append(f"{name}_count{format_labels(labels)} {value.count}")
+                    else:
+                        lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{format_labels(labels)} {format_value(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            for _, _, samples in self._families.values():
+                samples.clear()
+
+    # Hooks de Flask y endpoint /metrics
+    def init_app(self, app, path="/metrics"):
+        if not self.enabled:
+            return
+        self.define("http_requests_total", "counter", "HTTP requests by route, method and status.")
+        self.define("http_request_errors_total", "counter", "HTTP responses with status >= 400 or unhandled exceptions.")
+        self.define("http_requests_in_flight", "gauge", "HTTP requests being served.")
+        self.define("http_request_duration_seconds", "histogram", "HTTP request latency.", LATENCY_BUCKETS)
+        self.define("http_response_size_bytes", "histogram", "HTTP response body size.", SIZE_BUCKETS)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule(path, "metrics", lambda: Response(self.render(), content_type=CONTENT_TYPE))
+
+    def _route_labels(self):
+        rule = request.url_rule.rule if request.url_rule else "unmatched"
+        return (("method", request.method), ("route", rule))
+
+    def _before_request(self):
+        if not self.enabled:
+            return
+        g.metrics_start = time.perf_counter()
+        g.metrics_labels = self._route_labels()
+        self.inc("http_requests_in_flight", g.metrics_labels)
+
+    def _after_request(self, response):
+        labels = g.get("metrics_labels")
+        if labels is None:
+            return response
+        status = (("status", str(response.status_code)),)
+        self.inc("http_requests_total", labels + status)
+        if response.status_code >= 400:
+            self.inc("http_request_errors_total", labels + status)
+        size = response.calculate_content_length()
+        if size is not None:
+            self.observe("http_response_size_bytes", labels, size)
+        g.metrics_responded = True
+        return response
+
+    # Se ejecuta siempre, también si la vista lanzó una excepción
+    def _teardown_request(self, error=None):
+        labels = g.pop("metrics_labels", None)
+        if labels is None:
+            return
+        self.inc("http_requests_in_flight", labels, -1)
+        self.observe("http_request_duration_seconds", labels, time.perf_counter() - g.pop("metrics_start"))
+        if not g.pop("metrics_responded", False):
+            self.inc("http_request_errors_total", labels + (("status", "500"),))
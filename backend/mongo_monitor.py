@@ -0,0 +1,227 @@
+# Latencia de los comandos de Mongo y registro de consultas lentas.
+#
+# CommandMonitor es un CommandListener de pymongo (se pasa al MongoClient en
+# config.py). Cada comando se reduce a una "forma": comando, colección y la
+# estructura del filtro/orden/actualización con los valores sustituidos por
+# "?", de modo que {"slug": "hola"} y {"slug": "adios"} cuentan juntos:
+#   find posts {"filter":{"slug":"?"}}
+#
+# Por cada forma se publica en /metrics un histograma de latencia y los
+# fallos. Los comandos que superan MONGO_SLOW_MS se registran en el log junto
+# con su plan (explain), que se calcula en un hilo aparte y como mucho una
+# vez cada EXPLAIN_INTERVAL por forma.
+#
+# Además cada petición HTTP cuenta sus comandos y el tiempo en Mongo: van a
+# /metrics por ruta y a la cabecera Server-Timing, así un N+1 se ve enseguida.
+# Las estadísticas de la petición van en una ContextVar: sirven igual para un
+# hilo de Flask que para una tarea de asyncio (asgi.py).
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from flask import g
+from pymongo import monitoring
+from metrics import LATENCY_BUCKETS
+from schema import plan_stages, winning_plan
+
+MONGO_SLOW_MS = float(os.getenv("MONGO_SLOW_MS", 100))
+EXPLAIN_INTERVAL = 300  # segundos entre dos explain de la misma forma
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+# Partes del comando que definen su forma
+SHAPE_FIELDS = {
+    "find": ("filter", "sort", "projection"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+    "update": ("updates",),
+    "delete": ("deletes",),
+    "findAndModify": ("query", "sort", "update", "fields"),
+    "insert": (),
+    "getMore": (),
+}
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Partes que se conservan tal cual (direcciones de orden, campo de distinct)
+LITERAL_FIELDS = {"sort", "key"}
+# Proyecciones: dependen de ?fields= (hasta 2^N combinaciones por consulta),
+# así que no forman parte de la forma; solo se indica que la hay
+PROJECTION_FIELDS = {"projection", "fields"}
+PROJECTION = "<projection>"
+
+logger = logging.getLogger(__name__)
+
+# Sustituir los valores por "?" conservando claves y operadores
+def normalize(value):
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        # Listas de documentos (pipeline, updates de un bulk_write): cada forma distinta una vez
+        shapes = []
+        for item in value:
+            shape = normalize(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return "?"
+
+def shape_part(field, value):
+    if field in PROJECTION_FIELDS:
+        return PROJECTION
+    return value if field in LITERAL_FIELDS else normalize(value)
+
+def command_shape(command_name, command):
+    collection = command.get("collection") if command_name == "getMore" else command.get(command_name)
+    if not isinstance(collection, str):
+        collection = ""
+    fields = SHAPE_FIELDS.get(command_name, ())
+    shape = {
+        field: shape_part(field, command[field])
+        for field in fields if field in command
+    }
+    text = json.dumps(shape, sort_keys=True, separators=(",", ":"), default=str) if shape else ""
+    return collection, f"{command_name} {collection} {text}".strip()
+
+# Comando listo para explain: sin los campos de sesión y de protocolo
+def explain_command(command):
+    return {key: value for key, value in command.items() if not key.startswith("$") and key not in ("lsid", "txnNumber")}
+
+class RequestStats:
+    def __init__(self):
+        self.commands = 0
+        self.seconds = 0.0
+
+class CommandMonitor(monitoring.CommandListener):
+    def __init__(self, slow_ms=MONGO_SLOW_MS):
+        self.slow_seconds = slow_ms / 1000
+        self.metrics = None
+        self._get_database = None
+        self._lock = threading.Lock()
+        self._started = {}  # (conexión, request_id) -> (forma, colección, comando para explain)
+        self._stats = contextvars.ContextVar("mongo_request_stats", default=None)
+        self._explains = queue.SimpleQueue()
+        self._explained = {}  # forma -> instante del último explain
+        self._thread = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    # Conectar con las métricas y las peticiones de Flask.
+    # get_database(nombre) devuelve la base de datos con la que ejecutar explain.
+    def init_app(self, app, metrics, get_database=None):
+        self._get_database = get_database
+        if metrics.enabled:
+            self.metrics = metrics
+            metrics.define("mongo_command_duration_seconds", "histogram", "Mongo command latency by shape.", LATENCY_BUCKETS)
+            metrics.define("mongo_command_failures_total", "counter", "Failed Mongo commands by shape.")
+            metrics.define("mongo_slow_commands_total", "counter", f"Mongo commands slower than {self.slow_seconds * 1000:g}ms by shape.")
+            metrics.define("http_request_mongo_commands", "histogram", "Mongo round trips per HTTP request.", ROUND_TRIP_BUCKETS)
+            metrics.define("http_request_mongo_seconds", "histogram", "Time spent in Mongo per HTTP request.", LATENCY_BUCKETS)
+        app.before_request(self.begin_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self.end_request)
+
+    # Estadísticas de Mongo de la petición en curso (en este hilo o tarea)
+    def begin_request(self):
+        self._stats.set(RequestStats())
+
+    def request_stats(self):
+        return self._stats.get()
+
+    def end_request(self, error=None):
+        self._stats.set(None)
+
+    # Registrar las estadísticas de la petición con las etiquetas de su ruta.
+    # Devuelve el valor de la cabecera Server-Timing (None si no se midió).
+    def record_request(self, labels):
+        stats = self.request_stats()
+        if stats is None:
+            return None
+        if self.metrics and labels:
+            self.metrics.observe("http_request_mongo_commands", labels, stats.commands)
+            self.metrics.observe("http_request_mongo_seconds", labels, stats.seconds)
+        return f'mongo;dur={stats.seconds * 1000:.1f};desc="{stats.commands} commands"'
+
+    def _after_request(self, response):
+        timing = self.record_request(g.get("metrics_labels"))
+        if timing:
+            response.headers.add("Server-Timing", timing)
+        return response
+
+    def started(self, event):
+        collection, shape = command_shape(event.command_name, event.command)
+        command = explain_command(event.command) if event.command_name in EXPLAINABLE else None
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (shape, collection, command)
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+    def _finished(self, event, failed):
+        with self._lock:
+            started = self._started.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        shape, collection, command = started
+        seconds = event.duration_micros / 1_000_000
+
+        stats = self.request_stats()
+        if stats is not None:
+            stats.commands += 1
+            stats.seconds += seconds
+
+        labels = (("collection", collection), ("command", event.command_name), ("shape", shape))
+        if self.metrics:
+            self.metrics.observe("mongo_command_duration_seconds", labels, seconds)
+            if failed:
+                self.metrics.inc("mongo_command_failures_total", labels)
+
+        if seconds >= self.slow_seconds:
+            logger.warning("Slow Mongo command (%.1fms): %s", seconds * 1000, shape)
+            if self.metrics:
+                self.metrics.inc("mongo_slow_commands_total", labels)
+            if command is not None and not failed:
+                self._queue_explain(shape, event.database_name, command)
+
+    # El explain se ejecuta en otro hilo para no alargar la petición
+    def _queue_explain(self, shape, database_name, command):
+        now = time.monotonic()
+        with self._lock:
+            if self._get_database is None or now - self._explained.get(shape, -EXPLAIN_INTERVAL) < EXPLAIN_INTERVAL:
+                return
+            self._explained[shape] = now
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mongo-explain", daemon=True)
+                self._thread.start()
+        self._explains.put((shape, database_name, command))
+
+    def explain(self, shape, database_name, command):
+        database = self._get_database(database_name)
+        plan = database.command({"explain": command, "verbosity": "queryPlanner"})
+        stages = list(plan_stages(winning_plan(plan)))
+        logger.warning(
+            "Plan for slow Mongo command %s: %s%s",
+            shape, " <- ".join(filter(None, stages)), " (COLLSCAN)" if "COLLSCAN" in stages else ""
+        )
+        return stages
+
+    def _reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._started = {}
+        self._explains = queue.SimpleQueue()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            shape, database_name, command = self._explains.get()
+            try:
+                self.explain(shape, database_name, command)
+            except Exception:
+                logger.exception("Failed to explain slow Mongo command %s", shape)
+
+# Una única instancia por proceso, registrada en el MongoClient de config.py
+command_monitor = CommandMonitor()
@@ -0,0 +1,92 @@
+# Paginación de listados de posts.
+#
+# Los listados se ordenan por (createdAt, _id) descendente. Además del clásico
+# ?page=N (que usa skip y cuesta O(skip) en el servidor), se acepta un ?cursor=
+# opaco que codifica la última posición vista y salta directamente a la
+# siguiente página usando el índice.
+import base64
+import json
+from math import ceil
+from bson.objectid import ObjectId
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Orden estable: _id desempata posts creados en el mismo instante
+SORT = [("createdAt", -1), ("_id", -1)]
+# Orden cronológico (comentarios)
+SORT_ASCENDING = [("createdAt", 1), ("_id", 1)]
+
+# Leer page, limit y cursor de los argumentos de la petición.
+# Lanza ValueError si algún valor no es válido.
+def parse_pagination(args):
+    page = max(1, int(args.get("page", 1)))
+    limit = max(1, min(MAX_LIMIT, int(args.get("limit", DEFAULT_LIMIT))))  # evitar abusos con limit muy alto
+    cursor = args.get("cursor") or None
+    return page, limit, decode_cursor(cursor) if cursor else None
+
+# ?withTotal=false permite omitir el total cuando el cliente no lo necesita
+def parse_with_total(args):
+    return args.get("withTotal", "true").lower() not in ("false", "0", "no")
+
+def encode_cursor(post):
+    raw = json.dumps([post["createdAt"], str(post["_id"])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, post_id = json.loads(base64.urlsafe_b64decode(padded))
+        return created_at, ObjectId(post_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+# Filtro que devuelve solo los documentos posteriores al cursor en el orden
+# SORT (o SORT_ASCENDING si ascending=True)
+def after_cursor(filter_query, cursor, ascending=False):
+    created_at, post_id = cursor
+    operator = "$gt" if ascending else "$lt"
+    return {
+        **filter_query,
+        "$or": [
+            {"createdAt": {operator: created_at}},
+            {"createdAt": created_at, "_id": {operator: post_id}}
+        ]
+    }
+
+# Consulta de una página de posts. Con cursor se hace un seek por índice; sin
+# él se usa skip a partir de `page` por compatibilidad. Sirve igual para
+# colecciones de pymongo y de su versión asyncio (AsyncCollection).
+def page_query(collection, filter_query, projection, page, limit, cursor=None, ascending=False):
+    sort = SORT_ASCENDING if ascending else SORT
+    if cursor:
+        query = collection.find(after_cursor(filter_query, cursor, ascending), projection).sort(sort)
+    else:
+        query = collection.find(filter_query, projection).sort(sort).skip((page - 1) * limit)
+    # Pedir un elemento de más para saber si hay página siguiente
+    return query.limit(limit + 1)
+
+def split_page(posts, limit):
+    has_more = len(posts) > limit
+    posts = posts[:limit]
+    return posts, encode_cursor(posts[-1]) if has_more else None
+
+# Obtener una página de posts.
+# Devuelve (posts, next_cursor); next_cursor es None en la última página.
+def fetch_page(collection, filter_query, projection, page, limit, cursor=None, ascending=False):
+    posts = list(page_query(collection, filter_query, projection, page, limit, cursor, ascending))
+    return split_page(posts, limit)
+
+async def fetch_page_async(collection, filter_query, projection, page, limit, cursor=None, ascending=False):
+    posts = await page_query(collection, filter_query, projection, page, limit, cursor, ascending).to_list()
+    return split_page(posts, limit)
+
+# Bloque "pagination" de las respuestas de listados (total None si se omitió)
+def page_info(total, page, limit, next_cursor):
+    return {
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "totalPages": ceil(total / limit) if total is not None else None,
+        "nextCursor": next_cursor
+    }
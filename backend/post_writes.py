@@ -0,0 +1,109 @@
+# Escrituras de posts en una sola operación condicional.
+#
+# Editar o borrar un post ya no lee antes el documento para comprobar el
+# autor: el filtro de find_one_and_update / find_one_and_delete lleva el
+# _id, el autor y, si el cliente la envía, la versión que editó. Si el
+# filtro no encuentra nada se lee el post (solo en ese caso) para
+# responder 404, 401 o 409.
+#
+# Concurrencia optimista: cada post guarda `version`, que empieza en 1 y se
+# incrementa en cada edición. El cliente envía la versión que leyó; si otro
+# cambio la incrementó mientras tanto la escritura no se aplica y se
+# responde 409 con la versión actual.
+from http import HTTPStatus
+from bson.objectid import ObjectId
+from content import content_metadata
+
+INITIAL_VERSION = 1
+# Campos que edita el cliente (los metadatos del contenido se derivan de content)
+EDITABLE_FIELDS = ("title", "content", "status", "coverImage")
+# Campos indexados por la búsqueda (search.index_post)
+SEARCH_FIELDS = ("title", "content", "status")
+
+# Versión que el cliente editó ("version" en el cuerpo o en la query string),
+# o None para no comprobarla. Lanza ValueError si no es un entero.
+def expected_version(values):
+    version = values.get("version")
+    if version is None:
+        return None
+    if isinstance(version, str) and version.isdigit():
+        return int(version)
+    if isinstance(version, bool) or not isinstance(version, int):
+        raise ValueError("version must be an integer")
+    return version
+
+# Filtro de una escritura: el post, de este autor y (si se indica) en esta versión
+def owned_filter(post_id, user_id, version=None):
+    query = {"_id": ObjectId(post_id), "author.userId": user_id}
+    if version is not None:
+        query["version"] = version
+    return query
+
+# Campos que cambia una edición según el cuerpo de la petición.
+# Devuelve (cambios, título); el slug se decide en el servidor (update_pipeline).
+def post_changes(data):
+    changes = {}
+    title = (data.get("title") or "").strip()
+    content = (data.get("content") or "").strip()
+    if title:
+        changes["title"] = title
+    if content:
+        changes["content"] = content
+        changes.update(content_metadata(content))
+    for field in ("status", "coverImage"):
+        if field in data:
+            changes[field] = data[field]
+    return changes, title or None
+
+# Actualización (pipeline) de una edición. Todo se decide en el servidor con
+# los valores guardados, sin leerlos antes:
+# - updatedAt y version solo cambian si algún campo editable es distinto del
+#   guardado (guardar sin cambios no invalida la versión de otros editores);
+# - el slug solo cambia si cambia el título, y el nuevo se añade a `slugs`
+#   para que el anterior siga resolviendo (ver slugs.py).
+# $literal evita que un valor que empieza por "$" se lea como campo.
+def update_pipeline(changes, slug=None, now=None):
+    stage = {field: {"$literal": value} for field, value in changes.items()}
+    # Un campo que no existe se compara como null
+    changed = {"$or": [
+        {"$ne": [{"$ifNull": [f"${field}", None]}, {"$literal": changes[field]}]}
+        for field in EDITABLE_FIELDS if field in changes
+    ]}
+    if slug:
+        same_title = {"$eq": ["$title", {"$literal": changes["title"]}]}
+        # Los posts anteriores a `slugs` solo tienen su slug actual
+        slugs = {"$ifNull": ["$slugs", ["$slug"]]}
+        stage["slug"] = {"$cond": [same_title, "$slug", {"$literal": slug}]}
+        stage["slugs"] = {"$cond": [same_title, slugs, {"$setUnion": [slugs, {"$literal": [slug]}]}]}
+    stage["updatedAt"] = {"$cond": [changed, {"$literal": now}, "$updatedAt"]}
+    stage["version"] = {"$cond": [changed, {"$add": [{"$ifNull": ["$version", 0]}, 1]}, "$version"]}
+    return [{"$set": stage}]
+
+# Campos editables que la edición cambió respecto al documento anterior
+# (la misma comparación que update_pipeline)
+def changed_fields(before, changes):
+    return {field for field in EDITABLE_FIELDS if field in changes and before.get(field) != changes[field]}
+
+# El post tal como queda tras update_pipeline, a partir del documento anterior
+def updated_post(before, changes, slug=None, now=None):
+    post = {**before, **changes}
+    if not changed_fields(before, changes):
+        return post
+    post.update(updatedAt=now, version=before.get("version", 0) + 1)
+    if slug and before.get("title") != changes["title"]:
+        post["slug"] = slug
+        post["slugs"] = list(dict.fromkeys([*before.get("slugs", [before.get("slug")]), slug]))
+    return post
+
+# Respuesta de una escritura que no encontró el post con su filtro: el motivo
+# se averigua leyendo solo el autor y la versión
+def write_failure(posts, post_id, user_id, action):
+    post = posts.find_one({"_id": ObjectId(post_id)}, {"author.userId": 1, "version": 1})
+    if not post:
+        return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
+    if post["author"]["userId"] != user_id:
+        return {"error": f"Unauthorized: you can only {action} your own posts"}, HTTPStatus.UNAUTHORIZED
+    return {
+        "error": "The post was modified by another request",
+        "version": post.get("version")
+    }, HTTPStatus.CONFLICT
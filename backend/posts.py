@@ -0,0 +1,141 @@
+# Lectura de posts compartida por la API de Flask (server.py) y la de asyncio
+# (asgi.py): validación de los argumentos, proyecciones, forma de las
+# respuestas y etiquetas de la caché. Aquí no se hace E/S; cada aplicación
+# ejecuta las consultas con su driver. Los documentos se devuelven tal cual:
+# el proveedor JSON (json_provider.py) serializa ObjectId y datetime.
+from bson.objectid import ObjectId
+from cache import list_tag, post_tag, views_tag
+from http_cache import etag_for
+from pagination import MAX_LIMIT, parse_pagination, parse_with_total, page_info
+
+# Campos de un post que se pueden pedir con ?fields=title,slug,...
+# Un post sin ?fields= los incluye todos (nunca los comentarios embebidos antiguos).
+POST_FIELDS = (
+    "_id", "title", "slug", "excerpt", "content", "author", "status", "createdAt", "updatedAt", "version",
+    "wordCount", "readTime", "views", "likes", "commentCount", "coverImage"
+)
+# Proyección por defecto de los listados: todo menos el contenido
+SUMMARY_FIELDS = tuple(field for field in POST_FIELDS if field != "content")
+# Máximo de ids o slugs por petición a /api/posts/batch (como una página)
+MAX_BATCH_SIZE = MAX_LIMIT
+# Se leen siempre: el cursor usa createdAt y el ETag updatedAt, version y contentHash
+REQUIRED_FIELDS = ("_id", "createdAt", "updatedAt", "version", "contentHash")
+
+# Campos de un post que cambian su respuesta: updatedAt (y version) cambian
+# con cada edición; los contadores se actualizan con $inc sin tocar updatedAt,
+# y content-backfill añade los metadatos del contenido (contentHash) sin tocarlo
+ETAG_FIELDS = ("_id", "version", "updatedAt", "contentHash", "views", "likes", "commentCount")
+
+# Respuesta guardada en la caché junto con su ETag
+class Representation:
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+
+def post_etag(post):
+    return etag_for(*(post.get(field) for field in ETAG_FIELDS))
+
+# Campos pedidos con ?fields= (en el orden de POST_FIELDS), o `default`.
+# Lanza ValueError si alguno no está permitido.
+def parse_fields(args, default=POST_FIELDS):
+    value = args.get("fields")
+    if value is None:
+        return default
+    requested = {field.strip() for field in value.split(",")} - {""}
+    unknown = requested.difference(POST_FIELDS)
+    if unknown or not requested:
+        raise ValueError(f"Invalid fields: {', '.join(sorted(unknown)) or value!r}")
+    return tuple(field for field in POST_FIELDS if field in requested)
+
+def projection(fields):
+    return {field: 1 for field in (*REQUIRED_FIELDS, *fields)}
+
+# El post solo con los campos pedidos (y _id): los de REQUIRED_FIELDS se leen
+# para el cursor y el ETag pero no se devuelven si no se pidieron
+def select_fields(post, fields):
+    return {field: value for field, value in post.items() if field == "_id" or field in fields}
+
+# Argumentos de GET /api/posts: (status, page, limit, cursor, with_total).
+# Lanza ValueError si la paginación no es válida.
+def parse_list_args(args):
+    page, limit, cursor = parse_pagination(args)
+    return args.get("status", "published"), page, limit, cursor, parse_with_total(args)
+
+def list_filter(status):
+    return {"status": status}
+
+# Respuesta de un listado (Representation) y sus etiquetas de caché
+def list_response(status, posts, total, page, limit, next_cursor, fields=SUMMARY_FIELDS):
+    pagination = page_info(total, page, limit, next_cursor)
+    etag = etag_for(*fields, *map(post_etag, posts), *pagination.values())
+    response = {
+        "posts": [select_fields(post, fields) for post in posts],
+        "pagination": pagination
+    }
+    return Representation(response, etag), [list_tag(status)] + [post_tag(post["_id"]) for post in posts]
+
+# Un post (Representation) y sus etiquetas de caché (None si no existe).
+#
+# Las vistas que muestra son las ya volcadas más las pendientes en este
+# worker al construirla, y la respuesta no cambia hasta el siguiente volcado
+# (que invalida views:<id>). Así cada lectura cuenta su vista, también las
+# que reciben un 304, y el ETag se mantiene durante VIEWS_FLUSH_INTERVAL en
+# lugar de cambiar en cada petición. Incluye la vista de la petición que la
+# construye (el endpoint la cuenta justo después, como todas).
+def post_response(post, view_counter, fields=POST_FIELDS):
+    if not post:
+        return None, ()
+    if "views" in fields:
+        post = {**post, "views": post.get("views", 0) + view_counter.pending(post["_id"]) + 1}
+    representation = Representation(select_fields(post, fields), etag_for(*fields, post_etag(post)))
+    return representation, [post_tag(post["_id"]), views_tag(post["_id"])]
+
+# Ids o slugs pedidos a /api/posts/batch ("a,b,c" o una lista), sin repetir
+# y en el orden pedido. Lanza ValueError si no hay ninguno o son demasiados.
+def parse_batch_keys(value):
+    values = value.split(",") if isinstance(value, str) else value
+    if not isinstance(values, list) or not all(isinstance(key, str) for key in values):
+        raise ValueError("ids must be a list of post ids or slugs")
+    keys = list(dict.fromkeys(key.strip() for key in values if key.strip()))
+    if not keys:
+        raise ValueError("ids is required")
+    if len(keys) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} ids per request")
+    return keys
+
+# Una sola consulta para todas las claves: por _id las que son un ObjectId
+# válido y por slug todas (un slug también puede tener forma de ObjectId)
+def batch_filter(keys):
+    ids = [ObjectId(key) for key in keys if ObjectId.is_valid(key)]
+    if not ids:
+        return {"slug": {"$in": keys}}
+    return {"$or": [{"_id": {"$in": ids}}, {"slug": {"$in": keys}}]}
+
+# El slug se lee siempre para saber qué clave resolvió cada post (solo se
+# devuelve si se pidió)
+def batch_projection(fields):
+    return {**projection(fields), "slug": 1}
+
+# Respuesta de /api/posts/batch (Representation): los posts en el orden de
+# `keys` (primero por _id, luego por slug) y las claves sin post en "missing"
+def batch_response(keys, posts, fields=SUMMARY_FIELDS):
+    by_id, by_slug = {}, {}
+    for post in posts:
+        by_id[str(post["_id"])] = post
+        by_slug[post.get("slug")] = post
+    found, missing = [], []
+    for key in keys:
+        post = by_id.get(key) or by_slug.get(key)
+        if post:
+            found.append(post)
+        else:
+            missing.append(key)
+    etag = etag_for(*fields, *map(post_etag, found), *missing)
+    return Representation({"posts": [select_fields(post, fields) for post in found], "missing": missing}, etag)
+
+# Contar la vista en el buffer y devolver el post con las vistas pendientes
+def with_view(post, post_id, view_counter, fields=POST_FIELDS):
+    view_counter.record(post_id)
+    if "views" in fields:
+        post = {**post, "views": post.get("views", 0) + view_counter.pending(post_id)}
+    return select_fields(post, fields)
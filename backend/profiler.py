@@ -0,0 +1,195 @@
+# Perfilador por muestreo de las peticiones lentas.
+#
+# Un hilo en segundo plano toma cada PROFILER_INTERVAL_MS la pila de los
+# hilos que están atendiendo una petición, pero solo de las que ya superan
+# PROFILER_THRESHOLD_MS (o de la fracción PROFILER_SAMPLE_RATE elegida al
+# azar al empezar). Las peticiones rápidas no se muestrean nunca, así que el
+# coste es un diccionario por petición.
+#
+# Al terminar, la petición deja su captura en una cola y el mismo hilo la pasa
+# a un buffer circular de PROFILER_CAPACITY capturas, que se descarga como
+# pilas colapsadas (formato de flamegraph.pl / speedscope) o como SVG.
+import html
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from flask import request
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "1") != "0"
+PROFILER_THRESHOLD = float(os.getenv("PROFILER_THRESHOLD_MS", 500)) / 1000
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", 0.01))
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL_MS", 10)) / 1000
+PROFILER_CAPACITY = int(os.getenv("PROFILER_CAPACITY", 200))
+
+# Pila de un frame en formato colapsado: de la raíz a la función actual
+def collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class ActiveRequest:
+    def __init__(self, method, route, path, sampled):
+        self.method = method
+        self.route = route
+        self.path = path
+        self.sampled = sampled
+        self.start = time.perf_counter()
+        self.stacks = Counter()
+
+class SamplingProfiler:
+    def __init__(self, threshold=PROFILER_THRESHOLD, sample_rate=PROFILER_SAMPLE_RATE,
+                 interval=PROFILER_INTERVAL, capacity=PROFILER_CAPACITY, enabled=PROFILER_ENABLED):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = {}  # id del hilo -> ActiveRequest
+        self._finished = queue.SimpleQueue()
+        self._captures = deque(maxlen=capacity)
+        self._stop = threading.Event()
+        self._thread = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        self._ensure_started()
+        rule = request.url_rule.rule if request.url_rule else "unmatched"
+        active = ActiveRequest(request.method, rule, request.path, random.random() < self.sample_rate)
+        with self._lock:
+            self._active[threading.get_ident()] = active
+
+    def _teardown_request(self, error=None):
+        with self._lock:
+            active = self._active.pop(threading.get_ident(), None)
+        if active and active.stacks:
+            # El buffer lo actualiza el hilo del perfilador, no la petición
+            self._finished.put((active, time.perf_counter() - active.start, time.time()))
+
+    # Tomar una muestra de las peticiones lentas (o elegidas) en curso
+    def sample(self):
+        frames = sys._current_frames()
+        now = time.perf_counter()
+        with self._lock:
+            for thread_id, active in self._active.items():
+                frame = frames.get(thread_id)
+                if frame is not None and (active.sampled or now - active.start >= self.threshold):
+                    active.stacks[collapse(frame)] += 1
+
+    # Pasar las capturas terminadas al buffer circular
+    def drain(self):
+        while True:
+            try:
+                active, duration, captured_at = self._finished.get_nowait()
+            except queue.Empty:
+                return
+            self._captures.append({
+                "method": active.method,
+                "route": active.route,
+                "path": active.path,
+                "reason": "slow" if duration >= self.threshold else "sampled",
+                "durationMs": round(duration * 1000, 1),
+                "samples": sum(active.stacks.values()),
+                "capturedAt": captured_at,
+                "stacks": dict(active.stacks)
+            })
+
+    def captures(self, route=None):
+        self.drain()
+        return [c for c in list(self._captures) if route is None or c["route"] == route]
+
+    # Pilas de todas las capturas (o de una ruta) sumadas
+    def stacks(self, route=None):
+        total = Counter()
+        for capture in self.captures(route):
+            total.update(capture["stacks"])
+        return total
+
+    def collapsed(self, route=None):
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks(route).items()))
+
+    def stop(self):
+        self._stop.set()
+
+    def _ensure_started(self):
+        if self._thread or self._stop.is_set():
+            return
+        with self._lock:
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+
+    def _reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._active = {}
+        self._finished = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+            self.drain()
+
+##############################################
+################# Flamegraph #################
+##############################################
+
+FRAME_HEIGHT = 16
+
+# Árbol {nombre: [muestras, hijos]} a partir de las pilas colapsadas
+def stack_tree(stacks):
+    root = [0, {}]
+    for stack, count in stacks.items():
+        root[0] += count
+        node = root
+        for name in stack.split(";"):
+            node = node[1].setdefault(name, [0, {}])
+            node[0] += count
+    return root
+
+def tree_depth(node):
+    return 1 + max((tree_depth(child) for child in node[1].values()), default=0)
+
+# SVG autocontenido: cada función es un rectángulo de ancho proporcional a sus muestras
+def flamegraph_svg(stacks, width=1200, title="Flame graph"):
+    root = stack_tree(stacks)
+    height = (tree_depth(root) + 1) * FRAME_HEIGHT
+    rects = []
+
+    def draw(node, name, x, depth):
+        frame_width = width * node[0] / root[0]
+        if frame_width < 0.5:
+            return
+        y = height - (depth + 1) * FRAME_HEIGHT
+        hue = 20 + sum(map(ord, name)) % 40
+        label = html.escape(name)
+        text = label if frame_width > 7 * len(name) else ""
+        rects.append(
+            f'<g><title>{label} ({node[0]} samples)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{frame_width:.1f}" height="{FRAME_HEIGHT - 1}" fill="hsl({hue},90%,60%)"/>'
+            f'<text x="{x + 3:.1f}" y="{y + FRAME_HEIGHT - 4}">{text}</text></g>'
+        )
+        for child_name, child in node[1].items():
+            draw(child, child_name, x, depth + 1)
+            x += width * child[0] / root[0]
+
+    if root[0]:
+        draw(root, "all", 0.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">'
+        f'<text x="4" y="12">{html.escape(title)}</text>{"".join(rects)}</svg>'
+    )
@@ -0,0 +1,115 @@
+# Índices de la base de datos y auditoría de planes de consulta.
+#
+# INDEXES declara todos los índices que necesitan las consultas de la API.
+# ensure_indexes los crea de forma idempotente (create_indexes no hace nada si
+# ya existen) al arrancar el servidor o con: flask --app server schema-ensure
+#
+# query_shapes recoge cada forma de consulta que usan los endpoints; la
+# auditoría ejecuta explain() sobre cada una y falla si alguna acaba en un
+# COLLSCAN: flask --app server schema-audit
+import datetime
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pagination import SORT, SORT_ASCENDING
+
+INDEXES = {
+    "posts": [
+        IndexModel([("slug", ASCENDING)], name="slug_unique", unique=True),
+        # Slugs actuales y anteriores (slugs.py); sparse para los posts que aún no tienen el campo
+        IndexModel([("slugs", ASCENDING)], name="slugs_unique", unique=True, sparse=True),
+        # get_posts
+        IndexModel([("status", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)], name="status_created"),
+        # get_my_posts (todos los estados)
+        IndexModel([("author.userId", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)], name="author_created"),
+        # get_user_posts y get_my_posts?status=
+        IndexModel(
+            [("author.userId", ASCENDING), ("status", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)],
+            name="author_status_created"
+        ),
+    ],
+    "post_likes": [
+        IndexModel([("postId", ASCENDING), ("userId", ASCENDING)], name="post_user_unique", unique=True),
+    ],
+    "comments": [
+        # Comentarios de primer nivel en orden cronológico
+        IndexModel(
+            [("postId", ASCENDING), ("depth", ASCENDING), ("createdAt", ASCENDING), ("_id", ASCENDING)],
+            name="post_depth_created"
+        ),
+        # Subárboles de respuestas (ruta materializada)
+        IndexModel([("postId", ASCENDING), ("path", ASCENDING)], name="post_path"),
+    ],
+    "search_postings": [
+        IndexModel([("term", ASCENDING), ("postId", ASCENDING)], name="term_post_unique", unique=True),
+        IndexModel([("postId", ASCENDING)], name="post"),
+    ],
+    "users": [
+        IndexModel([("userId", ASCENDING)], name="user_unique", unique=True),
+    ],
+}
+
+# Crear los índices declarados (de todas las colecciones o solo de las indicadas)
+def ensure_indexes(db, *collections):
+    created = []
+    for collection in collections or INDEXES:
+        created += db[collection].create_indexes(INDEXES[collection])
+    return created
+
+##############################################
+################### Audit ####################
+##############################################
+
+def query_shapes():
+    post_id = ObjectId()
+    user_id = "audit-user"
+    created_at = datetime.datetime.now(datetime.UTC).isoformat()
+    after = {"$or": [{"createdAt": {"$lt": created_at}}, {"createdAt": created_at, "_id": {"$lt": post_id}}]}
+    path = str(post_id)
+
+    # (nombre, colección, filtro, orden)
+    return [
+        ("get_posts", "posts", {"status": "published"}, SORT),
+        ("get_posts?cursor", "posts", {"status": "published", **after}, SORT),
+        ("get_post_by_slug", "posts", {"$or": [{"slug": "audit-slug"}, {"slugs": "audit-slug"}]}, None),
+        ("get_posts_batch", "posts", {"$or": [{"_id": {"$in": [post_id]}}, {"slug": {"$in": ["audit-slug"]}}]}, None),
+        ("get_user_posts", "posts", {"author.userId": user_id, "status": "published"}, SORT),
+        ("get_user_posts?cursor", "posts", {"author.userId": user_id, "status": "published", **after}, SORT),
+        ("get_my_posts", "posts", {"author.userId": user_id}, SORT),
+        ("get_my_posts?cursor", "posts", {"author.userId": user_id, **after}, SORT),
+        ("get_comments", "comments", {"postId": post_id, "depth": 0}, SORT_ASCENDING),
+        ("get_comment_replies", "comments", {"postId": post_id, "path": {"$gt": path + "/", "$lt": path + "0"}}, [("path", ASCENDING)]),
+        ("delete_comment", "comments", {"postId": post_id, "path": {"$gt": path + "/", "$lt": path + "0"}}, None),
+        ("delete_post comments", "comments", {"postId": post_id}, None),
+        ("check_like", "post_likes", {"postId": str(post_id), "userId": user_id}, None),
+        ("check_likes", "post_likes", {"userId": user_id, "postId": {"$in": [str(post_id)]}}, None),
+        ("delete_post likes", "post_likes", {"postId": str(post_id)}, None),
+        ("search postings", "search_postings", {"term": {"$in": ["audit"]}}, [("postId", ASCENDING)]),
+        ("index_post postings", "search_postings", {"postId": post_id}, None),
+        ("get_user_data", "users", {"userId": user_id}, None),
+    ]
+
+# Etapas del plan ganador de un explain()
+def plan_stages(plan):
+    yield plan.get("stage")
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            yield from plan_stages(child)
+
+def winning_plan(explain):
+    planner = explain.get("queryPlanner", {})
+    plan = planner.get("winningPlan", {})
+    # Con el motor de ejecución SBE el plan viene anidado en queryPlan
+    return plan.get("queryPlan", plan)
+
+# Ejecutar explain() sobre cada forma de consulta.
+# Devuelve [(nombre, etapas del plan, usa COLLSCAN)].
+def audit_query_plans(db):
+    ensure_indexes(db)
+    results = []
+    for name, collection, query, sort in query_shapes():
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = list(plan_stages(winning_plan(cursor.limit(1).explain())))
+        results.append((name, stages, "COLLSCAN" in stages))
+    return results
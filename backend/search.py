@@ -0,0 +1,308 @@
+# Motor de búsqueda de texto completo para los posts.
+#
+# Cada post publicado se descompone en términos normalizados y se guarda un
+# "posting" por cada par (término, post) en la colección search_postings.
+# Una búsqueda solo lee los postings de los términos consultados en lugar de
+# recorrer toda la colección de posts con $regex.
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from schema import ensure_indexes
+
+TOKEN_RE = re.compile(r"\w+")
+MIN_TOKEN_LENGTH = 2
+INDEX_BATCH_SIZE = 500
+TITLE_BOOST = 3
+
+# Parámetros de BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Máximo de resultados ordenables (página * límite) y tamaño de los snippets
+MAX_SEARCH_RESULTS = 1000
+SNIPPET_WORDS = 30
+SNIPPET_CONTEXT = 5
+
+##############################################
+################ Tokenizer ###################
+##############################################
+
+# Normalizar texto: minúsculas y sin acentos (canción -> cancion, ñ -> n)
+def normalize(text):
+    decomposed = unicodedata.normalize("NFKD", (text or "").casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+# Separar texto normalizado en términos
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(normalize(text)) if len(t) >= MIN_TOKEN_LENGTH]
+
+# Términos únicos de una consulta, conservando el orden
+def query_terms(query):
+    return list(dict.fromkeys(tokenize(query)))
+
+##############################################
+################### Index ####################
+##############################################
+#
+# Colecciones:
+#   search_postings: {term, postId, tf, length}   un documento por (término, post)
+#   search_docs:     {_id: postId, length, terms}  términos indexados de cada post
+#   search_terms:    {_id: term, df}               número de posts con el término
+#   search_stats:    {_id: "corpus", docs, length} totales para la longitud media
+
+def ensure_search_indexes(db):
+    ensure_indexes(db, "search_postings")
+
+# Frecuencias ponderadas de un post: las palabras del título cuentan TITLE_BOOST veces
+def term_frequencies(post):
+    frequencies = Counter(tokenize(post.get("content")))
+    for term in tokenize(post.get("title")):
+        frequencies[term] += TITLE_BOOST
+    return frequencies
+
+# Construir los postings de un post (un documento por término)
+def build_postings(post, frequencies=None):
+    frequencies = frequencies if frequencies is not None else term_frequencies(post)
+    length = sum(frequencies.values())
+    return [
+        {"term": term, "postId": post["_id"], "tf": tf, "length": length}
+        for term, tf in frequencies.items()
+    ]
+
+# Indexar (o reindexar) un post. Los posts no publicados se quitan del índice.
+def index_post(db, post):
+    post_id = ObjectId(post["_id"])
+    if post.get("status") != "published":
+        remove_post(db, post_id)
+        return
+
+    frequencies = term_frequencies(post)
+    postings = build_postings({"_id": post_id}, frequencies)
+    length = sum(frequencies.values())
+
+    # Guardar los términos nuevos y recuperar los anteriores en la misma operación
+    previous = db.search_docs.find_one_and_update(
+        {"_id": post_id},
+        {"$set": {"length": length, "terms": list(frequencies)}},
+        upsert=True
+    )
+    old_terms = set(previous["terms"]) if previous else set()
+    added = set(frequencies) - old_terms
+    removed = old_terms - set(frequencies)
+
+    if postings:
+        db.search_postings.bulk_write([
+            UpdateOne({"term": p["term"], "postId": post_id}, {"$set": p}, upsert=True)
+            for p in postings
+        ], ordered=False)
+    if removed:
+        db.search_postings.delete_many({"postId": post_id, "term": {"$in": list(removed)}})
+
+    update_document_frequencies(db, added, removed)
+    if previous:
+        update_corpus_stats(db, 0, length - previous["length"])
+    else:
+        update_corpus_stats(db, 1, length)
+
+def remove_post(db, post_id):
+    post_id = ObjectId(post_id)
+    previous = db.search_docs.find_one_and_delete({"_id": post_id})
+    if not previous:
+        return
+    db.search_postings.delete_many({"postId": post_id})
+    update_document_frequencies(db, (), previous["terms"])
+    update_corpus_stats(db, -1, -previous["length"])
+
+def update_document_frequencies(db, added, removed):
+    operations = [UpdateOne({"_id": term}, {"$inc": {"df": 1}}, upsert=True) for term in added]
+    operations += [UpdateOne({"_id": term}, {"$inc": {"df": -1}}) for term in removed]
+    if operations:
+        db.search_terms.bulk_write(operations, ordered=False)
+
+def update_corpus_stats(db, docs, length):
+    db.search_stats.update_one({"_id": "corpus"}, {"$inc": {"docs": docs, "length": length}}, upsert=True)
+
+# Indexar posts nuevos en bloque (reconstrucción y benchmarks)
+def bulk_index(db, posts):
+    postings = []
+    docs = []
+    document_frequencies = Counter()
+    for post in posts:
+        frequencies = term_frequencies(post)
+        postings.extend(build_postings(post, frequencies))
+        docs.append({"_id": post["_id"], "length": sum(frequencies.values()), "terms": list(frequencies)})
+        document_frequencies.update(frequencies.keys())
+    if not docs:
+        return
+
+    db.search_postings.insert_many(postings, ordered=False)
+    db.search_docs.insert_many(docs, ordered=False)
+    db.search_terms.bulk_write([
+        UpdateOne({"_id": term}, {"$inc": {"df": df}}, upsert=True)
+        for term, df in document_frequencies.items()
+    ], ordered=False)
+    update_corpus_stats(db, len(docs), sum(doc["length"] for doc in docs))
+
+# Reconstruir el índice completo a partir de la colección de posts
+def rebuild_index(db, batch_size=INDEX_BATCH_SIZE):
+    for collection in ("search_postings", "search_docs", "search_terms", "search_stats"):
+        db.drop_collection(collection)
+    ensure_search_indexes(db)
+
+    cursor = db.posts.find(
+        {"status": "published"},
+        {"title": 1, "content": 1}
+    ).sort("_id", ASCENDING).batch_size(batch_size)
+
+    indexed = 0
+    batch = []
+    for post in cursor:
+        batch.append(post)
+        if len(batch) == batch_size:
+            bulk_index(db, batch)
+            indexed += len(batch)
+            batch = []
+    bulk_index(db, batch)
+    return indexed + len(batch)
+
+##############################################
+################## Ranking ###################
+##############################################
+
+# Peso BM25 de un término: los términos raros pesan más
+def idf(df, docs):
+    return math.log(1 + (docs - df + 0.5) / (df + 0.5))
+
+def bm25(tf, length, average_length, weight):
+    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+    return weight * tf * (BM25_K1 + 1) / norm
+
+# Agrupar los postings (ordenados por postId) en (postId, [postings])
+def group_postings(postings):
+    current_id = None
+    group = []
+    for posting in postings:
+        if posting["postId"] != current_id:
+            if group:
+                yield current_id, group
+            current_id = posting["postId"]
+            group = []
+        group.append(posting)
+    if group:
+        yield current_id, group
+
+# Devuelve ([(score, postId)], total) con los `k` mejores posts que contienen
+# todos los términos. Los postings se recorren en streaming y solo se guardan
+# k resultados en memoria.
+def top_matches(db, terms, k):
+    if not terms or k < 1:
+        return [], 0
+
+    frequencies = {t["_id"]: t["df"] for t in db.search_terms.find({"_id": {"$in": terms}})}
+    if any(frequencies.get(term, 0) < 1 for term in terms):
+        return [], 0  # algún término no aparece en ningún post
+
+    stats = db.search_stats.find_one({"_id": "corpus"}) or {}
+    docs = max(stats.get("docs", 0), 1)
+    average_length = max(stats.get("length", 0) / docs, 1)
+    weights = {term: idf(df, docs) for term, df in frequencies.items()}
+
+    postings = db.search_postings.find(
+        {"term": {"$in": terms}},
+        {"term": 1, "postId": 1, "tf": 1, "length": 1, "_id": 0}
+    ).sort("postId", ASCENDING)
+
+    heap = []
+    total = 0
+    for post_id, group in group_postings(postings):
+        if len(group) != len(terms):
+            continue
+        total += 1
+        score = sum(bm25(p["tf"], p["length"], average_length, weights[p["term"]]) for p in group)
+        # A igual puntuación gana el post más reciente (mayor ObjectId)
+        entry = (score, post_id)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    return sorted(heap, reverse=True), total
+
+##############################################
+################## Snippets ##################
+##############################################
+
+# Fragmento corto del contenido alrededor de la zona con más coincidencias.
+# Devuelve (texto, [[inicio, fin], ...]) con las posiciones a resaltar,
+# contadas en caracteres (code points) del fragmento.
+def make_snippet(text, terms, max_words=SNIPPET_WORDS):
+    text = text or ""
+    words = list(TOKEN_RE.finditer(text))
+    if not words:
+        return "", []
+
+    terms = set(terms)
+    hits = [i for i, word in enumerate(words) if normalize(word.group()) in terms]
+
+    # Ventana de max_words palabras que contiene más coincidencias
+    first = 0
+    best = 0
+    end = 0
+    for start_index, hit in enumerate(hits):
+        while end < len(hits) and hits[end] < hit + max_words:
+            end += 1
+        if end - start_index > best:
+            best = end - start_index
+            first = hit
+    first = max(0, min(first - SNIPPET_CONTEXT, len(words) - max_words))
+    last = min(first + max_words, len(words)) - 1
+
+    start = words[first].start()
+    stop = words[last].end()
+    snippet = text[start:stop]
+    highlights = [
+        [word.start() - start, word.end() - start]
+        for word in words[first:last + 1]
+        if normalize(word.group()) in terms
+    ]
+
+    prefix = "…" if first > 0 else ""
+    suffix = "…" if last < len(words) - 1 else ""
+    if prefix:
+        highlights = [[a + len(prefix), b + len(prefix)] for a, b in highlights]
+    return prefix + snippet + suffix, highlights
+
+##############################################
+################### Query ####################
+##############################################
+
+# Busca los posts publicados que contienen todos los términos, ordenados por
+# relevancia. Devuelve (posts de la página con snippet, total de coincidencias).
+def search_page(db, query, page=1, limit=10):
+    terms = query_terms(query)
+    offset = (page - 1) * limit
+    ranked, total = top_matches(db, terms, min(offset + limit, MAX_SEARCH_RESULTS))
+    ranked = ranked[offset:offset + limit]
+    if not ranked:
+        return [], total
+
+    # Solo se lee el contenido de los posts de la página, para el snippet
+    post_ids = [post_id for _, post_id in ranked]
+    posts = {
+        post["_id"]: post
+        for post in db.posts.find({"_id": {"$in": post_ids}, "status": "published"}, {"comments": 0})
+    }
+
+    results = []
+    for score, post_id in ranked:
+        post = posts.get(post_id)
+        if not post:
+            continue
+        snippet, highlights = make_snippet(post.pop("content", ""), terms)
+        post.update({"score": round(score, 4), "snippet": snippet, "highlights": highlights})
+        results.append(post)
+    return results, total
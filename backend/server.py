@@ -1,86 +1,157 @@
 # Libraries
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, Response, request, jsonify
 from http import HTTPStatus
-from config import db
+from config import db, mongo, mongo_settings
+from search import index_post, remove_post, search_page, rebuild_index
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, parse_pagination, parse_with_total, fetch_page, page_info
+from counters import (
+    status_key, author_key, get_count, record_post_created, record_post_deleted,
+    record_status_change, rebuild_counters
+)
+from views import create_view_counter
+from content import BACKFILL_BATCH_SIZE, content_metadata, backfill_metadata
+from slugs import create_slug, slug_filter, write_with_slug, repair_slugs
+from post_writes import (
+    INITIAL_VERSION, SEARCH_FIELDS, expected_version, owned_filter, post_changes, update_pipeline, changed_fields,
+    updated_post, write_failure
+)
+from json_provider import json_provider
+from posts import (
+    SUMMARY_FIELDS, parse_fields, projection, select_fields, parse_list_args, list_filter, list_response, post_response, with_view,
+    parse_batch_keys, batch_filter, batch_projection, batch_response
+)
+from http_cache import Compressor, conditional_response
+from metrics import Metrics
+from mongo_monitor import command_monitor
+from profiler import SamplingProfiler, flamegraph_svg
+from cache import (
+    ResponseCache, USER_CACHE_SIZE, USER_CACHE_TTL, author_tag, post_tag, comments_tag,
+    views_tag, user_tag, post_list_tags
+)
+from schema import ensure_indexes, audit_query_plans
+from likes import add_like, remove_like, parse_status_ids, liked_post_ids, repair_likes
+from comments import (
+    comment_object_id, thread_fields, descendants_filter, fetch_replies, top_level_comments,
+    migrate_embedded_comments
+)
 from flask_cors import CORS
+import click
 import os
 import datetime
 from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, create_access_token
-import re
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-from memory_profiler import profile
+from google_auth import CertificateCache, GoogleTokenVerifier
 
-app = Flask(__name__)
-CORS(app)  # Warning: this enables CORS for all origins
+# Rutas y comandos de la API; create_app los registra en la aplicación
+api = Blueprint("api", __name__, cli_group=None)
+jwt = JWTManager()
 
-# Configuración de JWT
-app.config['JWT_SECRET_KEY'] = os.getenv("JWT_SECRET_KEY", "your-secret-key")  # Cambiar en producción
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = datetime.timedelta(days=7)  # Los tokens expiran en 7 días
-jwt = JWTManager(app)
+# Métricas de las peticiones en /metrics (desactivar con METRICS_ENABLED=0)
+metrics = Metrics()
+
+# Perfilador por muestreo de las peticiones lentas (descarga en /api/admin/profiles)
+profiler = SamplingProfiler()
+
+# Compresión gzip/brotli de las respuestas JSON grandes
+compressor = Compressor()
 
 # Configuración de Google OAuth
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 
+# Usuarios con acceso a los endpoints de administración (ids separados por comas)
+ADMIN_USER_IDS = set(filter(None, os.getenv("ADMIN_USER_IDS", "").split(",")))
+
 ##############################################
 ################## Utils #####################
 ##############################################
 
-# Fix the id from MongoDB
-def fix_id(obj):
-    if obj and "_id" in obj:
-        obj["_id"] = str(obj["_id"])
-    return obj
-
-# Fix all IDs in an array of objects
-def fix_ids(objects):
-    return [fix_id(obj) for obj in objects]
+# Caché de respuestas de los endpoints de lectura, invalidada por los de escritura
+response_cache = ResponseCache()
+
+# Vistas de posts: se acumulan en memoria y se vuelcan periódicamente en bloque
+view_counter = create_view_counter(
+    lambda: db.posts,
+    on_flush=lambda post_ids: response_cache.invalidate(*map(views_tag, post_ids))
+)
+
+# Perfiles de usuario en memoria: login invalida el perfil cuando cambia
+user_cache = ResponseCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+# Estado de las cachés y del contador de vistas para /metrics
+def cache_metrics():
+    caches = {**response_cache.stats(), **user_cache.stats()}
+    views = view_counter.stats()
+    return [
+        (f"cache_{name}_total", "counter", f"Response cache {name} by endpoint.", [
+            ((("endpoint", endpoint),), stats[name]) for endpoint, stats in caches.items()
+        ])
+        for name in ("hits", "misses", "evictions")
+    ] + [
+        ("views_pending", "gauge", "Buffered post views not yet flushed.", [((), views["pendingViews"])]),
+        ("views_flush_lag_seconds", "gauge", "Age of the oldest buffered view.", [((), views["lagSeconds"])])
+    ]
 
-# Get user data from database
+metrics.add_collector(cache_metrics)
+
+# Campos del perfil de usuario (los que guarda user_cache)
+PROFILE_FIELDS = ("name", "email", "profilePicture")
+
+# Perfil público de un documento de users
+def user_profile(user):
+    return {
+        "userId": user["userId"],
+        "name": user["name"],
+        "email": user.get("email"),
+        "profilePicture": user.get("profilePicture")
+    }
+
+# Documento de users a partir de un ID token de Google verificado
+def google_user(idinfo):
+    return {
+        "userId": idinfo["sub"],
+        "name": idinfo.get("name", ""),
+        "email": idinfo.get("email", ""),
+        "profilePicture": idinfo.get("picture", ""),
+        "lastLogin": datetime.datetime.now(datetime.UTC).isoformat()
+    }
+
+# Get user data from database (or from the profile cache)
 def get_user_data(user_id):
-    user = db.users.find_one({"userId": user_id})
-    if user:
-        return {
-            "userId": user["userId"],
-            "name": user["name"],
-            "email": user.get("email"),
-            "profilePicture": user.get("profilePicture")
-        }
-    return None
-
-# Create slug from title
-def create_slug(title):
-    # Convertir a minúsculas y reemplazar espacios por guiones
-    slug = title.lower().replace(" ", "-")
-    # Eliminar caracteres especiales
-    slug = re.sub(r'[^a-z0-9-]', '', slug)
-    return slug
+    def load():
+        user = db.users.find_one({"userId": user_id})
+        if user:
+            return user_profile(user), [user_tag(user_id)]
+        return None, ()
 
-# Calculate read time
-def calculate_read_time(content):
-    words = len(content.split())
-    return max(1, round(words / 200))  # Asumiendo 200 palabras por minuto
+    profile = user_cache.get_or_load("users", user_id, load)
+    return dict(profile) if profile else None
 
 ##############################################
 ################ ENDPOINTS ###################
 ##############################################
 
 # Home page
-@app.get("/")
+@api.get("/")
 def home():
     return "<h1>Talkify API - Backend en Flask para la plataforma de blogs</h1>", HTTPStatus.OK
 
-# Autenticación con Google
-from functools import lru_cache
-
-# Reutilizar el request de Google para validación
-@lru_cache()
-def get_google_request():
-    return google_requests.Request()
-
-@app.post("/api/auth/login")
-@profile  # Quitar esto en producción
+# Estado del servidor (incluye el retraso del volcado de vistas y la caché de respuestas)
+@api.get("/api/health")
+def health():
+    return {
+        "status": "ok",
+        "views": view_counter.stats(),
+        "cache": {**response_cache.stats(), **user_cache.stats()},
+        "googleTokens": google_tokens.stats()
+    }, HTTPStatus.OK
+
+# Autenticación con Google: certificados en memoria (renovados en segundo plano)
+# y tokens ya verificados guardados hasta que caducan
+google_certs = CertificateCache()
+google_tokens = GoogleTokenVerifier(GOOGLE_CLIENT_ID, google_certs)
+
+@api.post("/api/auth/login")
 def login():
     try:
         data = request.get_json()
@@ -88,23 +159,20 @@ def login():
         if not token:
             return {"error": "Token is required"}, HTTPStatus.BAD_REQUEST
 
-        # Verificar token solo una vez
-        idinfo = id_token.verify_oauth2_token(token, get_google_request(), GOOGLE_CLIENT_ID)
+        # Verificar token (o reutilizar la verificación si ya se hizo)
+        idinfo = google_tokens.verify(token)
 
         # Datos del usuario
-        user_id = idinfo["sub"]
-        user = {
-            "userId": user_id,
-            "name": idinfo.get("name", ""),
-            "email": idinfo.get("email", ""),
-            "profilePicture": idinfo.get("picture", ""),
-            "lastLogin": datetime.datetime.now(datetime.UTC).isoformat()
-        }
+        user = google_user(idinfo)
+        user_id = user["userId"]
 
         # Solo actualizar si hay cambios
         existing_user = db.users.find_one({"userId": user_id})
         if not existing_user or any(user.get(k) != existing_user.get(k) for k in user):
             db.users.update_one({"userId": user_id}, {"$set": user}, upsert=True)
+        # lastLogin cambia en cada login; el perfil en caché solo si cambian sus datos
+        if existing_user and any(user[k] != existing_user.get(k) for k in PROFILE_FIELDS):
+            user_cache.invalidate(user_tag(user_id))
 
         # Crear token JWT
         token = create_access_token(identity=user_id)
@@ -114,83 +182,84 @@ def login():
         return {"error": str(e)}, HTTPStatus.UNAUTHORIZED
 
 # GET (get all posts)
-from math import ceil
-
-@app.get("/api/posts")
-@profile  # Quitar en producción
+@api.get("/api/posts")
 def get_posts():
     try:
         # Validar parámetros de consulta
         try:
-            page = max(1, int(request.args.get("page", 1)))
-            limit = max(1, min(50, int(request.args.get("limit", 10))))  # evitar abusos con limit muy alto
+            status, page, limit, cursor, with_total = parse_list_args(request.args)
         except ValueError:
             return {"error": "Invalid pagination values"}, HTTPStatus.BAD_REQUEST
+        # Campos pedidos con ?fields= (por defecto el resumen, sin contenido)
+        fields = parse_fields(request.args, SUMMARY_FIELDS)
 
-        status = request.args.get("status", "published")
-        skip = (page - 1) * limit
-        filter_query = {"status": status}
+        filter_query = list_filter(status)
 
-        # Usar proyección para excluir campos pesados
-        projection = {
-            "content": 0,
-            "comments": 0
-        }
+        def load():
+            # Total desde los contadores mantenidos (o ninguno si withTotal=false)
+            total = get_count(db, status_key(status), filter_query) if with_total else None
+            posts, next_cursor = fetch_page(db.posts, filter_query, projection(fields), page, limit, cursor)
+            return list_response(status, posts, total, page, limit, next_cursor, fields)
 
-        total = db.posts.count_documents(filter_query)
-        cursor = db.posts.find(filter_query, projection).sort("createdAt", -1).skip(skip).limit(limit)
-        posts = fix_ids(list(cursor))
-
-        return jsonify({
-            "posts": posts,
-            "pagination": {
-                "total": total,
-                "page": page,
-                "limit": limit,
-                "totalPages": ceil(total / limit) if limit else 1
-            }
-        }), HTTPStatus.OK
+        representation = response_cache.get_or_load("posts", (status, page, limit, cursor, with_total, fields), load)
+        return conditional_response(representation)
+
+    except Exception as e:
+        return {"error": str(e)}, HTTPStatus.BAD_REQUEST
+
+# GET/POST (get many posts by id or slug in one query)
+#   GET /api/posts/batch?ids=<id>,<slug>,...
+#   POST /api/posts/batch {"ids": [...]}  (para listas que no caben en la URL)
+# Como los listados, devuelve el resumen por defecto y no cuenta vistas.
+@api.get("/api/posts/batch")
+@api.post("/api/posts/batch")
+def get_posts_batch():
+    try:
+        if request.method == "POST":
+            keys = parse_batch_keys((request.get_json() or {}).get("ids"))
+        else:
+            keys = parse_batch_keys(request.args.get("ids", ""))
+        fields = parse_fields(request.args, SUMMARY_FIELDS)
 
+        posts = db.posts.find(batch_filter(keys), batch_projection(fields))
+        return conditional_response(batch_response(keys, posts, fields))
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # GET (get post by id)
-@app.get("/api/posts/<id>")
+@api.get("/api/posts/<id>")
 def get_post_by_id(id):
     try:
-        post = db.posts.find_one({"_id": ObjectId(id)})
+        fields = parse_fields(request.args)
+        post = db.posts.find_one({"_id": ObjectId(id)}, projection(fields))
         if post:
-            # Incrementar contador de vistas
-            db.posts.update_one({"_id": ObjectId(id)}, {"$inc": {"views": 1}})
-            post["views"] += 1  # Actualizar el objeto antes de devolverlo
-            return jsonify(fix_id(post)), HTTPStatus.OK
+            # Contar la vista en el buffer (sin escribir en el documento)
+            return jsonify(with_view(post, post["_id"], view_counter, fields)), HTTPStatus.OK
         return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # GET (get post by slug)
-@app.get("/api/posts/slug/<slug>")
-@profile  # solo en desarrollo
+@api.get("/api/posts/slug/<slug>")
 def get_post_by_slug(slug):
     try:
-        post = db.posts.find_one_and_update(
-            {"slug": slug},
-            {"$inc": {"views": 1}},
-            return_document=True  # devuelve el documento actualizado
+        fields = parse_fields(request.args)
+        representation = response_cache.get_or_load(
+            "post_by_slug", (slug, fields),
+            lambda: post_response(db.posts.find_one(slug_filter(slug), projection(fields)), view_counter, fields)
         )
-
-        if post:
-            post["views"] += 1  # para reflejar el cambio exacto en la respuesta
-            return jsonify(fix_id(post)), HTTPStatus.OK
+        if representation:
+            # Contar la vista en el buffer (también si viene de la caché o se responde 304)
+            view_counter.record(representation.body["_id"])
+            return conditional_response(representation)
         return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
 
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # POST (create a new post)
-@app.post("/api/posts")
+@api.post("/api/posts")
 @jwt_required()
-@profile  # Solo en desarrollo
 def save_post():
     try:
         post_data = request.get_json()
@@ -208,38 +277,36 @@ def save_post():
         if not user_data:
             return {"error": "User not found"}, HTTPStatus.UNAUTHORIZED
 
-        # Crear slug y verificar existencia en una sola operación
-        base_slug = create_slug(title)
-        slug = base_slug
-
-        suffix_attempts = 0
-        while db.posts.find_one({"slug": slug}):
-            suffix_attempts += 1
-            slug = f"{base_slug}-{str(ObjectId())[-6:]}"
-            if suffix_attempts > 3:
-                return {"error": "Failed to generate unique slug"}, HTTPStatus.CONFLICT
-
-        # Calcular tiempo de lectura
-        read_time = max(1, round(len(content.split()) / 200))
-
         now = datetime.datetime.now(datetime.UTC).isoformat()
         post = {
             "title": title,
             "content": content,
             "author": user_data,
-            "slug": slug,
             "createdAt": now,
             "updatedAt": now,
             "status": post_data.get("status", "published"),
-            "readTime": read_time,
+            "version": INITIAL_VERSION,
+            # wordCount, readTime, excerpt y contentHash
+            **content_metadata(content),
             "views": 0,
             "likes": 0,
-            "comments": [],
+            "commentCount": 0,
             "coverImage": post_data.get("coverImage") or None
         }
 
-        result = db.posts.insert_one(post)
-        post["_id"] = str(result.inserted_id)
+        # Insertar con el slug del título; si está ocupado, con el siguiente sufijo
+        def insert(slug):
+            post.update(slug=slug, slugs=[slug])
+            return db.posts.insert_one(post)
+
+        try:
+            result, _ = write_with_slug(db, create_slug(title), insert)
+        except DuplicateKeyError:
+            return {"error": "Failed to generate unique slug"}, HTTPStatus.CONFLICT
+        post["_id"] = result.inserted_id
+        index_post(db, post)
+        record_post_created(db, post)
+        response_cache.invalidate(*post_list_tags(post))
 
         return jsonify(post), HTTPStatus.CREATED
 
@@ -247,100 +314,134 @@ def save_post():
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # PUT (update a post)
-@app.put("/api/posts/<id>")
+@api.put("/api/posts/<id>")
 @jwt_required()
-@profile  # solo en desarrollo
 def update_post(id):
     try:
         data = request.get_json()
         user_id = get_jwt_identity()
 
-        # Obtener post actual
-        post = db.posts.find_one({"_id": ObjectId(id)})
-        if not post:
-            return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
-
-        if post["author"]["userId"] != user_id:
-            return {"error": "Unauthorized: you can only edit your own posts"}, HTTPStatus.UNAUTHORIZED
-
-        update_data = {}
-        title = data.get("title", "").strip()
-        content = data.get("content", "").strip()
-
-        # Actualizar título y slug si cambió
-        if title and title != post.get("title"):
-            update_data["title"] = title
-            new_slug = create_slug(title)
+        version = expected_version(data)
 
-            # Evitar duplicado de slug
-            if new_slug != post.get("slug"):
-                if db.posts.find_one({"slug": new_slug, "_id": {"$ne": ObjectId(id)}}):
-                    new_slug += f"-{str(ObjectId())[-6:]}"
-                update_data["slug"] = new_slug
-
-        # Actualizar contenido y recalcular tiempo de lectura si cambió
-        if content and content != post.get("content"):
-            update_data["content"] = content
-            update_data["readTime"] = calculate_read_time(content)
-
-        # Otros campos simples
-        for field in ["status", "coverImage"]:
-            if field in data:
-                update_data[field] = data[field]
-
-        if not update_data:
+        # Campos que cambian (título, contenido y sus metadatos, estado, portada)
+        changes, title = post_changes(data)
+        if not changes:
             return {"message": "No changes detected"}, HTTPStatus.OK
+        slug = create_slug(title) if title else None
+        now = datetime.datetime.now(datetime.UTC).isoformat()
 
-        update_data["updatedAt"] = datetime.datetime.now(datetime.UTC).isoformat()
+        # Una sola operación: solo se aplica si el post es del usuario y sigue
+        # en la versión que editó; devuelve el documento anterior. Si otro post
+        # tiene el slug del nuevo título se reintenta con el siguiente sufijo.
+        query = owned_filter(id, user_id, version)
 
-        db.posts.update_one({"_id": ObjectId(id)}, {"$set": update_data})
+        def update(slug):
+            return db.posts.find_one_and_update(query, update_pipeline(changes, slug, now))
 
-        # Solo devolver lo que cambió si prefieres evitar otra lectura
-        updated_post = db.posts.find_one({"_id": ObjectId(id)})
-        return jsonify(fix_id(updated_post)), HTTPStatus.OK
+        try:
+            post, slug = write_with_slug(db, slug, update) if slug else (update(None), None)
+        except DuplicateKeyError:
+            return {"error": "Failed to generate unique slug"}, HTTPStatus.CONFLICT
+        if not post:
+            return write_failure(db.posts, id, user_id, "edit")
+
+        updated = updated_post(post, changes, slug, now)
+        changed = changed_fields(post, changes)
+        if not changed:
+            # Mismos valores: ni versión nueva ni cachés ni índice que actualizar
+            return jsonify(updated), HTTPStatus.OK
+
+        invalidated = [post_tag(id)]
+        if "status" in changed:
+            record_status_change(db, user_id, post["status"], updated["status"])
+            # El post sale de las listas de un estado y entra en las del otro
+            invalidated += post_list_tags(post) + post_list_tags(post, updated["status"])
+        response_cache.invalidate(*invalidated)
+
+        # Reindexar solo si cambió algo que indexa la búsqueda
+        if changed.intersection(SEARCH_FIELDS):
+            index_post(db, updated)
+        return jsonify(updated), HTTPStatus.OK
 
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # DELETE (delete a post)
-@app.delete("/api/posts/<id>")
+@api.delete("/api/posts/<id>")
 @jwt_required()
 def delete_post(id):
     try:
         user_id = get_jwt_identity()
+        version = expected_version(request.args)  # DELETE /api/posts/<id>?version=3
         
-        # Verificar si el post existe y pertenece al usuario
-        post = db.posts.find_one({"_id": ObjectId(id)})
+        # Borrar solo si el post es del usuario (y está en la versión indicada),
+        # leyendo del documento borrado lo que necesitan contadores y caché
+        post = db.posts.find_one_and_delete(
+            owned_filter(id, user_id, version), projection={"author.userId": 1, "status": 1}
+        )
         if not post:
-            return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
-            
-        if post["author"]["userId"] != user_id:
-            return {"error": "Unauthorized: you can only delete your own posts"}, HTTPStatus.UNAUTHORIZED
-        
-        result = db.posts.delete_one({"_id": ObjectId(id)})
-        if result.deleted_count:
-            # También eliminar los likes asociados
-            db.post_likes.delete_many({"postId": id})
-            return {"message": "Post deleted successfully"}, HTTPStatus.OK
-        return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
+            return write_failure(db.posts, id, user_id, "delete")
+        
+        # También eliminar los likes y comentarios asociados y sacarlo del índice de búsqueda
+        db.post_likes.delete_many({"postId": id})
+        db.comments.delete_many({"postId": ObjectId(id)})
+        remove_post(db, id)
+        record_post_deleted(db, post)
+        response_cache.invalidate(post_tag(id), comments_tag(id), *post_list_tags(post))
+        return {"message": "Post deleted successfully"}, HTTPStatus.OK
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
-# GET (get comments for a post)
-@app.get("/api/posts/<post_id>/comments")
+# GET (get top-level comments for a post, paginated with ?cursor=)
+@api.get("/api/posts/<post_id>/comments")
 def get_comments(post_id):
     try:
-        post = db.posts.find_one({"_id": ObjectId(post_id)})
-        if not post:
+        try:
+            page, limit, cursor = parse_pagination(request.args)
+        except ValueError:
+            return {"error": "Invalid pagination values"}, HTTPStatus.BAD_REQUEST
+
+        def load():
+            response = top_level_comments(db, post_id, page, limit, cursor)
+            return response, [comments_tag(post_id)] if response else ()
+
+        response = response_cache.get_or_load("comments", (post_id, page, limit, cursor), load)
+        if response is None:
             return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
-        
-        comments = post.get("comments", [])
-        return jsonify(comments), HTTPStatus.OK
+        return jsonify(response), HTTPStatus.OK
+    except Exception as e:
+        return {"error": str(e)}, HTTPStatus.BAD_REQUEST
+
+# GET (get the replies of a comment, whole subtree in thread order, paginated with ?cursor=)
+@api.get("/api/posts/<post_id>/comments/<comment_id>/replies")
+def get_comment_replies(post_id, comment_id):
+    try:
+        try:
+            limit = max(1, min(MAX_LIMIT, int(request.args.get("limit", DEFAULT_LIMIT))))
+        except ValueError:
+            return {"error": "Invalid pagination values"}, HTTPStatus.BAD_REQUEST
+
+        comment = db.comments.find_one(
+            {"_id": comment_object_id(comment_id), "postId": ObjectId(post_id)},
+            {"path": 1}
+        )
+        if not comment:
+            return {"error": "Comment not found"}, HTTPStatus.NOT_FOUND
+
+        # Una sola consulta por rango sobre (postId, path)
+        try:
+            replies, next_cursor = fetch_replies(
+                db.comments, ObjectId(post_id), comment["path"], limit, request.args.get("cursor")
+            )
+        except ValueError:
+            return {"error": "Invalid pagination values"}, HTTPStatus.BAD_REQUEST
+
+        return jsonify({"replies": replies, "nextCursor": next_cursor}), HTTPStatus.OK
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # POST (create a comment for a post)
-@app.post("/api/posts/<post_id>/comments")
+@api.post("/api/posts/<post_id>/comments")
 @jwt_required()
 def create_comment(post_id):
     try:
@@ -357,9 +458,22 @@ def create_comment(post_id):
         if not user_data:
             return {"error": "User not found"}, HTTPStatus.UNAUTHORIZED
         
+        # Si es una respuesta, leer la ruta del comentario padre
+        parent = None
+        if comment_data.get("parentId"):
+            parent = db.comments.find_one(
+                {"_id": comment_object_id(comment_data["parentId"]), "postId": ObjectId(post_id)},
+                {"path": 1, "depth": 1}
+            )
+            if not parent:
+                return {"error": "Parent comment not found"}, HTTPStatus.NOT_FOUND
+        
         # Crear el comentario
+        comment_id = ObjectId()
         comment = {
-            "_id": str(ObjectId()),  # Generar ID único para el comentario
+            "_id": comment_id,
+            **thread_fields(comment_id, parent),
+            "postId": ObjectId(post_id),
             "content": comment_data["content"],
             "author": {
                 "userId": user_data["userId"],
@@ -367,112 +481,121 @@ def create_comment(post_id):
                 "profilePicture": user_data.get("profilePicture")
             },
             "createdAt": datetime.datetime.now(datetime.UTC).isoformat(),
-            "likes": 0
+            "likes": 0,
+            "replyCount": 0
         }
         
-        # Añadir el comentario al post
-        result = db.posts.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$push": {"comments": comment}}
-        )
-        
-        if result.matched_count:
-            return jsonify(comment), HTTPStatus.CREATED
-        return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
+        # Guardar el comentario antes de contarlo; si algo falla después se
+        # deshace, así que commentCount y replyCount nunca cuentan uno que no existe
+        db.comments.insert_one(comment)
+        counted = False
+        try:
+            # Sumar el comentario al contador del post (y comprobar que exista)
+            result = db.posts.update_one(
+                {"_id": ObjectId(post_id)},
+                {"$inc": {"commentCount": 1}}
+            )
+            if not result.matched_count:
+                db.comments.delete_one({"_id": comment_id})
+                return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
+            counted = True
+            if parent:
+                db.comments.update_one({"_id": parent["_id"]}, {"$inc": {"replyCount": 1}})
+        except Exception:
+            db.comments.delete_one({"_id": comment_id})
+            if counted:
+                db.posts.update_one({"_id": ObjectId(post_id)}, {"$inc": {"commentCount": -1}})
+            raise
+        response_cache.invalidate(comments_tag(post_id), post_tag(post_id))
+        comment.pop("postId")
+        return jsonify(comment), HTTPStatus.CREATED
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # DELETE (delete a comment from a post)
-@app.delete("/api/posts/<post_id>/comments/<comment_id>")
+@api.delete("/api/posts/<post_id>/comments/<comment_id>")
 @jwt_required()
 def delete_comment(post_id, comment_id):
     try:
         user_id = get_jwt_identity()
         
-        # Verificar si el post existe
-        post = db.posts.find_one({"_id": ObjectId(post_id)})
-        if not post:
-            return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
-        
-        # Encontrar el comentario
-        comment = next((c for c in post.get("comments", []) if c["_id"] == comment_id), None)
+        # Borrar el comentario si es del usuario, sin leerlo antes
+        comment_filter = {"_id": comment_object_id(comment_id), "postId": ObjectId(post_id)}
+        fields = {"path": 1, "parentId": 1, "replyCount": 1}
+        comment = db.comments.find_one_and_delete({**comment_filter, "author.userId": user_id}, projection=fields)
         if not comment:
-            return {"error": "Comment not found"}, HTTPStatus.NOT_FOUND
-        
-        # Verificar permisos: solo el autor del comentario o el autor del post puede eliminarlo
-        if comment["author"]["userId"] != user_id and post["author"]["userId"] != user_id:
-            return {"error": "Unauthorized: you can only delete your own comments"}, HTTPStatus.UNAUTHORIZED
-        
-        # Eliminar el comentario
-        result = db.posts.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$pull": {"comments": {"_id": comment_id}}}
-        )
-        
-        if result.modified_count:
-            return {"message": "Comment deleted successfully"}, HTTPStatus.OK
-        return {"error": "Comment not found"}, HTTPStatus.NOT_FOUND
+            # Solo el autor del comentario o el autor del post puede eliminarlo
+            if not db.comments.find_one(comment_filter, {"_id": 1}):
+                return {"error": "Comment not found"}, HTTPStatus.NOT_FOUND
+            if not db.posts.find_one({"_id": ObjectId(post_id), "author.userId": user_id}, {"_id": 1}):
+                return {"error": "Unauthorized: you can only delete your own comments"}, HTTPStatus.UNAUTHORIZED
+            comment = db.comments.find_one_and_delete(comment_filter, projection=fields)
+            if not comment:
+                return {"error": "Comment not found"}, HTTPStatus.NOT_FOUND
+        
+        # Borrar sus respuestas (si tiene) y descontarlas del post
+        deleted = 1
+        if comment.get("replyCount"):
+            deleted += db.comments.delete_many(descendants_filter(ObjectId(post_id), comment["path"])).deleted_count
+        db.posts.update_one({"_id": ObjectId(post_id)}, {"$inc": {"commentCount": -deleted}})
+        if comment.get("parentId"):
+            db.comments.update_one({"_id": comment["parentId"]}, {"$inc": {"replyCount": -1}})
+        response_cache.invalidate(comments_tag(post_id), post_tag(post_id))
+        return {"message": "Comment deleted successfully"}, HTTPStatus.OK
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # Endpoint para dar like a un post
-@app.post("/api/posts/<post_id>/like")
+@api.post("/api/posts/<post_id>/like")
 @jwt_required()
 def like_post(post_id):
     try:
         user_id = get_jwt_identity()
         
-        # Verificar si el post existe
-        post = db.posts.find_one({"_id": ObjectId(post_id)})
-        if not post:
+        # El índice único (postId, userId) impide duplicados sin comprobar antes
+        added = add_like(db, post_id, user_id)
+        if added is False:
+            return {"message": "Post already liked"}, HTTPStatus.OK
+        if added is None:
             return {"error": "Post not found"}, HTTPStatus.NOT_FOUND
         
-        # Añadir el like y el usuario a la lista de likes (si no existe ya)
-        if not db.post_likes.find_one({"postId": post_id, "userId": user_id}):
-            db.post_likes.insert_one({
-                "postId": post_id,
-                "userId": user_id,
-                "createdAt": datetime.datetime.now(datetime.UTC).isoformat()
-            })
-            
-            # Incrementar contador de likes
-            db.posts.update_one(
-                {"_id": ObjectId(post_id)},
-                {"$inc": {"likes": 1}}
-            )
-            
-            return {"message": "Post liked successfully"}, HTTPStatus.OK
-        else:
-            return {"message": "Post already liked"}, HTTPStatus.OK
+        response_cache.invalidate(post_tag(post_id))
+        return {"message": "Post liked successfully"}, HTTPStatus.OK
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # Endpoint para quitar like de un post
-@app.delete("/api/posts/<post_id>/like")
+@api.delete("/api/posts/<post_id>/like")
 @jwt_required()
 def unlike_post(post_id):
     try:
         user_id = get_jwt_identity()
         
-        # Verificar si existe el like
-        if db.post_likes.find_one({"postId": post_id, "userId": user_id}):
-            # Eliminar el like
-            db.post_likes.delete_one({"postId": post_id, "userId": user_id})
-            
-            # Decrementar contador de likes
-            db.posts.update_one(
-                {"_id": ObjectId(post_id)},
-                {"$inc": {"likes": -1}}
-            )
-            
-            return {"message": "Post unliked successfully"}, HTTPStatus.OK
-        else:
+        # Eliminar el like; solo si existía se descuenta del post
+        if not remove_like(db, post_id, user_id):
             return {"message": "Post was not liked"}, HTTPStatus.OK
+        
+        response_cache.invalidate(post_tag(post_id))
+        
+        return {"message": "Post unliked successfully"}, HTTPStatus.OK
+    except Exception as e:
+        return {"error": str(e)}, HTTPStatus.BAD_REQUEST
+
+# Endpoint para saber a cuáles de varios posts dio like el usuario (una página del feed)
+@api.post("/api/posts/likes/status")
+@jwt_required()
+def check_likes():
+    try:
+        user_id = get_jwt_identity()
+        post_ids = parse_status_ids(request.get_json())
+        
+        liked = liked_post_ids(db, user_id, post_ids)
+        return {"liked": {post_id: post_id in liked for post_id in post_ids}}, HTTPStatus.OK
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # Endpoint para verificar si un usuario dio like a un post
-@app.get("/api/posts/<post_id>/like")
+@api.get("/api/posts/<post_id>/like")
 @jwt_required()
 def check_like(post_id):
     try:
@@ -486,106 +609,132 @@ def check_like(post_id):
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # Endpoint para buscar posts
-@app.get("/api/posts/search")
+@api.get("/api/posts/search")
 def search_posts():
     try:
         query = request.args.get("q", "")
         if not query:
             return {"error": "Search query is required"}, HTTPStatus.BAD_REQUEST
-        
-        # Buscar en título y contenido
-        cursor = db.posts.find({
-            "$or": [
-                {"title": {"$regex": query, "$options": "i"}},
-                {"content": {"$regex": query, "$options": "i"}}
-            ],
-            "status": "published"  # Solo buscar posts publicados
-        }).sort("createdAt", -1)
-        
-        results = fix_ids(list(cursor))
-        return jsonify(results), HTTPStatus.OK
+
+        # Los resultados van por relevancia, no por fecha: no hay cursor
+        try:
+            page, limit, _ = parse_pagination(request.args)
+        except ValueError:
+            return {"error": "Invalid pagination values"}, HTTPStatus.BAD_REQUEST
+
+        # Buscar en el índice invertido (solo contiene posts publicados),
+        # ordenado por relevancia y con un snippet en lugar del contenido
+        results, total = search_page(db, query, page, limit)
+
+        return jsonify({"posts": results, "pagination": page_info(total, page, limit, None)}), HTTPStatus.OK
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # Endpoint para obtener posts de un usuario específico
-@app.get("/api/users/<user_id>/posts")
+@api.get("/api/users/<user_id>/posts")
 def get_user_posts(user_id):
     try:
-        # Opciones de filtrado y paginación
-        page = int(request.args.get("page", 1))
-        limit = int(request.args.get("limit", 10))
+        # Opciones de filtrado y paginación (page o cursor)
+        try:
+            page, limit, cursor = parse_pagination(request.args)
+        except ValueError:
+            return {"error": "Invalid pagination values"}, HTTPStatus.BAD_REQUEST
         status = request.args.get("status", "published")
-        
-        # Calcular skip para paginación
-        skip = (page - 1) * limit
+        with_total = parse_with_total(request.args)
+        fields = parse_fields(request.args, SUMMARY_FIELDS)
         
         # Crear filtro
         filter_query = {"author.userId": user_id, "status": status}
         
-        # Obtener total de posts para paginación
-        total_posts = db.posts.count_documents(filter_query)
-        
-        # Obtener posts paginados
-        cursor = db.posts.find(filter_query).sort("createdAt", -1).skip(skip).limit(limit)
-        posts = fix_ids(list(cursor))
-        
-        response = {
-            "posts": posts,
-            "pagination": {
-                "total": total_posts,
-                "page": page,
-                "limit": limit,
-                "totalPages": (total_posts + limit - 1) // limit
+        def load():
+            # Obtener total de posts para paginación (desde los contadores)
+            total_posts = get_count(db, author_key(user_id, status), filter_query) if with_total else None
+            
+            # Obtener posts paginados (por defecto el resumen, sin contenido)
+            posts, next_cursor = fetch_page(db.posts, filter_query, projection(fields), page, limit, cursor)
+            
+            response = {
+                "posts": [select_fields(post, fields) for post in posts],
+                "pagination": page_info(total_posts, page, limit, next_cursor)
             }
-        }
+            return response, [author_tag(user_id, status)] + [post_tag(post["_id"]) for post in posts]
         
+        response = response_cache.get_or_load(
+            "user_posts", (user_id, status, page, limit, cursor, with_total, fields), load
+        )
         return jsonify(response), HTTPStatus.OK
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
 # Endpoint para obtener posts del usuario autenticado (incluyendo borradores)
-@app.get("/api/users/me/posts")
+@api.get("/api/users/me/posts")
 @jwt_required()
 def get_my_posts():
     try:
         user_id = get_jwt_identity()
         
-        # Opciones de filtrado y paginación
-        page = int(request.args.get("page", 1))
-        limit = int(request.args.get("limit", 10))
+        # Opciones de filtrado y paginación (page o cursor)
+        try:
+            page, limit, cursor = parse_pagination(request.args)
+        except ValueError:
+            return {"error": "Invalid pagination values"}, HTTPStatus.BAD_REQUEST
         status = request.args.get("status", None)  # Opcional: filtrar por estado
-        
-        # Calcular skip para paginación
-        skip = (page - 1) * limit
+        with_total = parse_with_total(request.args)
+        fields = parse_fields(request.args, SUMMARY_FIELDS)
         
         # Crear filtro
         filter_query = {"author.userId": user_id}
         if status:
             filter_query["status"] = status
         
-        # Obtener total de posts para paginación
-        total_posts = db.posts.count_documents(filter_query)
+        # Obtener total de posts para paginación (desde los contadores)
+        total_posts = get_count(db, author_key(user_id, status), filter_query) if with_total else None
         
-        # Obtener posts paginados
-        cursor = db.posts.find(filter_query).sort("createdAt", -1).skip(skip).limit(limit)
-        posts = fix_ids(list(cursor))
+        # Obtener posts paginados (por defecto el resumen, sin contenido)
+        posts, next_cursor = fetch_page(db.posts, filter_query, projection(fields), page, limit, cursor)
         
         response = {
-            "posts": posts,
-            "pagination": {
-                "total": total_posts,
-                "page": page,
-                "limit": limit,
-                "totalPages": (total_posts + limit - 1) // limit
-            }
+            "posts": [select_fields(post, fields) for post in posts],
+            "pagination": page_info(total_posts, page, limit, next_cursor)
         }
         
         return jsonify(response), HTTPStatus.OK
     except Exception as e:
         return {"error": str(e)}, HTTPStatus.BAD_REQUEST
 
+# Capturas del perfilador de peticiones lentas (solo administradores)
+@api.get("/api/admin/profiles")
+@jwt_required()
+def get_profiles():
+    if get_jwt_identity() not in ADMIN_USER_IDS:
+        return {"error": "Forbidden"}, HTTPStatus.FORBIDDEN
+    
+    captures = profiler.captures(request.args.get("route"))
+    return {
+        "thresholdMs": profiler.threshold * 1000,
+        "sampleRate": profiler.sample_rate,
+        "captures": [{k: v for k, v in c.items() if k != "stacks"} for c in captures]
+    }, HTTPStatus.OK
+
+# Pilas colapsadas (flamegraph.pl, speedscope) o flamegraph SVG de las capturas
+@api.get("/api/admin/profiles/<output>")
+@jwt_required()
+def download_profiles(output):
+    if get_jwt_identity() not in ADMIN_USER_IDS:
+        return {"error": "Forbidden"}, HTTPStatus.FORBIDDEN
+    
+    route = request.args.get("route")
+    if output == "collapsed":
+        body, mimetype, filename = profiler.collapsed(route), "text/plain", "profiles.collapsed"
+    elif output == "flamegraph":
+        body = flamegraph_svg(profiler.stacks(route), title=route or "All requests")
+        mimetype, filename = "image/svg+xml", "flamegraph.svg"
+    else:
+        return {"error": "Unknown output"}, HTTPStatus.NOT_FOUND
+    return Response(body, mimetype=mimetype, headers={"Content-Disposition": f"attachment; filename={filename}"})
+
 # Endpoint para verificar el estado de autenticación
-@app.get("/api/auth/check")
+@api.get("/api/auth/check")
 @jwt_required()
 def check_auth():
     try:
@@ -599,28 +748,109 @@ def check_auth():
         return {"error": str(e)}, HTTPStatus.UNAUTHORIZED
 
 ##############################################
-################# RUN SERVER #################
+################## CLI #######################
 ##############################################
 
-import flask_profiler
-
-# Configuración de flask-profiler
-app.config["flask_profiler"] = {
-    "enabled": True,
-    "storage": {
-        "engine": "sqlite",
-        "file": "./flask_profiler.sqlite"
-    },
-    "basicAuth": {
-        "enabled": False
-    },
-    "ignore": [
-        "^/static/.*",
-        "^/favicon.ico"
-    ]
-}
+# Reconstruir el índice de búsqueda: flask --app server search-rebuild
+@api.cli.command("search-rebuild")
+def search_rebuild_command():
+    indexed = rebuild_index(db)
+    print(f"Indexed {indexed} published posts")
+
+# Mover los comentarios embebidos a su colección: flask --app server comments-migrate
+@api.cli.command("comments-migrate")
+def comments_migrate_command():
+    migrated = migrate_embedded_comments(db)
+    print(f"Migrated {migrated} comments")
+
+# Borrar likes duplicados, crear el índice único y recalcular los contadores:
+# flask --app server likes-repair
+@api.cli.command("likes-repair")
+def likes_repair_command():
+    removed = repair_likes(db)
+    print(f"Removed {removed} duplicate likes")
+
+# Calcular los metadatos del contenido de los posts que no los tienen:
+# flask --app server content-backfill [--all] [--batch-size 500]
+@api.cli.command("content-backfill")
+@click.option("--all", "force", is_flag=True, help="Recalcular también los posts que ya los tienen")
+@click.option("--batch-size", default=BACKFILL_BATCH_SIZE, show_default=True)
+def content_backfill_command(force, batch_size):
+    updated = backfill_metadata(db, batch_size, force)
+    print(f"Updated {updated} posts")
+
+# Recalcular los contadores de posts: flask --app server counters-rebuild
+@api.cli.command("counters-rebuild")
+def counters_rebuild_command():
+    counters = rebuild_counters(db)
+    print(f"Rebuilt {counters} post counters")
+
+# Renombrar los slugs repetidos y crear sus índices únicos:
+# flask --app server slugs-repair
+@api.cli.command("slugs-repair")
+def slugs_repair_command():
+    renamed = repair_slugs(db)
+    print(f"Renamed {renamed} duplicate slugs")
+
+# Crear los índices que faltan: flask --app server schema-ensure
+# Un índice único no se crea si hay datos repetidos: el comando falla
+@api.cli.command("schema-ensure")
+def schema_ensure_command():
+    try:
+        created = ensure_indexes(db)
+    except OperationFailure as e:
+        raise click.ClickException(
+            f"Could not create indexes: {e}\n"
+            "Repeated values? Repair them with `flask --app server slugs-repair` or `likes-repair`."
+        )
+    print(f"Ensured {len(created)} indexes")
+
+# Comprobar con explain() que ninguna consulta de la API hace un COLLSCAN:
+# flask --app server schema-audit
+@api.cli.command("schema-audit")
+def schema_audit_command():
+    collscans = 0
+    for name, stages, collscan in audit_query_plans(db):
+        print(f"{'COLLSCAN' if collscan else 'ok':<8} {name}: {' <- '.join(stages)}")
+        collscans += collscan
+    if collscans:
+        raise SystemExit(f"{collscans} queries fall back to a collection scan")
+
+##############################################
+################# RUN SERVER #################
+##############################################
 
-flask_profiler.init_app(app)
+# Crear la aplicación. config sobrescribe la configuración tomada del entorno
+# (MONGO_URI, MONGO_MAX_POOL_SIZE, JWT_SECRET_KEY...). No abre conexiones: el
+# cliente de Mongo se crea en el primer uso dentro de cada proceso, así que es
+# seguro crear la aplicación antes del fork de gunicorn (--preload).
+def create_app(config=None):
+    app = Flask(__name__)
+    # orjson con ObjectId y datetime: los documentos se devuelven sin convertir
+    app.json = json_provider(app)
+    app.config.update(
+        JWT_SECRET_KEY=os.getenv("JWT_SECRET_KEY", "your-secret-key"),  # Cambiar en producción
+        JWT_ACCESS_TOKEN_EXPIRES=datetime.timedelta(days=7),  # Los tokens expiran en 7 días
+        **mongo_settings()
+    )
+    app.config.update(config or {})
+
+    CORS(app)  # Warning: this enables CORS for all origins
+    jwt.init_app(app)
+    mongo.configure({key: app.config[key] for key in mongo.settings})
+
+    metrics.init_app(app)
+    # Latencia de Mongo por forma de comando y round trips por petición
+    command_monitor.init_app(app, metrics, lambda name: db.client[name])
+    profiler.init_app(app)
+    compressor.init_app(app)
+
+    app.register_blueprint(api)
+    return app
+
+app = create_app()
 
 if __name__ == "__main__":
+    ensure_indexes(db)
+    google_certs.start()
     app.run(host="0.0.0.0", port=int(os.getenv("PORT", 5000)), debug=True)
\ No newline at end of file
@@ -0,0 +1,103 @@
+# Asignación de slugs de los posts.
+#
+# El índice único slug_unique decide qué slug queda libre: se escribe el post
+# con el slug del título y, si otro post ya lo tiene (DuplicateKeyError), se
+# reintenta con el siguiente sufijo de ese slug base ("titulo-2",
+# "titulo-3"...). Los sufijos salen de un contador por slug base en
+# slug_counters ($inc atómico), así que dos creaciones simultáneas con el
+# mismo título no compiten por el mismo sufijo ni hace falta comprobar antes
+# si el slug existe.
+#
+# Cada post guarda además en `slugs` su slug actual y los anteriores. El
+# índice único slugs_unique impide que otro post reutilice un slug antiguo, y
+# un slug antiguo de un post renombrado sigue resolviendo con una sola
+# consulta por índice (slug_filter).
+#
+# Las bases de datos anteriores a estos índices pueden tener slugs repetidos,
+# y entonces no se pueden crear: flask --app server slugs-repair los renombra.
+import re
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from schema import ensure_indexes
+
+MAX_SLUG_ATTEMPTS = 5
+SLUG_FIELDS = {"slug", "slugs"}
+
+# Create slug from title
+def create_slug(title):
+    # Convertir a minúsculas y reemplazar espacios por guiones
+    slug = title.lower().replace(" ", "-")
+    # Eliminar caracteres especiales
+    slug = re.sub(r'[^a-z0-9-]', '', slug)
+    return slug
+
+# Filtro del post con ese slug, actual o anterior (como mucho uno: ambos son únicos)
+def slug_filter(slug):
+    return {"$or": [{"slug": slug}, {"slugs": slug}]}
+
+# Siguiente sufijo para un slug base: 2, 3, 4...
+def next_suffix(db, base):
+    counter = db.slug_counters.find_one_and_update(
+        {"_id": base}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"] + 1
+
+# El error es por un slug repetido (y no por otro índice único)
+def slug_conflict(error):
+    key_pattern = (error.details or {}).get("keyPattern")
+    return key_pattern is None or bool(SLUG_FIELDS.intersection(key_pattern))
+
+# Ejecutar write(slug) con el slug base y, mientras esté ocupado, con los
+# siguientes sufijos. Devuelve (resultado de write, slug usado); si tras
+# MAX_SLUG_ATTEMPTS sigue ocupado relanza el DuplicateKeyError.
+def write_with_slug(db, base, write):
+    slug = base
+    for attempt in range(MAX_SLUG_ATTEMPTS):
+        try:
+            return write(slug), slug
+        except DuplicateKeyError as e:
+            if not slug_conflict(e) or attempt == MAX_SLUG_ATTEMPTS - 1:
+                raise
+            slug = f"{base}-{next_suffix(db, base)}"
+
+# Siguiente slug con sufijo que no usa ningún post (sin los índices únicos
+# no basta con el contador: puede haber posts "titulo-2" anteriores a él)
+def free_suffixed_slug(db, base):
+    while True:
+        slug = f"{base}-{next_suffix(db, base)}"
+        if not db.posts.find_one(slug_filter(slug), {"_id": 1}):
+            return slug
+
+# Reparar los datos anteriores a slug_unique y slugs_unique. De cada slug
+# repetido (actual o anterior) se queda el post más antiguo que lo tiene como
+# slug actual; los demás que lo usan como actual reciben "slug-N", y los que
+# solo lo tenían como anterior lo pierden. Después se crean los índices.
+# Devuelve el número de posts renombrados.
+def repair_slugs(db):
+    duplicates = db.posts.aggregate([
+        {"$sort": {"createdAt": 1, "_id": 1}},
+        {"$project": {"slug": 1, "names": {"$setUnion": [["$slug"], {"$ifNull": ["$slugs", []]}]}}},
+        {"$unwind": "$names"},
+        {"$group": {
+            "_id": "$names",
+            "posts": {"$push": {"_id": "$_id", "current": {"$eq": ["$slug", "$names"]}}},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ])
+    renamed = 0
+    for duplicate in duplicates:
+        slug = duplicate["_id"]
+        # Los que lo tienen como slug actual primero (en orden de creación)
+        posts = sorted(duplicate["posts"], key=lambda post: not post["current"])
+        for post in posts[1:]:
+            if not post["current"]:
+                db.posts.update_one({"_id": post["_id"]}, {"$pull": {"slugs": slug}})
+                continue
+            new_slug = free_suffixed_slug(db, slug)
+            db.posts.update_one({"_id": post["_id"]}, {"$set": {"slug": new_slug}, "$pull": {"slugs": slug}})
+            db.posts.update_one({"_id": post["_id"], "slugs": {"$exists": True}}, {"$addToSet": {"slugs": new_slug}})
+            renamed += 1
+
+    ensure_indexes(db, "posts")
+    return renamed
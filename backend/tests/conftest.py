@@ -69,5 +69,19 @@ def jwt_mock():
 
 @pytest.fixture
 def auth_headers():
-    """Create authentication headers for testing."""
-    return {"Authorization": "Bearer test_token"}
\ No newline at end of file
+    """Create authentication headers with a real access token for test_user_id."""
+    from flask_jwt_extended import create_access_token
+    from server import app
+    with app.app_context():
+        token = create_access_token(identity="test_user_id")
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """Start every test with empty response, user, token and count caches."""
+    from server import response_cache, user_cache, google_tokens
+    from counters import uncounted
+    response_cache.clear()
+    user_cache.clear()
+    google_tokens.clear()
+    uncounted.clear()
@@ -3,7 +3,9 @@ import json
 import datetime
 from bson.objectid import ObjectId
 from unittest.mock import patch, MagicMock
-from server import app
+from server import app, view_counter
+from posts import POST_FIELDS, projection
+from slugs import slug_filter
 
 @pytest.fixture
 def client():
@@ -17,6 +19,8 @@ def mock_db():
     """Mock the database for testing."""
     with patch('server.db') as mock_db:
         yield mock_db
+        # Volcar las vistas acumuladas contra el mock, no contra la base real
+        view_counter.flush()
 
 @pytest.fixture
 def sample_post():
@@ -54,7 +58,7 @@ def test_get_posts(client, mock_db, sample_post):
     mock_cursor = MagicMock()
     mock_cursor.sort.return_value.skip.return_value.limit.return_value = [sample_post]
     mock_db.posts.find.return_value = mock_cursor
-    mock_db.posts.count_documents.return_value = 1
+    mock_db.post_counters.find_one.return_value = {"_id": "status:published", "count": 1}
     
     # Make request
     response = client.get('/api/posts')
@@ -66,6 +70,54 @@ def test_get_posts(client, mock_db, sample_post):
     assert len(data["posts"]) == 1
     assert "pagination" in data
     assert data["pagination"]["total"] == 1
+    assert data["pagination"]["nextCursor"] is None
+    
+    # Verify the total came from the maintained counter instead of a count
+    mock_db.post_counters.find_one.assert_called_once_with({"_id": "status:published"})
+    mock_db.posts.count_documents.assert_not_called()
+
+# Test get posts without total
+def test_get_posts_without_total(client, mock_db, sample_post):
+    """Test that withTotal=false skips counting entirely."""
+    mock_cursor = MagicMock()
+    mock_cursor.sort.return_value.skip.return_value.limit.return_value = [sample_post]
+    mock_db.posts.find.return_value = mock_cursor
+    
+    response = client.get('/api/posts?withTotal=false')
+    
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data["pagination"]["total"] is None
+    assert data["pagination"]["totalPages"] is None
+    mock_db.post_counters.find_one.assert_not_called()
+    mock_db.posts.count_documents.assert_not_called()
+
+# Test get posts with a cursor
+def test_get_posts_with_cursor(client, mock_db, sample_post):
+    """Test that a cursor seeks past the previous page instead of skipping."""
+    from pagination import encode_cursor
+    previous = {"_id": ObjectId(), "createdAt": "2025-03-01T10:00:00+00:00"}
+    mock_cursor = MagicMock()
+    mock_cursor.sort.return_value.limit.return_value = [sample_post]
+    mock_db.posts.find.return_value = mock_cursor
+    mock_db.post_counters.find_one.return_value = {"count": 11}
+    
+    response = client.get(f'/api/posts?cursor={encode_cursor(previous)}')
+    
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert len(data["posts"]) == 1
+    assert data["pagination"]["nextCursor"] is None
+    filter_query = mock_db.posts.find.call_args[0][0]
+    assert filter_query["$or"][1] == {"createdAt": previous["createdAt"], "_id": {"$lt": previous["_id"]}}
+    mock_cursor.sort.return_value.skip.assert_not_called()
+
+# Test get posts with an invalid cursor
+def test_get_posts_with_invalid_cursor(client, mock_db):
+    """Test that a malformed cursor is rejected."""
+    response = client.get('/api/posts?cursor=garbage')
+    assert response.status_code == 400
+    mock_db.posts.find.assert_not_called()
 
 # Test get post by ID
 def test_get_post_by_id(client, mock_db, sample_post):
@@ -83,9 +135,10 @@ def test_get_post_by_id(client, mock_db, sample_post):
     data = json.loads(response.data)
     assert data["title"] == sample_post["title"]
     assert data["content"] == sample_post["content"]
+    assert data["views"] == 1
     
-    # Verify view count was incremented
-    mock_db.posts.update_one.assert_called_once()
+    # Verify the view was buffered instead of written to the post
+    mock_db.posts.update_one.assert_not_called()
 
 # Test get post by slug
 def test_get_post_by_slug(client, mock_db, sample_post):
@@ -101,9 +154,12 @@ def test_get_post_by_slug(client, mock_db, sample_post):
     data = json.loads(response.data)
     assert data["title"] == sample_post["title"]
     assert data["slug"] == "test-post"
+    assert data["views"] == 1
     
-    # Verify view count was incremented
-    mock_db.posts.update_one.assert_called_once()
+    # Verify the read is a plain find_one and the view was buffered
+    mock_db.posts.find_one.assert_called_once_with(slug_filter("test-post"), projection(POST_FIELDS))
+    mock_db.posts.update_one.assert_not_called()
+    mock_db.posts.find_one_and_update.assert_not_called()
 
 # Test post not found
 def test_post_not_found(client, mock_db):
@@ -122,3 +178,38 @@ def test_post_not_found(client, mock_db):
     data = json.loads(response.data)
     assert "error" in data
     assert "Post not found" in data["error"]
+
+# Test batch fetch
+def test_get_posts_batch(client, mock_db, sample_post):
+    """Test that many ids and slugs are resolved with one query, in request order."""
+    other = {**sample_post, "_id": ObjectId(), "slug": "other-post"}
+    unknown = str(ObjectId())
+    mock_db.posts.find.return_value = [other, sample_post]
+
+    response = client.get(f'/api/posts/batch?ids={sample_post["_id"]},other-post,{unknown},missing-slug')
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [post["_id"] for post in data["posts"]] == [str(sample_post["_id"]), str(other["_id"])]
+    assert data["missing"] == [unknown, "missing-slug"]
+
+    mock_db.posts.find.assert_called_once()
+    filter_query, fields = mock_db.posts.find.call_args[0]
+    assert filter_query["$or"][0] == {"_id": {"$in": [sample_post["_id"], ObjectId(unknown)]}}
+    assert "content" not in fields
+    mock_db.posts.find_one.assert_not_called()
+    assert view_counter.pending(sample_post["_id"]) == 0
+
+def test_get_posts_batch_post_variant(client, mock_db, sample_post):
+    """Test the POST variant and the batch size limit."""
+    mock_db.posts.find.return_value = [sample_post]
+
+    response = client.post('/api/posts/batch?fields=title', json={"ids": ["test-post", "test-post"]})
+
+    assert response.status_code == 200
+    assert len(json.loads(response.data)["posts"]) == 1
+    assert mock_db.posts.find.call_args[0][0] == {"slug": {"$in": ["test-post"]}}
+
+    too_many = client.post('/api/posts/batch', json={"ids": [f"post-{number}" for number in range(51)]})
+    assert too_many.status_code == 400
+    assert client.get('/api/posts/batch').status_code == 400
@@ -0,0 +1,304 @@
+import pytest
+import asyncio
+import json
+import datetime
+from unittest.mock import patch, MagicMock, AsyncMock
+from bson.objectid import ObjectId
+from flask import Flask
+from flask_jwt_extended import decode_token
+from metrics import LATENCY_BUCKETS, Metrics
+from mongo_monitor import ROUND_TRIP_BUCKETS, command_monitor
+import asgi
+from server import app as flask_app, response_cache
+
+def call(path, method="GET", query="", headers=(), body=b""):
+    """Send a request to the ASGI app and return (status, headers, body)."""
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(key.lower().encode(), value.encode()) for key, value in headers],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 50000),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    start, *chunks = sent
+    return start["status"], dict(start["headers"]), b"".join(chunk.get("body", b"") for chunk in chunks)
+
+@pytest.fixture
+def async_db():
+    """Mock of the asyncio Mongo database used by asgi.py."""
+    with patch('asgi.db') as mock_db:
+        yield mock_db
+
+@pytest.fixture
+def sample_post():
+    """A published post as stored in Mongo."""
+    return {
+        "_id": ObjectId(),
+        "title": "Test Post",
+        "slug": "test-post",
+        "status": "published",
+        "createdAt": datetime.datetime(2025, 3, 1, tzinfo=datetime.UTC).isoformat(),
+        "views": 3
+    }
+
+def async_cursor(documents):
+    """A find() result whose chained cursor resolves to documents."""
+    cursor = MagicMock()
+    for chained in (cursor.sort.return_value, cursor.sort.return_value.skip.return_value):
+        chained.limit.return_value.to_list = AsyncMock(return_value=documents)
+    return cursor
+
+def test_list_matches_flask(async_db, sample_post):
+    """Test that the async list returns the same JSON as the Flask endpoint."""
+    async_db.posts.find.return_value = async_cursor([dict(sample_post)])
+    async_db.post_counters.find_one = AsyncMock(return_value={"count": 1})
+
+    status, headers, body = call("/api/posts", query="limit=5")
+
+    with patch('server.db') as sync_db:
+        cursor = MagicMock()
+        cursor.sort.return_value.skip.return_value.limit.return_value = [dict(sample_post)]
+        sync_db.posts.find.return_value = cursor
+        sync_db.post_counters.find_one.return_value = {"count": 1}
+        response_cache.clear()
+        expected = flask_app.test_client().get("/api/posts?limit=5")
+
+    assert status == 200
+    assert json.loads(body) == expected.get_json()
+    assert headers[b"access-control-allow-origin"] == b"*"
+    projection = async_db.posts.find.call_args[0][1]
+    assert "content" not in projection and "comments" not in projection
+    assert projection["title"] == 1
+
+def test_list_validation_is_shared(async_db):
+    """Test that invalid pagination is rejected like in Flask."""
+    status, _, body = call("/api/posts", query="limit=abc")
+
+    assert status == 400
+    assert json.loads(body) == {"error": "Invalid pagination values"}
+    async_db.posts.find.assert_not_called()
+
+def test_post_by_slug_counts_view(async_db, sample_post):
+    """Test that reading a post by slug goes to the view buffer."""
+    async_db.posts.find_one = AsyncMock(return_value=dict(sample_post))
+
+    with patch('server.view_counter') as view_counter:
+        view_counter.pending.return_value = 2
+        status, headers, body = call("/api/posts/slug/test-post", headers=[("Origin", "http://localhost:3000")])
+
+    assert status == 200
+    data = json.loads(body)
+    assert data["_id"] == str(sample_post["_id"])
+    # Las pendientes más la vista de esta petición
+    assert data["views"] == 6
+    view_counter.record.assert_called_once_with(sample_post["_id"])
+    assert headers[b"access-control-allow-origin"] == b"http://localhost:3000"
+
+def test_post_not_found(async_db):
+    """Test that unknown posts return 404 and bad ids 400."""
+    async_db.posts.find_one = AsyncMock(return_value=None)
+
+    assert call(f"/api/posts/{ObjectId()}")[0] == 404
+    assert call("/api/posts/not-an-id")[0] == 400
+
+def test_other_routes_go_to_flask(async_db, mock_object_id):
+    """Test that routes without an async handler are served by Flask."""
+    status, _, body = call(f"/api/posts/{mock_object_id}/like", method="POST")
+    assert status == 401
+    assert b"msg" in body
+
+    # /api/posts/search no es /api/posts/<id>: misma prioridad de rutas que Flask
+    with patch('asgi.flask_fallback', new=AsyncMock()) as flask_fallback:
+        asyncio.run(asgi.app({"type": "http", "method": "GET", "path": "/api/posts/search"}, None, None))
+    flask_fallback.assert_called_once()
+    async_db.posts.find_one.assert_not_called()
+
+def test_flask_writes_through_wsgi_adapter(mock_object_id):
+    """Test that Flask routes keep their method, body and headers through a2wsgi."""
+    with patch('server.db') as sync_db:
+        status, headers, body = call(
+            f"/api/posts/{mock_object_id}/comments", method="POST",
+            headers=[("Content-Type", "application/json"), ("Origin", "http://localhost:3000")],
+            body=b'{"content": ""}'
+        )
+
+    # Sin token responde flask_jwt_extended, antes de leer Mongo
+    assert status == 401
+    assert headers[b"access-control-allow-origin"] == b"http://localhost:3000"
+    sync_db.posts.update_one.assert_not_called()
+
+def test_like_is_async(async_db, auth_headers, mock_object_id):
+    """Test that an authenticated like is written with the async client."""
+    async_db.post_likes.insert_one = AsyncMock()
+    async_db.posts.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+
+    with patch('server.db') as sync_db:
+        status, _, body = call(f"/api/posts/{mock_object_id}/like", method="POST", headers=auth_headers.items())
+
+    assert status == 200
+    assert json.loads(body) == {"message": "Post liked successfully"}
+    assert async_db.post_likes.insert_one.call_args[0][0]["userId"] == "test_user_id"
+    async_db.posts.update_one.assert_called_once_with({"_id": ObjectId(mock_object_id)}, {"$inc": {"likes": 1}})
+    sync_db.post_likes.insert_one.assert_not_called()
+
+def test_like_of_missing_post_is_undone(async_db, auth_headers, mock_object_id):
+    """Test that a like on a missing post is removed again."""
+    async_db.post_likes.insert_one = AsyncMock()
+    async_db.post_likes.delete_one = AsyncMock()
+    async_db.posts.update_one = AsyncMock(return_value=MagicMock(matched_count=0))
+
+    status, _, _ = call(f"/api/posts/{mock_object_id}/like", method="POST", headers=auth_headers.items())
+
+    assert status == 404
+    async_db.post_likes.delete_one.assert_called_once_with({"postId": mock_object_id, "userId": "test_user_id"})
+
+def test_like_invalid_post_id_is_not_stored(async_db, auth_headers):
+    """Test that the async like rejects a malformed id before inserting."""
+    async_db.post_likes.insert_one = AsyncMock()
+
+    status, _, _ = call("/api/posts/not-an-id/like", method="POST", headers=auth_headers.items())
+
+    assert status == 400
+    async_db.post_likes.insert_one.assert_not_called()
+
+def test_invalid_token_goes_to_flask(async_db, mock_object_id):
+    """Test that bad tokens get the flask_jwt_extended error response."""
+    status, _, body = call(
+        f"/api/posts/{mock_object_id}/like", method="DELETE", headers=[("Authorization", "Bearer not-a-token")]
+    )
+
+    assert status == 422
+    assert b"msg" in body
+    async_db.post_likes.delete_one.assert_not_called()
+
+def test_like_status_validation_is_shared(async_db, auth_headers):
+    """Test that the batch like status validates postIds like Flask."""
+    status, _, body = call(
+        "/api/posts/likes/status", method="POST", headers=auth_headers.items(), body=b'{"postIds": "abc"}'
+    )
+
+    assert status == 400
+    assert json.loads(body) == {"error": "postIds must be a list of post ids"}
+
+    async_db.post_likes.find.return_value.to_list = AsyncMock(return_value=[{"postId": "a"}])
+    status, _, body = call(
+        "/api/posts/likes/status", method="POST", headers=auth_headers.items(), body=b'{"postIds": ["a", "b"]}'
+    )
+    assert json.loads(body) == {"liked": {"a": True, "b": False}}
+
+def test_check_auth_is_async(async_db, auth_headers, common_user):
+    """Test that the session check reads the profile with the async client and caches it."""
+    async_db.users.find_one = AsyncMock(return_value=common_user)
+
+    for _ in range(2):
+        status, _, body = call("/api/auth/check", headers=auth_headers.items())
+
+    assert status == 200
+    assert json.loads(body)["userId"] == "test_user_id"
+    async_db.users.find_one.assert_called_once()
+
+def test_login_is_async(async_db):
+    """Test that login verifies the Google token off the event loop and returns a usable JWT."""
+    async_db.users.find_one = AsyncMock(return_value=None)
+    async_db.users.update_one = AsyncMock()
+    idinfo = {"sub": "google_user_id", "name": "Google User", "email": "user@example.com", "picture": ""}
+
+    with patch('server.google_tokens.verify', return_value=idinfo) as verify:
+        status, _, body = call(
+            "/api/auth/login", method="POST",
+            headers=[("Content-Type", "application/json")], body=b'{"token": "google_id_token"}'
+        )
+
+    assert status == 200
+    data = json.loads(body)
+    assert data["user"]["userId"] == "google_user_id"
+    verify.assert_called_once_with("google_id_token")
+    async_db.users.update_one.assert_called_once()
+    with flask_app.app_context():
+        assert decode_token(data["accessToken"])["sub"] == "google_user_id"
+
+def test_comments_are_async(async_db, mock_object_id):
+    """Test that the first page of comments is read with the async client."""
+    comment = {"_id": ObjectId(), "content": "Hi", "createdAt": "2025-03-01T00:00:00+00:00", "depth": 0}
+    async_db.comments.find.return_value = async_cursor([comment])
+
+    status, _, body = call(f"/api/posts/{mock_object_id}/comments")
+
+    assert status == 200
+    assert json.loads(body)["comments"][0]["content"] == "Hi"
+    assert async_db.comments.find.call_args[0][0] == {"postId": ObjectId(mock_object_id), "depth": 0}
+
+    async_db.comments.find.return_value = async_cursor([])
+    async_db.posts.find_one = AsyncMock(return_value=None)
+    response_cache.clear()
+    assert call(f"/api/posts/{mock_object_id}/comments")[0] == 404
+
+def test_batch_is_async(async_db, sample_post):
+    """Test that the batch endpoint is served with a single async query."""
+    async_db.posts.find.return_value.to_list = AsyncMock(return_value=[sample_post])
+
+    status, headers, body = call("/api/posts/batch", query="ids=test-post,gone")
+
+    assert status == 200
+    assert json.loads(body)["missing"] == ["gone"]
+    assert b"etag" in headers
+    async_db.posts.find.assert_called_once()
+
+def test_async_routes_record_request_metrics(async_db, sample_post):
+    """Test that async routes keep the in-flight gauge and the per-request Mongo metrics of Flask."""
+    test_metrics = Metrics(enabled=True)
+    test_metrics.init_app(Flask(__name__))
+    test_metrics.define("http_request_mongo_commands", "histogram", "", ROUND_TRIP_BUCKETS)
+    test_metrics.define("http_request_mongo_seconds", "histogram", "", LATENCY_BUCKETS)
+    in_flight = []
+
+    async def find_one(*args):
+        # Lo que anota CommandMonitor por cada comando de la petición
+        command_monitor.request_stats().commands += 1
+        in_flight.append(test_metrics.render())
+        return dict(sample_post)
+    async_db.posts.find_one = find_one
+
+    with patch('server.metrics', test_metrics), patch.object(command_monitor, "metrics", test_metrics), \
+            patch('server.view_counter') as view_counter:
+        view_counter.pending.return_value = 0
+        status, headers, _ = call(f"/api/posts/{sample_post['_id']}")
+
+    text = test_metrics.render()
+    route = 'method="GET",route="/api/posts/<id>"'
+    assert status == 200
+    assert b'desc="1 commands"' in headers[b"server-timing"]
+    assert f'http_requests_in_flight{{{route}}} 1' in in_flight[0]
+    assert f'http_requests_in_flight{{{route}}} 0' in text
+    assert f'http_requests_total{{{route},status="200"}} 1' in text
+    assert f'http_request_mongo_commands_sum{{{route}}} 1' in text
+    assert command_monitor.request_stats() is None
+
+def test_batch_post_reads_body(async_db, sample_post):
+    """Test the POST form of the batch endpoint, as sent by the frontend."""
+    async_db.posts.find.return_value.to_list = AsyncMock(return_value=[sample_post])
+
+    status, _, body = call(
+        "/api/posts/batch", method="POST",
+        headers=[("Content-Type", "application/json")], body=b'{"ids": ["test-post", "gone"]}'
+    )
+
+    assert status == 200
+    data = json.loads(body)
+    assert [post["slug"] for post in data["posts"]] == ["test-post"]
+    assert data["missing"] == ["gone"]
@@ -103,3 +103,53 @@ def test_login_with_invalid_token(mock_verify_token, client):
     data = json.loads(response.data)
     assert "error" in data
     assert "Invalid token" in data["error"]
+
+# Test check auth profile cache
+@patch('server.db')
+def test_check_auth_uses_profile_cache(mock_db, client, auth_headers):
+    """Test that repeated auth checks read the user profile once."""
+    mock_db.users.find_one.return_value = {"userId": "test_user_id", "name": "Test User"}
+    
+    first = client.get('/api/auth/check', headers=auth_headers)
+    second = client.get('/api/auth/check', headers=auth_headers)
+    
+    assert first.status_code == second.status_code == 200
+    assert json.loads(second.data)["name"] == "Test User"
+    mock_db.users.find_one.assert_called_once_with({"userId": "test_user_id"})
+
+# Test login invalidates changed profiles
+@patch('server.db')
+@patch('google.oauth2.id_token.verify_oauth2_token')
+def test_login_invalidates_changed_profile(mock_verify_token, mock_db, client, auth_headers, sample_google_user_info):
+    """Test that a login with a new name drops the cached profile."""
+    sample_google_user_info["sub"] = "test_user_id"
+    mock_verify_token.return_value = sample_google_user_info
+    mock_db.users.find_one.return_value = {"userId": "test_user_id", "name": "Old Name"}
+    client.get('/api/auth/check', headers=auth_headers)
+    
+    client.post('/api/auth/login', json={"token": "google_id_token"})
+    mock_db.users.find_one.return_value = {"userId": "test_user_id", "name": "Google User"}
+    response = client.get('/api/auth/check', headers=auth_headers)
+    
+    assert json.loads(response.data)["name"] == "Google User"
+
+# Test login keeps unchanged profiles cached
+@patch('server.db')
+@patch('google.oauth2.id_token.verify_oauth2_token')
+def test_login_keeps_unchanged_profile(mock_verify_token, mock_db, client, auth_headers, sample_google_user_info):
+    """Test that a login with the same profile (only lastLogin changes) keeps the cache."""
+    sample_google_user_info["sub"] = "test_user_id"
+    mock_verify_token.return_value = sample_google_user_info
+    mock_db.users.find_one.return_value = {
+        "userId": "test_user_id",
+        "name": sample_google_user_info["name"],
+        "email": sample_google_user_info["email"],
+        "profilePicture": sample_google_user_info["picture"]
+    }
+    client.get('/api/auth/check', headers=auth_headers)
+    
+    client.post('/api/auth/login', json={"token": "google_id_token"})
+    client.get('/api/auth/check', headers=auth_headers)
+    
+    # Una lectura para el primer check y otra del login; el segundo check viene de la caché
+    assert mock_db.users.find_one.call_count == 2
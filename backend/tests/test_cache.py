@@ -0,0 +1,174 @@
+import pytest
+import json
+import datetime
+from unittest.mock import patch, MagicMock
+from bson.objectid import ObjectId
+from cache import ResponseCache, post_tag, list_tag
+from server import app, view_counter
+
+@pytest.fixture
+def client():
+    """Create a test client for the app."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def mock_db():
+    """Mock the database for testing."""
+    with patch('server.db') as mock_db:
+        yield mock_db
+        view_counter.flush()
+
+@pytest.fixture
+def sample_post():
+    """Create a sample post for testing."""
+    return {
+        "_id": ObjectId(),
+        "title": "Test Post",
+        "author": {"userId": "test_user_id", "name": "Test User"},
+        "slug": "test-post",
+        "createdAt": datetime.datetime.now(datetime.UTC).isoformat(),
+        "status": "published",
+        "views": 3,
+        "likes": 0
+    }
+
+def loader(payload, tags=()):
+    """A load function that counts how many times it was called."""
+    return MagicMock(return_value=(payload, tags))
+
+def test_hit_and_miss():
+    """Test that the second read of a key is served from the cache."""
+    cache = ResponseCache()
+    load = loader({"posts": []})
+
+    assert cache.get_or_load("posts", ("published", 1), load) == {"posts": []}
+    assert cache.get_or_load("posts", ("published", 1), load) == {"posts": []}
+
+    assert load.call_count == 1
+    assert cache.stats()["posts"] == {"entries": 1, "hits": 1, "misses": 1, "evictions": 0}
+
+def test_none_is_not_cached():
+    """Test that not-found responses are loaded every time."""
+    cache = ResponseCache()
+    load = loader(None)
+
+    cache.get_or_load("post_by_slug", "missing", load)
+    cache.get_or_load("post_by_slug", "missing", load)
+
+    assert load.call_count == 2
+
+def test_invalidate_by_tag():
+    """Test that only the entries depending on a tag are dropped."""
+    cache = ResponseCache()
+    cache.get_or_load("posts", 1, loader("page 1", [list_tag("published"), post_tag("a")]))
+    cache.get_or_load("posts", 2, loader("page 2", [list_tag("published"), post_tag("b")]))
+    cache.get_or_load("post_by_slug", "a", loader("post a", [post_tag("a")]))
+
+    cache.invalidate(post_tag("a"))
+
+    reload = loader("fresh")
+    assert cache.get_or_load("posts", 1, reload) == "fresh"
+    assert cache.get_or_load("post_by_slug", "a", reload) == "fresh"
+    assert cache.get_or_load("posts", 2, reload) == "page 2"
+    assert reload.call_count == 2
+
+def test_invalidation_during_load_is_not_cached():
+    """Test that a response read before an invalidation is not stored."""
+    cache = ResponseCache()
+
+    def load():
+        # Una escritura invalida la lista mientras se leía la página
+        cache.invalidate(list_tag("published"))
+        return "stale", [list_tag("published")]
+
+    cache.get_or_load("posts", 1, load)
+
+    assert cache.stats()["posts"]["entries"] == 0
+
+def test_lru_eviction_is_counted():
+    """Test that the cache stays bounded and counts evictions."""
+    cache = ResponseCache(maxsize=2)
+    for key in range(3):
+        cache.get_or_load("posts", key, loader(key, [post_tag(key)]))
+
+    assert cache.stats()["posts"]["entries"] == 2
+    assert cache.stats()["posts"]["evictions"] == 1
+    # La entrada expulsada ya no figura en el índice de etiquetas
+    assert post_tag(0) not in cache._tags
+
+def test_ttl_expiry():
+    """Test that entries expire after the TTL."""
+    now = [100.0]
+    cache = ResponseCache(ttl=10, timer=lambda: now[0])
+    cache.get_or_load("posts", 1, loader("old"))
+
+    now[0] = 111.0
+    assert cache.get_or_load("posts", 1, loader("new")) == "new"
+    assert cache.stats()["posts"]["evictions"] == 1
+
+def test_get_posts_is_cached(client, mock_db, sample_post):
+    """Test that repeated list requests hit the database once."""
+    mock_db.posts.find.return_value.sort.return_value.skip.return_value.limit.return_value = [sample_post]
+    mock_db.post_counters.find_one.return_value = {"count": 1}
+
+    first = client.get('/api/posts?page=1&limit=10')
+    second = client.get('/api/posts')
+
+    assert first.status_code == second.status_code == 200
+    assert json.loads(first.data) == json.loads(second.data)
+    assert mock_db.posts.find.call_count == 1
+
+def test_like_invalidates_cached_lists(client, mock_db, sample_post, auth_headers):
+    """Test that liking a post drops the cached pages that show it."""
+    post_id = str(sample_post["_id"])
+    mock_db.posts.find.return_value.sort.return_value.skip.return_value.limit.return_value = [sample_post]
+    mock_db.post_counters.find_one.return_value = {"count": 1}
+    mock_db.posts.update_one.return_value.matched_count = 1
+
+    client.get('/api/posts')
+    client.post(f'/api/posts/{post_id}/like', headers=auth_headers)
+    client.get('/api/posts')
+
+    assert mock_db.posts.find.call_count == 2
+
+def test_slug_cache_still_counts_views(client, mock_db, sample_post):
+    """Test that cached posts record a view per request but keep their body until the next flush."""
+    mock_db.posts.find_one.return_value = sample_post
+
+    first = client.get('/api/posts/slug/test-post')
+    response = client.get('/api/posts/slug/test-post')
+
+    assert json.loads(response.data)["views"] == 4
+    assert response.headers["ETag"] == first.headers["ETag"]
+    assert view_counter.pending(sample_post["_id"]) == 2
+    mock_db.posts.find_one.assert_called_once()
+
+def test_view_flush_invalidates_cached_post(client, mock_db, sample_post):
+    """Test that flushed views are not counted twice by a cached post."""
+    mock_db.posts.find_one.return_value = dict(sample_post)
+    client.get('/api/posts/slug/test-post')
+
+    view_counter.flush()
+    mock_db.posts.find_one.return_value = {**sample_post, "views": 4}
+    response = client.get('/api/posts/slug/test-post')
+
+    assert json.loads(response.data)["views"] == 5
+    assert mock_db.posts.find_one.call_count == 2
+
+def test_comment_invalidates_cached_comments(client, mock_db, auth_headers):
+    """Test that a new comment drops the cached comment pages of its post."""
+    post_id = str(ObjectId())
+    mock_db.comments.find.return_value.sort.return_value.skip.return_value.limit.return_value = [
+        {"_id": ObjectId(), "content": "Hola", "depth": 0}
+    ]
+    mock_db.users.find_one.return_value = {"userId": "test_user_id", "name": "Test User"}
+    mock_db.posts.update_one.return_value.matched_count = 1
+
+    client.get(f'/api/posts/{post_id}/comments')
+    client.get(f'/api/posts/{post_id}/comments')
+    client.post(f'/api/posts/{post_id}/comments', json={"content": "Nuevo"}, headers=auth_headers)
+    client.get(f'/api/posts/{post_id}/comments')
+
+    assert mock_db.comments.find.call_count == 2
@@ -0,0 +1,88 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from bson.objectid import ObjectId
+from content import plain_text, make_excerpt, content_metadata, content_hash, backfill_metadata
+from server import app
+
+@pytest.fixture
+def client():
+    """Create a test client for the app."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def mock_db():
+    """Mock the database for testing."""
+    with patch('server.db') as mock_db:
+        yield mock_db
+
+# Test metadata
+def test_plain_text_strips_markdown():
+    """Test that the excerpt text has no markdown syntax."""
+    content = "# Title\n\nSome **bold** and [a link](http://x.y).\n\n```py\nprint(1)\n```\n- item ![alt](img.png)"
+    assert plain_text(content) == "Title Some bold and a link. item alt"
+
+def test_excerpt_cuts_at_word_boundary():
+    """Test that long texts are cut on a whole word."""
+    assert make_excerpt("short text", 20) == "short text"
+    assert make_excerpt("one two three four", 10) == "one two…"
+    assert make_excerpt("abcdefghijkl", 5) == "abcde…"
+
+def test_content_metadata():
+    """Test the fields stored with the content."""
+    metadata = content_metadata("**word** " * 450)
+
+    assert metadata["wordCount"] == 450
+    assert metadata["readTime"] == 2
+    assert len(metadata["excerpt"]) <= 201
+    assert metadata["contentHash"] == content_hash("**word** " * 450)
+    assert content_metadata("hi")["readTime"] == 1
+
+# Test writes
+def test_create_post_stores_metadata(client, mock_db, auth_headers, common_user):
+    """Test that a new post is saved with its content metadata."""
+    mock_db.users.find_one.return_value = common_user
+    mock_db.posts.find_one.return_value = None
+    mock_db.posts.insert_one.return_value.inserted_id = ObjectId()
+
+    response = client.post('/api/posts', json={"title": "Hello", "content": "Some *text* here"}, headers=auth_headers)
+
+    assert response.status_code == 201
+    saved = mock_db.posts.insert_one.call_args[0][0]
+    assert saved["wordCount"] == 3
+    assert saved["excerpt"] == "Some text here"
+    assert saved["contentHash"] == content_hash("Some *text* here")
+
+def test_update_post_recomputes_metadata(client, mock_db, auth_headers):
+    """Test that editing the content refreshes its metadata."""
+    post_id = ObjectId()
+    mock_db.posts.find_one_and_update.return_value = {
+        "_id": post_id, "title": "Hello", "content": "old", "status": "published", "author": {"userId": "test_user_id"}
+    }
+
+    response = client.put(f'/api/posts/{post_id}', json={"content": "new content"}, headers=auth_headers)
+
+    changes = mock_db.posts.find_one_and_update.call_args[0][1][0]["$set"]
+    assert changes["excerpt"] == {"$literal": "new content"}
+    assert changes["contentHash"] == {"$literal": content_hash("new content")}
+    assert response.get_json()["excerpt"] == "new content"
+
+# Test backfill
+def test_backfill_in_batches():
+    """Test that posts without metadata are updated in batches guarded by updatedAt."""
+    db = MagicMock()
+    posts = [{"_id": number, "content": f"post {number}", "updatedAt": "t"} for number in range(5)]
+    db.posts.find.return_value.sort.return_value.batch_size.return_value = posts
+    db.posts.bulk_write.side_effect = lambda operations, ordered: MagicMock(modified_count=len(operations))
+
+    assert backfill_metadata(db, batch_size=2) == 5
+    assert db.posts.find.call_args[0][0] == {"contentHash": {"$exists": False}}
+    assert [len(call[0][0]) for call in db.posts.bulk_write.call_args_list] == [2, 2, 1]
+    first = db.posts.bulk_write.call_args_list[0][0][0][0]
+    assert first._filter == {"_id": 0, "updatedAt": "t"}
+    assert first._doc["$set"]["excerpt"] == "post 0"
+
+def test_backfill_cli_is_registered():
+    """Test that the backfill command is available."""
+    assert "content-backfill" in app.cli.commands
@@ -0,0 +1,75 @@
+import pytest
+from unittest.mock import MagicMock
+from counters import get_count, record_post_created, record_status_change, rebuild_counters, uncounted
+
+def inc_updates(db):
+    """Return the (key, amount) pairs of every $inc sent to post_counters."""
+    return [
+        (op._filter["_id"], op._doc["$inc"]["count"])
+        for call in db.post_counters.bulk_write.call_args_list
+        for op in call[0][0]
+    ]
+
+# Test counter updates
+def test_record_post_created():
+    """Test that creating a post increments its status and author counters."""
+    db = MagicMock()
+    record_post_created(db, {"author": {"userId": "u1"}, "status": "draft"})
+    assert inc_updates(db) == [("status:draft", 1), ("author:u1", 1), ("author:u1:status:draft", 1)]
+    # El primer post de un autor o estado crea sus contadores
+    assert all(op._upsert for op in db.post_counters.bulk_write.call_args[0][0])
+
+def test_record_status_change_moves_between_statuses():
+    """Test that publishing a draft moves it between status counters only."""
+    db = MagicMock()
+    record_status_change(db, "u1", "draft", "published")
+    assert inc_updates(db) == [
+        ("status:draft", -1), ("author:u1:status:draft", -1),
+        ("status:published", 1), ("author:u1:status:published", 1)
+    ]
+
+def test_record_status_change_same_status():
+    """Test that saving the same status does not touch the counters."""
+    db = MagicMock()
+    record_status_change(db, "u1", "published", "published")
+    db.post_counters.bulk_write.assert_not_called()
+
+# Test counter reads
+def test_get_count_uses_counter():
+    """Test that an existing counter is returned without counting."""
+    db = MagicMock()
+    db.post_counters.find_one.return_value = {"_id": "status:published", "count": 42}
+    assert get_count(db, "status:published", {"status": "published"}) == 42
+    db.posts.count_documents.assert_not_called()
+
+def test_get_count_does_not_store_missing_counters():
+    """Test that reads never create counters and recount at most once per TTL."""
+    db = MagicMock()
+    db.post_counters.find_one.return_value = None
+    db.posts.count_documents.return_value = 0
+
+    assert get_count(db, "status:whatever", {"status": "whatever"}) == 0
+    assert get_count(db, "status:whatever", {"status": "whatever"}) == 0
+    db.posts.count_documents.assert_called_once()
+    db.post_counters.update_one.assert_not_called()
+    db.post_counters.bulk_write.assert_not_called()
+
+    # Al expirar se vuelve a contar
+    uncounted.clear()
+    db.posts.count_documents.return_value = 2
+    assert get_count(db, "status:whatever", {"status": "whatever"}) == 2
+
+# Test rebuild
+def test_rebuild_counters():
+    """Test that counters are rebuilt from an aggregation over posts."""
+    db = MagicMock()
+    db.posts.aggregate.return_value = [
+        {"_id": {"author": "u1", "status": "published"}, "count": 3},
+        {"_id": {"author": "u1", "status": "draft"}, "count": 1},
+        {"_id": {"author": "u2", "status": "published"}, "count": 2}
+    ]
+    assert rebuild_counters(db) == 7
+    totals = {op._filter["_id"]: op._doc["$set"]["count"] for op in db.post_counters.bulk_write.call_args[0][0]}
+    assert totals["status:published"] == 5
+    assert totals["author:u1"] == 4
+    assert totals["author:u1:status:draft"] == 1
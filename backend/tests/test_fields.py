@@ -0,0 +1,140 @@
+import pytest
+import datetime
+from bson.objectid import ObjectId
+from unittest.mock import patch
+from server import app, view_counter
+from posts import SUMMARY_FIELDS, parse_fields, projection
+from slugs import slug_filter
+
+@pytest.fixture
+def client():
+    """Create a test client for the app."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def mock_db():
+    """Mock the database for testing."""
+    with patch('server.db') as mock_db:
+        yield mock_db
+        view_counter.flush()
+
+@pytest.fixture
+def sample_post():
+    """Create a sample post as returned by a projected query."""
+    return {
+        "_id": ObjectId(),
+        "title": "Test Post",
+        "slug": "test-post",
+        "createdAt": datetime.datetime.now(datetime.UTC).isoformat(),
+        "updatedAt": datetime.datetime.now(datetime.UTC).isoformat(),
+        "views": 2
+    }
+
+def test_parse_fields():
+    """Test that fields are validated and returned in a stable order."""
+    assert parse_fields({"fields": "slug, title"}) == ("title", "slug")
+    assert parse_fields({}, SUMMARY_FIELDS) == SUMMARY_FIELDS
+    assert "content" not in SUMMARY_FIELDS
+
+    with pytest.raises(ValueError):
+        parse_fields({"fields": "title,password"})
+    with pytest.raises(ValueError):
+        parse_fields({"fields": ","})
+
+def test_projection_always_includes_required_fields():
+    """Test that the cursor and ETag fields are always read."""
+    assert projection(("title",)) == {
+        "_id": 1, "createdAt": 1, "updatedAt": 1, "version": 1, "contentHash": 1, "title": 1
+    }
+
+def test_list_uses_summary_projection(client, mock_db, sample_post):
+    """Test that lists never read content unless asked for it."""
+    mock_db.posts.find.return_value.sort.return_value.skip.return_value.limit.return_value = [sample_post]
+    mock_db.post_counters.find_one.return_value = {"count": 1}
+
+    response = client.get('/api/posts')
+
+    assert response.status_code == 200
+    assert mock_db.posts.find.call_args[0][1] == projection(SUMMARY_FIELDS)
+
+def test_list_with_fields(client, mock_db, sample_post):
+    """Test that ?fields= narrows the list projection and changes the ETag."""
+    mock_db.posts.find.return_value.sort.return_value.skip.return_value.limit.return_value = [sample_post]
+    mock_db.post_counters.find_one.return_value = {"count": 1}
+
+    summary = client.get('/api/posts')
+    narrow = client.get('/api/posts?fields=title,slug')
+
+    assert narrow.status_code == 200
+    assert mock_db.posts.find.call_args[0][1] == projection(("title", "slug"))
+    assert narrow.headers["ETag"] != summary.headers["ETag"]
+
+def test_invalid_fields_are_rejected(client, mock_db):
+    """Test that fields outside the allowlist return 400 without querying."""
+    response = client.get('/api/posts?fields=title,author.email')
+
+    assert response.status_code == 400
+    assert "Invalid fields" in response.get_json()["error"]
+    mock_db.posts.find.assert_not_called()
+
+def test_post_by_slug_with_fields(client, mock_db, sample_post):
+    """Test that a single post only includes views when requested."""
+    # Mongo no devuelve los campos fuera de la proyección
+    mock_db.posts.find_one.return_value = {key: value for key, value in sample_post.items() if key != "views"}
+
+    response = client.get('/api/posts/slug/test-post?fields=title')
+
+    assert response.status_code == 200
+    assert "views" not in response.get_json()
+    mock_db.posts.find_one.assert_called_once_with(slug_filter("test-post"), projection(("title",)))
+    # La vista se cuenta igualmente
+    assert view_counter.pending(sample_post["_id"]) == 1
+
+def test_post_by_id_with_fields(client, mock_db, sample_post):
+    """Test the projection of a post fetched by id."""
+    mock_db.posts.find_one.return_value = sample_post
+
+    response = client.get(f'/api/posts/{sample_post["_id"]}?fields=title,views')
+
+    assert response.get_json()["views"] == 3
+    mock_db.posts.find_one.assert_called_once_with({"_id": sample_post["_id"]}, projection(("title", "views")))
+
+def test_user_posts_use_summary_projection(client, mock_db, sample_post, auth_headers):
+    """Test that the author lists default to the summary projection."""
+    mock_db.posts.find.return_value.sort.return_value.skip.return_value.limit.return_value = [sample_post]
+    mock_db.post_counters.find_one.return_value = {"count": 1}
+
+    client.get('/api/users/test_user_id/posts')
+    assert mock_db.posts.find.call_args[0][1] == projection(SUMMARY_FIELDS)
+
+    client.get('/api/users/me/posts?fields=title', headers=auth_headers)
+    assert mock_db.posts.find.call_args[0][1] == projection(("title",))
+
+def test_only_requested_fields_are_returned(client, mock_db, sample_post):
+    """Test that fields read for the cursor and ETag are not sent unless requested."""
+    stored = {**sample_post, "version": 2, "contentHash": "abc"}
+    mock_db.posts.find.return_value.sort.return_value.skip.return_value.limit.return_value = [stored]
+    mock_db.post_counters.find_one.return_value = {"count": 1}
+    mock_db.posts.find_one.return_value = stored
+
+    listed = client.get('/api/posts?fields=title').get_json()["posts"][0]
+    by_slug = client.get('/api/posts/slug/test-post?fields=title').get_json()
+    by_id = client.get(f'/api/posts/{sample_post["_id"]}?fields=title').get_json()
+    mock_db.posts.find.return_value = [stored]
+    batched = client.get('/api/posts/batch?ids=test-post&fields=title').get_json()["posts"][0]
+
+    for post in (listed, by_slug, by_id, batched):
+        assert set(post) == {"_id", "title"}
+
+def test_single_post_includes_version(client, mock_db, sample_post):
+    """Test that single-post reads return the version the editor sends back."""
+    stored = {**sample_post, "version": 4, "contentHash": "abc"}
+    mock_db.posts.find_one.return_value = stored
+
+    by_id = client.get(f'/api/posts/{sample_post["_id"]}').get_json()
+    by_slug = client.get('/api/posts/slug/test-post').get_json()
+
+    assert by_id["version"] == by_slug["version"] == 4
+    assert "contentHash" not in by_id
@@ -0,0 +1,157 @@
+import pytest
+import json
+import threading
+import time
+import rsa
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch, MagicMock
+from google.auth import crypt, jwt
+from google.auth.transport import requests as google_requests
+from google.oauth2 import id_token
+from google_auth import GOOGLE_CERTS_URL, CertificateCache, GoogleTokenVerifier, max_age
+
+CLIENT_ID = "test_google_client_id"
+
+@pytest.fixture(scope="module")
+def key_pair():
+    """An RSA key pair standing in for Google's signing key."""
+    public_key, private_key = rsa.newkeys(1024)
+    return public_key.save_pkcs1().decode(), private_key.save_pkcs1().decode()
+
+@pytest.fixture
+def certs_server(key_pair):
+    """A local stand-in for Google's certificate endpoint."""
+    class Handler(BaseHTTPRequestHandler):
+        requests = 0
+
+        def do_GET(self):
+            Handler.requests += 1
+            body = json.dumps({"test-key": key_pair[0]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", "public, max-age=3600, must-revalidate")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.handler = Handler
+    server.url = f"http://127.0.0.1:{server.server_port}/certs"
+    yield server
+    server.shutdown()
+
+def google_token(private_key, **claims):
+    """Sign an ID token like Google's with the local key."""
+    now = int(time.time())
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": CLIENT_ID,
+        "sub": "google_user_id",
+        "iat": now,
+        "exp": now + 3600,
+        **claims
+    }
+    signer = crypt.RSASigner.from_string(private_key, key_id="test-key")
+    return jwt.encode(signer, payload).decode()
+
+def test_max_age():
+    """Test that the certificate lifetime follows Cache-Control and Age."""
+    assert max_age({"Cache-Control": "public, max-age=19000, must-revalidate"}) == 19000
+    assert max_age({"cache-control": "max-age=100", "Age": "40"}) == 60
+    assert max_age({}) == 300
+
+def test_certificates_are_fetched_once(certs_server, key_pair):
+    """Test that verifying tokens reuses the cached certificates."""
+    certs = CertificateCache(google_requests.Request(), source_url=certs_server.url)
+    certs._stop.set()  # sin hilo de renovación en esta prueba
+
+    for _ in range(3):
+        idinfo = id_token.verify_oauth2_token(google_token(key_pair[1]), certs, CLIENT_ID)
+
+    assert idinfo["sub"] == "google_user_id"
+    assert certs_server.handler.requests == 1
+
+def test_certificates_expire(certs_server):
+    """Test that certificates are fetched again once max-age has passed."""
+    now = [1000.0]
+    certs = CertificateCache(google_requests.Request(), source_url=certs_server.url, timer=lambda: now[0])
+    certs._stop.set()
+
+    certs(GOOGLE_CERTS_URL)
+    now[0] += 3599
+    certs(GOOGLE_CERTS_URL)
+    assert certs_server.handler.requests == 1
+
+    now[0] += 2
+    certs(GOOGLE_CERTS_URL)
+    assert certs_server.handler.requests == 2
+
+def test_background_refresh_prewarms(certs_server):
+    """Test that start() fetches the certificates off the request path."""
+    certs = CertificateCache(google_requests.Request(), source_url=certs_server.url)
+    certs.start()
+    try:
+        deadline = time.monotonic() + 5
+        while certs.fetches == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # El login ya no espera ninguna descarga
+        certs(GOOGLE_CERTS_URL)
+        assert certs_server.handler.requests == 1
+        assert certs.next_refresh() > 3000
+    finally:
+        certs.stop()
+
+def test_cold_burst_fetches_once(certs_server):
+    """Test that concurrent cold requests share a single fetch."""
+    certs = CertificateCache(google_requests.Request(), source_url=certs_server.url)
+    certs._stop.set()
+
+    threads = [threading.Thread(target=certs, args=(GOOGLE_CERTS_URL,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert certs_server.handler.requests == 1
+
+def test_other_requests_pass_through():
+    """Test that only the certificate URL is served from the cache."""
+    transport = MagicMock()
+    certs = CertificateCache(transport)
+
+    certs("https://example.com/other", method="POST", body=b"x")
+
+    transport.assert_called_once_with("https://example.com/other", method="POST", body=b"x")
+
+def test_verified_tokens_are_cached():
+    """Test that a token is verified once until it expires."""
+    now = [1000.0]
+    verifier = GoogleTokenVerifier(CLIENT_ID, MagicMock(), timer=lambda: now[0])
+    with patch('google.oauth2.id_token.verify_oauth2_token') as mock_verify:
+        mock_verify.return_value = {"sub": "google_user_id", "exp": 1100}
+
+        verifier.verify("token")
+        verifier.verify("token")
+        assert mock_verify.call_count == 1
+
+        now[0] = 1101
+        verifier.verify("token")
+        assert mock_verify.call_count == 2
+
+def test_invalid_tokens_are_not_cached():
+    """Test that failed verifications are retried."""
+    verifier = GoogleTokenVerifier(CLIENT_ID, MagicMock())
+    with patch('google.oauth2.id_token.verify_oauth2_token') as mock_verify:
+        mock_verify.side_effect = ValueError("Invalid token")
+
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                verifier.verify("token")
+
+        assert mock_verify.call_count == 2
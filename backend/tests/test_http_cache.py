@@ -0,0 +1,123 @@
+import pytest
+import gzip
+import json
+import datetime
+from unittest.mock import patch
+from bson.objectid import ObjectId
+from server import app, view_counter
+from http_cache import Compressor, matching_etag
+
+@pytest.fixture
+def client():
+    """Create a test client for the app."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def mock_db():
+    """Mock the database for testing."""
+    with patch('server.db') as mock_db:
+        yield mock_db
+        view_counter.flush()
+
+@pytest.fixture
+def sample_post():
+    """Create a sample post with a long body."""
+    return {
+        "_id": ObjectId(),
+        "title": "Test Post",
+        "content": "Lorem ipsum dolor sit amet. " * 200,
+        "slug": "test-post",
+        "createdAt": datetime.datetime.now(datetime.UTC).isoformat(),
+        "updatedAt": datetime.datetime.now(datetime.UTC).isoformat(),
+        "status": "published",
+        "views": 3,
+        "likes": 0
+    }
+
+def test_post_not_modified(client, mock_db, sample_post):
+    """Test that a matching If-None-Match returns 304 and still counts the view."""
+    mock_db.posts.find_one.return_value = sample_post
+
+    first = client.get('/api/posts/slug/test-post')
+    etag = first.headers["ETag"]
+    second = client.get('/api/posts/slug/test-post', headers={"If-None-Match": etag})
+
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == etag
+    assert view_counter.pending(sample_post["_id"]) == 2
+
+def test_post_etag_changes_after_flush(client, mock_db, sample_post):
+    """Test that flushed views produce a new ETag."""
+    mock_db.posts.find_one.return_value = sample_post
+    etag = client.get('/api/posts/slug/test-post').headers["ETag"]
+
+    view_counter.flush()
+    mock_db.posts.find_one.return_value = {**sample_post, "views": 4}
+    after_flush = client.get('/api/posts/slug/test-post', headers={"If-None-Match": etag})
+
+    assert after_flush.status_code == 200
+    assert after_flush.headers["ETag"] != etag
+
+def test_list_not_modified(client, mock_db, sample_post):
+    """Test conditional GET on the post list."""
+    mock_db.posts.find.return_value.sort.return_value.skip.return_value.limit.return_value = [sample_post]
+    mock_db.post_counters.find_one.return_value = {"count": 1}
+
+    etag = client.get('/api/posts').headers["ETag"]
+    response = client.get('/api/posts', headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert mock_db.posts.find.call_count == 1
+
+def test_gzip_above_threshold(client, mock_db, sample_post):
+    """Test that large responses are gzipped with their own ETag."""
+    mock_db.posts.find_one.return_value = sample_post
+
+    response = client.get('/api/posts/slug/test-post', headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"].endswith('-gzip"')
+    assert json.loads(gzip.decompress(response.data))["slug"] == "test-post"
+
+    # El ETag comprimido también vale para el 304
+    again = client.get('/api/posts/slug/test-post', headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+
+def test_small_responses_are_not_compressed(client, mock_db):
+    """Test that responses under the threshold are sent as is."""
+    response = client.get('/api/health', headers={"Accept-Encoding": "gzip, br"})
+
+    assert "Content-Encoding" not in response.headers
+
+def test_encoding_negotiation():
+    """Test that the client's preferences and q-values are respected."""
+    compressor = Compressor(min_size=10)
+    data = b'{"content": "' + b"a" * 100 + b'"}'
+
+    assert compressor.encode(data, "identity")[1] is None
+    assert compressor.encode(data, "gzip;q=0, deflate")[1] is None
+    assert compressor.encode(data, "gzip")[1] == "gzip"
+    assert compressor.encode(data, "br;q=0.5, gzip")[1] == "gzip"
+
+def test_brotli_preferred():
+    """Test that brotli is used when the client accepts it."""
+    brotli = pytest.importorskip("brotli")
+    data = b'{"content": "' + b"a" * 100 + b'"}'
+
+    body, encoding = Compressor(min_size=10).encode(data, "gzip, deflate, br", etag="abc")
+
+    assert encoding == "br"
+    assert brotli.decompress(body) == data
+
+def test_matching_etag():
+    """Test If-None-Match parsing, including compressed variants and *."""
+    assert matching_etag('"abc"', "abc") == "abc"
+    assert matching_etag('"x", "abc-gzip"', "abc") == "abc-gzip"
+    assert matching_etag('W/"abc"', "abc") == "abc"
+    assert matching_etag("*", "abc") == "abc"
+    assert matching_etag(None, "abc") is None
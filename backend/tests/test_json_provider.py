@@ -0,0 +1,40 @@
+import pytest
+import datetime
+import json
+from bson.objectid import ObjectId
+from flask import Flask
+from json_provider import OrjsonProvider, MongoJSONProvider
+
+@pytest.fixture(params=[OrjsonProvider, MongoJSONProvider])
+def app(request):
+    """A Flask app with each JSON provider."""
+    app = Flask(__name__)
+    app.json = request.param(app)
+    return app
+
+def test_mongo_types_are_encoded(app):
+    """Test that ObjectId and datetime are serialized without converting the document."""
+    post_id = ObjectId()
+    created_at = datetime.datetime(2025, 3, 1, 10, 30, tzinfo=datetime.UTC)
+
+    with app.app_context():
+        response = app.json.response({"_id": post_id, "createdAt": created_at, "tags": ["a"]})
+
+    assert response.mimetype == "application/json"
+    assert json.loads(response.data) == {"_id": str(post_id), "createdAt": "2025-03-01T10:30:00+00:00", "tags": ["a"]}
+
+def test_view_return_values_use_provider(app):
+    """Test that dicts returned from views go through the provider."""
+    post_id = ObjectId()
+    app.get("/post")(lambda: {"_id": post_id})
+
+    assert app.test_client().get("/post").get_json() == {"_id": str(post_id)}
+
+def test_unknown_types_fail(app):
+    """Test that unsupported types still raise TypeError."""
+    with pytest.raises(TypeError):
+        app.json.dumps({"value": object()})
+
+def test_loads(app):
+    """Test that request bodies are parsed."""
+    assert app.json.loads(b'{"title": "Hola", "n": 1}') == {"title": "Hola", "n": 1}
@@ -0,0 +1,109 @@
+import pytest
+import json
+from unittest.mock import patch, MagicMock
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+from server import app
+
+@pytest.fixture
+def client():
+    """Create a test client for the app."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def db_calls(mock_db):
+    """Names of the collection methods called on the mocked database."""
+    return [name for name, _, _ in mock_db.mock_calls if name.count(".") == 1]
+
+# Test like
+@patch('server.db')
+def test_like_post(mock_db, client, auth_headers):
+    """Test that liking a post is one insert plus one counter update."""
+    post_id = str(ObjectId())
+    mock_db.posts.update_one.return_value.matched_count = 1
+    
+    response = client.post(f'/api/posts/{post_id}/like', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert json.loads(response.data)["message"] == "Post liked successfully"
+    assert db_calls(mock_db) == ["post_likes.insert_one", "posts.update_one"]
+    mock_db.posts.update_one.assert_called_once_with({"_id": ObjectId(post_id)}, {"$inc": {"likes": 1}})
+
+@patch('server.db')
+def test_like_post_already_liked(mock_db, client, auth_headers):
+    """Test that a duplicate like is rejected by the unique index and not counted."""
+    mock_db.post_likes.insert_one.side_effect = DuplicateKeyError("duplicate")
+    
+    response = client.post(f'/api/posts/{ObjectId()}/like', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert json.loads(response.data)["message"] == "Post already liked"
+    assert db_calls(mock_db) == ["post_likes.insert_one"]
+
+@patch('server.db')
+def test_like_missing_post(mock_db, client, auth_headers):
+    """Test that liking a missing post removes the like again."""
+    post_id = str(ObjectId())
+    mock_db.posts.update_one.return_value.matched_count = 0
+    
+    response = client.post(f'/api/posts/{post_id}/like', headers=auth_headers)
+    
+    assert response.status_code == 404
+    mock_db.post_likes.delete_one.assert_called_once_with({"postId": post_id, "userId": "test_user_id"})
+
+@patch('server.db')
+def test_like_invalid_post_id(mock_db, client, auth_headers):
+    """Test that a malformed post id is rejected before a like is stored."""
+    response = client.post('/api/posts/not-an-id/like', headers=auth_headers)
+    
+    assert response.status_code == 400
+    mock_db.post_likes.insert_one.assert_not_called()
+
+# Test unlike
+@patch('server.db')
+def test_unlike_post(mock_db, client, auth_headers):
+    """Test that unliking is one delete plus one counter update."""
+    mock_db.post_likes.delete_one.return_value.deleted_count = 1
+    
+    response = client.delete(f'/api/posts/{ObjectId()}/like', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert db_calls(mock_db) == ["post_likes.delete_one", "posts.update_one"]
+
+@patch('server.db')
+def test_unlike_post_not_liked(mock_db, client, auth_headers):
+    """Test that unliking a post that was not liked does not touch the counter."""
+    mock_db.post_likes.delete_one.return_value.deleted_count = 0
+    
+    response = client.delete(f'/api/posts/{ObjectId()}/like', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert json.loads(response.data)["message"] == "Post was not liked"
+    mock_db.posts.update_one.assert_not_called()
+
+# Test batch like status
+@patch('server.db')
+def test_like_status_for_many_posts(mock_db, client, auth_headers):
+    """Test that the liked flags of a feed page come from one $in query."""
+    post_ids = [str(ObjectId()) for _ in range(3)]
+    mock_db.post_likes.find.return_value = [{"postId": post_ids[1]}]
+    
+    response = client.post('/api/posts/likes/status', json={"postIds": post_ids}, headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert json.loads(response.data)["liked"] == {post_ids[0]: False, post_ids[1]: True, post_ids[2]: False}
+    mock_db.post_likes.find.assert_called_once_with(
+        {"userId": "test_user_id", "postId": {"$in": post_ids}},
+        {"postId": 1, "_id": 0}
+    )
+
+@patch('server.db')
+def test_like_status_validates_ids(mock_db, client, auth_headers):
+    """Test that the batch endpoint rejects invalid or oversized id lists."""
+    response = client.post('/api/posts/likes/status', json={"postIds": "abc"}, headers=auth_headers)
+    assert response.status_code == 400
+    
+    response = client.post('/api/posts/likes/status', json={"postIds": ["x"] * 101}, headers=auth_headers)
+    assert response.status_code == 400
+    mock_db.post_likes.find.assert_not_called()
@@ -0,0 +1,87 @@
+import pytest
+from flask import Flask
+from metrics import Histogram, Metrics, format_labels
+from server import app
+
+@pytest.fixture
+def client():
+    """Create a test client for the app."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def test_app():
+    """A small app instrumented with its own Metrics."""
+    test_app = Flask(__name__)
+    test_metrics = Metrics(enabled=True)
+    test_metrics.init_app(test_app)
+
+    @test_app.get("/items/<item_id>")
+    def get_item(item_id):
+        if item_id == "missing":
+            return {"error": "Not found"}, 404
+        return {"id": item_id}
+
+    @test_app.get("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    test_app.metrics = test_metrics
+    return test_app
+
+def test_histogram_buckets():
+    """Test that histogram buckets are cumulative and end in +Inf."""
+    histogram = Histogram((0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+
+    assert list(histogram.cumulative()) == [(0.1, 2), (1, 3), (float("inf"), 4)]
+    assert histogram.sum == pytest.approx(3.65)
+
+def test_label_escaping():
+    """Test that label values are escaped for the text format."""
+    assert format_labels((("route", 'a"b\\c'),)) == '{route="a\\"b\\\\c"}'
+
+def test_requests_are_labelled_by_route(test_app):
+    """Test that ids do not end up in the labels."""
+    client = test_app.test_client()
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/items/missing")
+
+    text = client.get("/metrics").data.decode()
+
+    labels = 'method="GET",route="/items/<item_id>"'
+    assert f'http_requests_total{{{labels},status="200"}} 2' in text
+    assert f'http_request_errors_total{{{labels},status="404"}} 1' in text
+    assert f'http_request_duration_seconds_count{{{labels}}} 3' in text
+    assert f'http_response_size_bytes_count{{{labels}}} 3' in text
+    assert f'http_requests_in_flight{{{labels}}} 0' in text
+    assert "/items/1" not in text
+
+def test_unhandled_exception_counts_as_error(test_app):
+    """Test that a view raising an exception is counted as a 500."""
+    client = test_app.test_client()
+    client.get("/boom")
+
+    text = test_app.metrics.render()
+
+    assert 'http_request_errors_total{method="GET",route="/boom",status="500"} 1' in text
+
+def test_disabled_metrics():
+    """Test that disabled metrics record nothing and expose no endpoint."""
+    disabled_app = Flask(__name__)
+    Metrics(enabled=False).init_app(disabled_app)
+
+    assert disabled_app.test_client().get("/metrics").status_code == 404
+
+def test_metrics_endpoint(client):
+    """Test the Prometheus endpoint of the API."""
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.data.decode()
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert "# TYPE views_pending gauge" in text
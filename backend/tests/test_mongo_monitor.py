@@ -0,0 +1,112 @@
+import pytest
+import datetime
+import time
+from unittest.mock import MagicMock
+from flask import Flask
+from pymongo.monitoring import CommandStartedEvent, CommandSucceededEvent, CommandFailedEvent
+from metrics import Metrics
+from mongo_monitor import CommandMonitor, command_shape
+
+CONNECTION = ("localhost", 27017)
+
+def run_command(monitor, command, request_id, ms=1, failed=False):
+    """Send the started and finished events of a command to the monitor."""
+    command_name = next(iter(command))
+    monitor.started(CommandStartedEvent(command, "talkify", request_id, CONNECTION, request_id))
+    duration = datetime.timedelta(milliseconds=ms)
+    if failed:
+        monitor.failed(CommandFailedEvent(duration, {"ok": 0}, command_name, request_id, CONNECTION, request_id, database_name="talkify"))
+    else:
+        monitor.succeeded(CommandSucceededEvent(duration, {"ok": 1}, command_name, request_id, CONNECTION, request_id, database_name="talkify"))
+
+def test_shape_ignores_values():
+    """Test that commands differing only in values share a shape."""
+    first = command_shape("find", {"find": "posts", "filter": {"slug": "hola"}, "limit": 1})
+    second = command_shape("find", {"find": "posts", "filter": {"slug": "adios"}, "limit": 1})
+
+    assert first == second == ("posts", 'find posts {"filter":{"slug":"?"}}')
+
+def test_shape_keeps_operators_and_sort():
+    """Test that operators and sort directions are part of the shape."""
+    _, shape = command_shape("find", {
+        "find": "post_likes",
+        "filter": {"userId": "u1", "postId": {"$in": ["a", "b", "c"]}},
+        "sort": {"createdAt": -1}
+    })
+
+    assert shape == 'find post_likes {"filter":{"postId":{"$in":"?"},"userId":"?"},"sort":{"createdAt":-1}}'
+
+def test_shape_ignores_projections():
+    """Test that client-chosen ?fields= projections do not create new shapes."""
+    first = command_shape("find", {"find": "posts", "filter": {"slug": "a"}, "projection": {"title": 1}})
+    second = command_shape("find", {"find": "posts", "filter": {"slug": "b"}, "projection": {"title": 1, "views": 1}})
+
+    assert first == second == ("posts", 'find posts {"filter":{"slug":"?"},"projection":"<projection>"}')
+
+def test_shape_collapses_bulk_writes():
+    """Test that a bulk write of identical updates has a single shape."""
+    updates = [{"q": {"_id": i}, "u": {"$inc": {"views": i}}} for i in range(100)]
+    _, shape = command_shape("update", {"update": "posts", "updates": updates})
+
+    assert shape == 'update posts {"updates":[{"q":{"_id":"?"},"u":{"$inc":{"views":"?"}}}]}'
+
+@pytest.fixture
+def monitored_app():
+    """A small app whose view issues a command per liked post (an N+1)."""
+    app = Flask(__name__)
+    metrics = Metrics(enabled=True)
+    metrics.init_app(app)
+    monitor = CommandMonitor(slow_ms=1000)
+    monitor.init_app(app, metrics)
+
+    @app.get("/posts/<post_id>/like")
+    def like(post_id):
+        for request_id in range(3):
+            run_command(monitor, {"find": "post_likes", "filter": {"postId": post_id}}, request_id, ms=2)
+        return "ok"
+
+    app.metrics = metrics
+    return app
+
+def test_round_trips_per_request(monitored_app):
+    """Test that each request reports its Mongo round trips."""
+    response = monitored_app.test_client().get("/posts/1/like")
+
+    assert response.headers["Server-Timing"] == 'mongo;dur=6.0;desc="3 commands"'
+    text = monitored_app.metrics.render()
+    labels = 'method="GET",route="/posts/<post_id>/like"'
+    assert f'http_request_mongo_commands_bucket{{{labels},le="3"}} 1' in text
+    assert f'http_request_mongo_commands_bucket{{{labels},le="2"}} 0' in text
+    assert 'mongo_command_duration_seconds_count{collection="post_likes",command="find",shape="find post_likes {\\"filter\\":{\\"postId\\":\\"?\\"}}"} 3' in text
+
+def test_failed_commands_are_counted():
+    """Test that failures are counted by shape."""
+    app = Flask(__name__)
+    metrics = Metrics(enabled=True)
+    monitor = CommandMonitor()
+    monitor.init_app(app, metrics)
+
+    run_command(monitor, {"insert": "posts", "documents": [{}]}, 1, failed=True)
+
+    assert 'mongo_command_failures_total{collection="posts",command="insert",shape="insert posts"} 1' in metrics.render()
+
+def test_slow_commands_are_explained_once():
+    """Test that slow commands are explained off-thread once per shape."""
+    database = MagicMock()
+    database.command.return_value = {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}
+    monitor = CommandMonitor(slow_ms=5)
+    monitor.init_app(Flask(__name__), Metrics(enabled=False), lambda name: database)
+
+    run_command(monitor, {"find": "posts", "filter": {"title": "a"}, "lsid": {"id": 1}}, 1, ms=20)
+    run_command(monitor, {"find": "posts", "filter": {"title": "b"}}, 2, ms=20)
+    run_command(monitor, {"find": "posts", "filter": {"slug": "c"}}, 3, ms=1)
+
+    deadline = time.monotonic() + 5
+    while not database.command.called and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+    database.command.assert_called_once_with({
+        "explain": {"find": "posts", "filter": {"title": "a"}},
+        "verbosity": "queryPlanner"
+    })
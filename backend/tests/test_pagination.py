@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import MagicMock
+from bson.objectid import ObjectId
+from pagination import SORT, parse_pagination, encode_cursor, decode_cursor, after_cursor, fetch_page
+
+# Test cursor round trip
+def test_cursor_round_trip():
+    """Test that a cursor encodes the (createdAt, _id) position of a post."""
+    post = {"_id": ObjectId(), "createdAt": "2025-03-01T10:00:00+00:00"}
+    assert decode_cursor(encode_cursor(post)) == (post["createdAt"], post["_id"])
+
+def test_invalid_cursor():
+    """Test that a malformed cursor is rejected as an invalid value."""
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_parse_pagination_clamps_limit():
+    """Test that limit is clamped and page defaults to 1."""
+    assert parse_pagination({"limit": "500"}) == (1, 50, None)
+    assert parse_pagination({"page": "0", "limit": "0"}) == (1, 1, None)
+
+# Test keyset filter
+def test_after_cursor_seeks_past_position():
+    """Test that the keyset filter skips everything up to the cursor position."""
+    post_id = ObjectId()
+    query = after_cursor({"status": "published"}, ("2025-03-01", post_id))
+    assert query == {
+        "status": "published",
+        "$or": [
+            {"createdAt": {"$lt": "2025-03-01"}},
+            {"createdAt": "2025-03-01", "_id": {"$lt": post_id}}
+        ]
+    }
+
+# Test page fetching
+def test_fetch_page_with_cursor_does_not_skip():
+    """Test that cursor pages seek instead of skipping and report the next cursor."""
+    posts = [{"_id": ObjectId(), "createdAt": f"2025-03-0{i}"} for i in range(3, 0, -1)]
+    collection = MagicMock()
+    collection.find.return_value.sort.return_value.limit.return_value = posts
+
+    page, next_cursor = fetch_page(collection, {}, None, 1, 2, ("2025-03-04", ObjectId()))
+
+    assert page == posts[:2]
+    assert decode_cursor(next_cursor) == (posts[1]["createdAt"], posts[1]["_id"])
+    collection.find.return_value.sort.assert_called_once_with(SORT)
+    collection.find.return_value.sort.return_value.skip.assert_not_called()
+    collection.find.return_value.sort.return_value.limit.assert_called_once_with(3)
+
+def test_fetch_page_last_page_has_no_cursor():
+    """Test that the last page returns no next cursor."""
+    posts = [{"_id": ObjectId(), "createdAt": "2025-03-01"}]
+    collection = MagicMock()
+    collection.find.return_value.sort.return_value.skip.return_value.limit.return_value = posts
+
+    page, next_cursor = fetch_page(collection, {}, None, 3, 10)
+
+    assert page == posts
+    assert next_cursor is None
+    collection.find.return_value.sort.return_value.skip.assert_called_once_with(20)
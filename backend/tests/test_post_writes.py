@@ -0,0 +1,200 @@
+import pytest
+import datetime
+from unittest.mock import patch
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+from server import app
+from post_writes import expected_version, update_pipeline, updated_post
+
+@pytest.fixture
+def client():
+    """Create a test client for the app."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def mock_db():
+    """Mock the database for testing."""
+    with patch('server.db') as mock_db:
+        yield mock_db
+
+@pytest.fixture
+def stored_post():
+    """A post as stored before an edit."""
+    return {
+        "_id": ObjectId(),
+        "title": "Old title",
+        "slug": "old-title",
+        "content": "Old content",
+        "author": {"userId": "test_user_id"},
+        "status": "draft",
+        "createdAt": datetime.datetime.now(datetime.UTC).isoformat(),
+        "updatedAt": datetime.datetime.now(datetime.UTC).isoformat(),
+        "version": 3
+    }
+
+def round_trips(mock_db):
+    """Count the operations sent to the posts collection."""
+    return len(mock_db.posts.method_calls)
+
+# Test update
+def test_update_post_in_one_round_trip(client, mock_db, auth_headers, stored_post):
+    """Test that an edit is a single conditional find_one_and_update."""
+    mock_db.posts.find_one_and_update.return_value = stored_post
+
+    response = client.put(
+        f'/api/posts/{stored_post["_id"]}',
+        json={"title": "New title", "status": "published", "version": 3},
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["title"] == "New title"
+    assert data["slug"] == "new-title"
+    assert data["version"] == 4
+    query = mock_db.posts.find_one_and_update.call_args[0][0]
+    assert query == {"_id": stored_post["_id"], "author.userId": "test_user_id", "version": 3}
+    # Antes: find_one (autor) + find_one (slug) + update_one + find_one (resultado)
+    assert round_trips(mock_db) == 1
+
+def test_update_post_conflict(client, mock_db, auth_headers, stored_post):
+    """Test that editing a stale version returns 409 with the current version."""
+    mock_db.posts.find_one_and_update.return_value = None
+    mock_db.posts.find_one.return_value = stored_post
+
+    response = client.put(
+        f'/api/posts/{stored_post["_id"]}', json={"content": "Edit", "version": 2}, headers=auth_headers
+    )
+
+    assert response.status_code == 409
+    assert response.get_json()["version"] == 3
+    assert round_trips(mock_db) == 2
+
+def test_update_post_of_another_user(client, mock_db, auth_headers, stored_post):
+    """Test that the author predicate rejects other users' posts."""
+    mock_db.posts.find_one_and_update.return_value = None
+    mock_db.posts.find_one.return_value = {**stored_post, "author": {"userId": "someone_else"}}
+
+    response = client.put(f'/api/posts/{stored_post["_id"]}', json={"content": "Edit"}, headers=auth_headers)
+
+    assert response.status_code == 401
+
+def test_update_missing_post(client, mock_db, auth_headers):
+    """Test that editing a missing post returns 404."""
+    mock_db.posts.find_one_and_update.return_value = None
+    mock_db.posts.find_one.return_value = None
+
+    response = client.put(f'/api/posts/{ObjectId()}', json={"content": "Edit"}, headers=auth_headers)
+
+    assert response.status_code == 404
+
+def test_update_post_slug_collision(client, mock_db, auth_headers, stored_post):
+    """Test that a taken slug is retried with the next sequence suffix."""
+    mock_db.posts.find_one_and_update.side_effect = [DuplicateKeyError("slug_unique"), stored_post]
+    mock_db.slug_counters.find_one_and_update.return_value = {"_id": "new-title", "seq": 1}
+
+    response = client.put(f'/api/posts/{stored_post["_id"]}', json={"title": "New title"}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.get_json()["slug"] == "new-title-2"
+    assert response.get_json()["slugs"] == ["old-title", "new-title-2"]
+    assert round_trips(mock_db) == 2
+
+def test_update_pipeline_keeps_slug_when_title_is_unchanged(stored_post):
+    """Test the server-side slug condition and the local copy of the result."""
+    changes = {"title": "Old title", "content": "$not a field"}
+    stage = update_pipeline(changes, "old-title-2", "now")[0]["$set"]
+
+    same_title = {"$eq": ["$title", {"$literal": "Old title"}]}
+    assert stage["slug"] == {"$cond": [same_title, "$slug", {"$literal": "old-title-2"}]}
+    assert stage["content"] == {"$literal": "$not a field"}
+    assert stage["version"]["$cond"][1:] == [{"$add": [{"$ifNull": ["$version", 0]}, 1]}, "$version"]
+    assert stage["updatedAt"]["$cond"][1:] == [{"$literal": "now"}, "$updatedAt"]
+    # El slug anterior se conserva en slugs
+    slugs = {"$ifNull": ["$slugs", ["$slug"]]}
+    assert stage["slugs"]["$cond"][2] == {"$setUnion": [slugs, {"$literal": ["old-title-2"]}]}
+    assert updated_post(stored_post, changes, "old-title-2", "now")["slug"] == "old-title"
+
+def test_update_pipeline_quotes_dollar_titles():
+    """Test that a title starting with $ is compared as a value, not as a field path or variable."""
+    for title in ("$slug", "$$ROOT"):
+        stage = update_pipeline({"title": title}, "new", "now")[0]["$set"]
+
+        assert stage["title"] == {"$literal": title}
+        assert stage["slug"]["$cond"][0] == {"$eq": ["$title", {"$literal": title}]}
+        assert stage["slugs"]["$cond"][0] == {"$eq": ["$title", {"$literal": title}]}
+
+def test_save_without_changes(client, mock_db, auth_headers, stored_post):
+    """Test that saving the stored values keeps the version and skips caches and reindexing."""
+    mock_db.posts.find_one_and_update.return_value = stored_post
+
+    with patch('server.index_post') as index_post, patch('server.response_cache') as response_cache:
+        response = client.put(
+            f'/api/posts/{stored_post["_id"]}',
+            json={"title": "Old title", "status": "draft", "version": 3},
+            headers=auth_headers
+        )
+
+    assert response.status_code == 200
+    assert response.get_json()["version"] == 3
+    assert response.get_json()["updatedAt"] == stored_post["updatedAt"]
+    index_post.assert_not_called()
+    response_cache.invalidate.assert_not_called()
+
+def test_cover_change_does_not_reindex(client, mock_db, auth_headers, stored_post):
+    """Test that only title, content or status changes rewrite the search postings."""
+    mock_db.posts.find_one_and_update.return_value = stored_post
+
+    with patch('server.index_post') as index_post:
+        response = client.put(
+            f'/api/posts/{stored_post["_id"]}', json={"coverImage": "https://example.com/c.jpg"}, headers=auth_headers
+        )
+
+    assert response.get_json()["version"] == 4
+    index_post.assert_not_called()
+
+def test_expected_version():
+    """Test version parsing from bodies and query strings."""
+    assert expected_version({}) is None
+    assert expected_version({"version": 2}) == 2
+    assert expected_version({"version": "2"}) == 2
+    with pytest.raises(ValueError):
+        expected_version({"version": "two"})
+    with pytest.raises(ValueError):
+        expected_version({"version": True})
+
+# Test delete
+def test_delete_post_in_one_round_trip(client, mock_db, auth_headers, stored_post):
+    """Test that deleting a post is a single conditional find_one_and_delete."""
+    mock_db.posts.find_one_and_delete.return_value = stored_post
+
+    response = client.delete(f'/api/posts/{stored_post["_id"]}?version=3', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert mock_db.posts.find_one_and_delete.call_args[0][0] == {
+        "_id": stored_post["_id"], "author.userId": "test_user_id", "version": 3
+    }
+    mock_db.comments.delete_many.assert_called_once_with({"postId": stored_post["_id"]})
+    # Antes: find_one + delete_one
+    assert round_trips(mock_db) == 1
+
+def test_delete_post_of_another_user(client, mock_db, auth_headers, stored_post):
+    """Test that other users' posts are not deleted."""
+    mock_db.posts.find_one_and_delete.return_value = None
+    mock_db.posts.find_one.return_value = {**stored_post, "author": {"userId": "someone_else"}}
+
+    response = client.delete(f'/api/posts/{stored_post["_id"]}', headers=auth_headers)
+
+    assert response.status_code == 401
+    mock_db.comments.delete_many.assert_not_called()
+
+def test_new_posts_start_at_version_one(client, mock_db, auth_headers, common_user):
+    """Test that created posts carry the initial version."""
+    mock_db.users.find_one.return_value = common_user
+    mock_db.posts.find_one.return_value = None
+
+    client.post('/api/posts', json={"title": "Hello", "content": "Text"}, headers=auth_headers)
+
+    assert mock_db.posts.insert_one.call_args[0][0]["version"] == 1
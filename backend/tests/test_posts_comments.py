@@ -4,6 +4,7 @@ from unittest.mock import patch, MagicMock
 from bson.objectid import ObjectId
 import datetime
 from server import app
+from pagination import MAX_LIMIT
 
 @pytest.fixture
 def client():
@@ -109,11 +110,13 @@ def sample_posts():
 # Test get comments
 @patch('server.db')
 def test_get_comments(mock_db, client, sample_post_with_comments):
-    """Test getting comments for a post."""
+    """Test getting a page of comments for a post from the comments collection."""
     post_id = str(sample_post_with_comments["_id"])
     
     # Setup mock
-    mock_db.posts.find_one.return_value = sample_post_with_comments
+    mock_cursor = MagicMock()
+    mock_cursor.sort.return_value.skip.return_value.limit.return_value = sample_post_with_comments["comments"]
+    mock_db.comments.find.return_value = mock_cursor
     
     # Make request
     response = client.get(f'/api/posts/{post_id}/comments')
@@ -121,42 +124,336 @@ def test_get_comments(mock_db, client, sample_post_with_comments):
     # Assertions
     assert response.status_code == 200
     data = json.loads(response.data)
-    assert len(data) == 1
-    assert data[0]["content"] == "This is a test comment"
-    assert data[0]["_id"] == "comment1"
+    assert len(data["comments"]) == 1
+    assert data["comments"][0]["content"] == "This is a test comment"
+    assert data["comments"][0]["_id"] == "comment1"
+    assert data["nextCursor"] is None
+    
+    # Verify top-level comments were read in chronological order without loading the post
+    assert mock_db.comments.find.call_args[0][0] == {"postId": ObjectId(post_id), "depth": 0}
+    mock_cursor.sort.assert_called_once_with([("createdAt", 1), ("_id", 1)])
+    mock_db.posts.find_one.assert_not_called()
 
-# Test search posts with query
+# Test get comments of a missing post
 @patch('server.db')
-@patch('server.fix_ids')
-def test_search_posts_with_query(mock_fix_ids, mock_db, client, sample_posts):
-    """Test searching posts with a query term."""
-    # Setup mocks
-    mock_cursor = MagicMock()
-    mock_cursor.sort.return_value = [sample_posts[0], sample_posts[1]]  # Ambos posts contienen 'python'
-    mock_db.posts.find.return_value = mock_cursor
+def test_get_comments_post_not_found(mock_db, client):
+    """Test that an empty first page for an unknown post returns 404."""
+    mock_db.comments.find.return_value.sort.return_value.skip.return_value.limit.return_value = []
+    mock_db.posts.find_one.return_value = None
+    
+    response = client.get(f'/api/posts/{ObjectId()}/comments')
+    
+    assert response.status_code == 404
+
+# Test create comment
+@patch('server.db')
+def test_create_comment(mock_db, client, auth_headers, common_user):
+    """Test that a new comment is inserted in its collection and counted on the post."""
+    post_id = ObjectId()
+    mock_db.users.find_one.return_value = common_user
+    mock_db.posts.update_one.return_value.matched_count = 1
+    inserted = []
+    mock_db.comments.insert_one.side_effect = lambda doc: inserted.append(dict(doc)) or MagicMock(inserted_id=ObjectId())
+    
+    response = client.post(f'/api/posts/{post_id}/comments', json={"content": "Hola"}, headers=auth_headers)
+    
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data["content"] == "Hola"
+    assert "postId" not in data
+    mock_db.posts.update_one.assert_called_once_with({"_id": post_id}, {"$inc": {"commentCount": 1}})
+    assert inserted[0]["postId"] == post_id
+    assert inserted[0]["path"] == data["_id"]
+    assert inserted[0]["depth"] == 0
+    # Se guarda antes de contarlo
+    calls = [name for name, _, _ in mock_db.mock_calls if name in ("comments.insert_one", "posts.update_one")]
+    assert calls == ["comments.insert_one", "posts.update_one"]
+
+@patch('server.db')
+def test_create_comment_on_missing_post(mock_db, client, auth_headers, common_user):
+    """Test that a comment on a missing post is removed again."""
+    mock_db.users.find_one.return_value = common_user
+    mock_db.posts.update_one.return_value.matched_count = 0
+    
+    response = client.post(f'/api/posts/{ObjectId()}/comments', json={"content": "Hola"}, headers=auth_headers)
+    
+    assert response.status_code == 404
+    comment_id = mock_db.comments.insert_one.call_args[0][0]["_id"]
+    mock_db.comments.delete_one.assert_called_once_with({"_id": comment_id})
+
+# Test reply to a comment
+@patch('server.db')
+def test_create_reply(mock_db, client, auth_headers, common_user):
+    """Test that a reply extends the parent's materialized path."""
+    post_id, parent_id = ObjectId(), ObjectId()
+    mock_db.users.find_one.return_value = common_user
+    mock_db.comments.find_one.return_value = {"_id": parent_id, "path": str(parent_id), "depth": 0}
+    mock_db.posts.update_one.return_value.matched_count = 1
+    
+    response = client.post(
+        f'/api/posts/{post_id}/comments',
+        json={"content": "Respuesta", "parentId": str(parent_id)},
+        headers=auth_headers
+    )
+    
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data["parentId"] == str(parent_id)
+    assert data["path"] == f"{parent_id}/{data['_id']}"
+    assert data["depth"] == 1
+    mock_db.comments.update_one.assert_called_once_with({"_id": parent_id}, {"$inc": {"replyCount": 1}})
+
+@patch('server.db')
+def test_failed_reply_is_undone(mock_db, client, auth_headers, common_user):
+    """Test that a failed replyCount update removes the reply and its commentCount."""
+    post_id, parent_id = ObjectId(), ObjectId()
+    mock_db.users.find_one.return_value = common_user
+    mock_db.comments.find_one.return_value = {"_id": parent_id, "path": str(parent_id), "depth": 0}
+    mock_db.posts.update_one.return_value.matched_count = 1
+    mock_db.comments.update_one.side_effect = Exception("connection lost")
     
-    # Mock de la función fix_ids para devolver la lista tal cual (con IDs convertidos)
-    mock_fix_ids.side_effect = lambda x: [
-        {**post, "_id": str(post["_id"])} for post in x
+    response = client.post(
+        f'/api/posts/{post_id}/comments',
+        json={"content": "Respuesta", "parentId": str(parent_id)},
+        headers=auth_headers
+    )
+    
+    assert response.status_code == 400
+    comment_id = mock_db.comments.insert_one.call_args[0][0]["_id"]
+    mock_db.comments.delete_one.assert_called_once_with({"_id": comment_id})
+    mock_db.posts.update_one.assert_called_with({"_id": post_id}, {"$inc": {"commentCount": -1}})
+
+@patch('server.db')
+def test_create_reply_to_missing_comment(mock_db, client, auth_headers, common_user):
+    """Test replying to a comment that does not exist."""
+    mock_db.users.find_one.return_value = common_user
+    mock_db.comments.find_one.return_value = None
+    
+    response = client.post(
+        f'/api/posts/{ObjectId()}/comments',
+        json={"content": "Respuesta", "parentId": str(ObjectId())},
+        headers=auth_headers
+    )
+    
+    assert response.status_code == 404
+    mock_db.comments.insert_one.assert_not_called()
+
+# Test get replies
+@patch('server.db')
+def test_get_comment_replies(mock_db, client):
+    """Test that a subtree is fetched with one range query in thread order."""
+    post_id, root_id = ObjectId(), ObjectId()
+    reply_ids = [ObjectId() for _ in range(3)]
+    replies = [
+        {"_id": reply_ids[0], "path": f"{root_id}/{reply_ids[0]}", "parentId": root_id, "depth": 1},
+        {"_id": reply_ids[1], "path": f"{root_id}/{reply_ids[0]}/{reply_ids[1]}", "parentId": reply_ids[0], "depth": 2},
+        {"_id": reply_ids[2], "path": f"{root_id}/{reply_ids[2]}", "parentId": root_id, "depth": 1}
     ]
+    mock_db.comments.find_one.return_value = {"_id": root_id, "path": str(root_id)}
+    mock_db.comments.find.return_value.sort.return_value.limit.return_value = replies
+    
+    response = client.get(f'/api/posts/{post_id}/comments/{root_id}/replies?limit=2')
+    
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [r["_id"] for r in data["replies"]] == [str(reply_ids[0]), str(reply_ids[1])]
+    assert data["nextCursor"]
+    assert mock_db.comments.find.call_args[0][0] == {
+        "postId": post_id, "path": {"$gt": f"{root_id}/", "$lt": f"{root_id}0"}
+    }
+    mock_db.comments.find.return_value.sort.assert_called_once_with("path", 1)
+    
+    # La siguiente página continúa después de la última ruta devuelta
+    mock_db.comments.find.reset_mock()
+    mock_db.comments.find.return_value.sort.return_value.limit.return_value = replies[2:]
+    response = client.get(f'/api/posts/{post_id}/comments/{root_id}/replies?limit=2&cursor={data["nextCursor"]}')
+    data = json.loads(response.data)
+    assert [r["_id"] for r in data["replies"]] == [str(reply_ids[2])]
+    assert data["nextCursor"] is None
+    assert mock_db.comments.find.call_args[0][0]["path"]["$gt"] == replies[1]["path"]
+
+# Test delete comment
+def round_trips(mock_db):
+    """Count the operations sent to the posts and comments collections."""
+    return len(mock_db.posts.method_calls) + len(mock_db.comments.method_calls)
+
+@patch('server.db')
+def test_delete_own_comment(mock_db, client, auth_headers):
+    """Test that the comment author deletes a comment in one conditional operation."""
+    post_id, comment_id = ObjectId(), ObjectId()
+    mock_db.comments.find_one_and_delete.return_value = {"_id": comment_id, "path": str(comment_id), "parentId": None}
+    
+    response = client.delete(f'/api/posts/{post_id}/comments/{comment_id}', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert mock_db.comments.find_one_and_delete.call_args[0][0] == {
+        "_id": comment_id, "postId": post_id, "author.userId": "test_user_id"
+    }
+    # Sin respuestas no hay nada más que borrar
+    mock_db.comments.delete_many.assert_not_called()
+    mock_db.posts.find_one.assert_not_called()
+    mock_db.posts.update_one.assert_called_once_with({"_id": post_id}, {"$inc": {"commentCount": -1}})
+    mock_db.comments.update_one.assert_not_called()
+    # Antes: find_one + delete_many + update_one
+    assert round_trips(mock_db) == 2
+
+@patch('server.db')
+def test_delete_comment_with_replies(mock_db, client, auth_headers):
+    """Test that deleting a reply removes its subtree and updates both counters."""
+    post_id, parent_id, comment_id = ObjectId(), ObjectId(), ObjectId()
+    path = f"{parent_id}/{comment_id}"
+    mock_db.comments.find_one_and_delete.return_value = {
+        "_id": comment_id, "path": path, "parentId": parent_id, "replyCount": 1
+    }
+    mock_db.comments.delete_many.return_value.deleted_count = 2
+    
+    response = client.delete(f'/api/posts/{post_id}/comments/{comment_id}', headers=auth_headers)
+    
+    assert response.status_code == 200
+    mock_db.comments.delete_many.assert_called_once_with(
+        {"postId": post_id, "path": {"$gt": f"{path}/", "$lt": f"{path}0"}}
+    )
+    mock_db.posts.update_one.assert_called_once_with({"_id": post_id}, {"$inc": {"commentCount": -3}})
+    mock_db.comments.update_one.assert_called_once_with({"_id": parent_id}, {"$inc": {"replyCount": -1}})
+
+@patch('server.db')
+def test_delete_comment_as_post_author(mock_db, client, auth_headers):
+    """Test that the post author can delete other users' comments."""
+    post_id = ObjectId()
+    mock_db.comments.find_one_and_delete.side_effect = [None, {"_id": "comment1", "path": "comment1"}]
+    mock_db.posts.find_one.return_value = {"_id": post_id}
+    
+    response = client.delete(f'/api/posts/{post_id}/comments/comment1', headers=auth_headers)
+    
+    assert response.status_code == 200
+    mock_db.posts.find_one.assert_called_once_with({"_id": post_id, "author.userId": "test_user_id"}, {"_id": 1})
+    mock_db.posts.update_one.assert_called_once_with({"_id": post_id}, {"$inc": {"commentCount": -1}})
+
+@patch('server.db')
+def test_delete_comment_of_another_user(mock_db, client, auth_headers):
+    """Test that only the comment or post author can delete a comment."""
+    mock_db.comments.find_one_and_delete.return_value = None
+    mock_db.comments.find_one.return_value = {"_id": "comment1"}
+    mock_db.posts.find_one.return_value = None
+    
+    response = client.delete(f'/api/posts/{ObjectId()}/comments/comment1', headers=auth_headers)
+    
+    assert response.status_code == 401
+    assert mock_db.comments.find_one_and_delete.call_count == 1
+    mock_db.posts.update_one.assert_not_called()
+
+@patch('server.db')
+def test_delete_missing_comment(mock_db, client, auth_headers):
+    """Test that a missing comment returns 404."""
+    mock_db.comments.find_one_and_delete.return_value = None
+    mock_db.comments.find_one.return_value = None
+    
+    response = client.delete(f'/api/posts/{ObjectId()}/comments/comment1', headers=auth_headers)
+    
+    assert response.status_code == 404
+
+# Test migration of embedded comments
+def test_migrate_embedded_comments(sample_post_with_comments):
+    """Test that embedded comments are moved to their collection and counted."""
+    from comments import migrate_embedded_comments
+    db = MagicMock()
+    db.posts.find.return_value.batch_size.return_value = [sample_post_with_comments]
+    
+    assert migrate_embedded_comments(db) == 1
+    
+    inserted = db.comments.bulk_write.call_args[0][0][0]._doc["$setOnInsert"]
+    assert inserted["_id"] == "comment1"
+    assert inserted["path"] == "comment1"
+    assert inserted["depth"] == 0
+    assert inserted["postId"] == sample_post_with_comments["_id"]
+    post_update = db.posts.bulk_write.call_args[0][0][0]._doc
+    assert post_update == {"$unset": {"comments": ""}, "$inc": {"commentCount": 1}}
+
+def mock_search_index(mock_db, postings, frequencies, docs=10, length=100):
+    """Configure the inverted index collections of a mocked database."""
+    mock_db.search_terms.find.return_value = [{"_id": t, "df": df} for t, df in frequencies.items()]
+    mock_db.search_stats.find_one.return_value = {"_id": "corpus", "docs": docs, "length": length}
+    mock_db.search_postings.find.return_value.sort.return_value = sorted(postings, key=lambda p: p["postId"])
+
+# Test search posts with query
+@patch('server.db')
+def test_search_posts_with_query(mock_db, client, sample_posts):
+    """Test searching posts with a query term returns ranked results with snippets."""
+    guide_id, basics_id = sample_posts[0]["_id"], sample_posts[1]["_id"]
+    mock_search_index(mock_db, [
+        {"term": "python", "postId": guide_id, "tf": 5, "length": 10},
+        {"term": "python", "postId": basics_id, "tf": 1, "length": 10}
+    ], {"python": 2})
+    mock_db.posts.find.return_value = [sample_posts[1], sample_posts[0]]
     
     # Make request
-    response = client.get('/api/posts/search?q=python')
+    response = client.get('/api/posts/search?q=Python')
     
     # Assertions
     assert response.status_code == 200
     data = json.loads(response.data)
-    assert len(data) == 2
-    assert "Python Programming Guide" in [post["title"] for post in data]
-    assert "JavaScript Basics" in [post["title"] for post in data]
+    assert [post["title"] for post in data["posts"]] == ["Python Programming Guide", "JavaScript Basics"]
+    assert data["posts"][0]["score"] > data["posts"][1]["score"]
+    assert data["pagination"] == {"total": 2, "page": 1, "limit": 10, "totalPages": 1, "nextCursor": None}
+    
+    # El contenido completo se sustituye por un snippet resaltado
+    first = data["posts"][0]
+    assert "content" not in first
+    assert first["snippet"] == "This is a guide about Python programming language"
+    assert [first["snippet"][a:b] for a, b in first["highlights"]] == ["Python"]
     
-    # Verify correct query was used
-    mock_db.posts.find.assert_called_once()
+    # Verify the inverted index was queried with normalized terms, without $regex
+    index_query = mock_db.search_postings.find.call_args[0][0]
+    assert index_query == {"term": {"$in": ["python"]}}
     call_args = mock_db.posts.find.call_args[0][0]
-    assert "$or" in call_args
-    assert "status" in call_args
+    assert "$or" not in call_args
+    assert call_args["_id"] == {"$in": [guide_id, basics_id]}
     assert call_args["status"] == "published"
 
+# Test search requires every term to match
+@patch('server.db')
+def test_search_posts_requires_all_terms(mock_db, client, sample_posts):
+    """Test that a multi-term search only returns posts matching every term."""
+    guide_id, basics_id = sample_posts[0]["_id"], sample_posts[1]["_id"]
+    mock_search_index(mock_db, [
+        {"term": "python", "postId": guide_id, "tf": 1, "length": 10},
+        {"term": "guide", "postId": guide_id, "tf": 1, "length": 10},
+        {"term": "python", "postId": basics_id, "tf": 1, "length": 10}
+    ], {"python": 2, "guide": 1})
+    mock_db.posts.find.return_value = [sample_posts[0]]
+    
+    response = client.get('/api/posts/search?q=python guide')
+    
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data["pagination"]["total"] == 1
+    call_args = mock_db.posts.find.call_args[0][0]
+    assert call_args["_id"] == {"$in": [guide_id]}
+
+# Test search pagination
+@patch('server.db')
+def test_search_posts_pagination(mock_db, client, sample_posts):
+    """Test that only the requested page of ranked results is fetched."""
+    guide_id, basics_id = sample_posts[0]["_id"], sample_posts[1]["_id"]
+    mock_search_index(mock_db, [
+        {"term": "python", "postId": guide_id, "tf": 5, "length": 10},
+        {"term": "python", "postId": basics_id, "tf": 1, "length": 10}
+    ], {"python": 2})
+    mock_db.posts.find.return_value = [sample_posts[1]]
+    
+    response = client.get('/api/posts/search?q=python&page=2&limit=1')
+    
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [post["title"] for post in data["posts"]] == ["JavaScript Basics"]
+    # Mismo bloque de paginación que los listados; sin cursor (orden por relevancia)
+    assert data["pagination"] == {"total": 2, "page": 2, "limit": 1, "totalPages": 2, "nextCursor": None}
+    assert mock_db.posts.find.call_args[0][0]["_id"] == {"$in": [basics_id]}
+
+    # Mismo límite máximo que los listados
+    response = client.get(f'/api/posts/search?q=python&limit={MAX_LIMIT + 1}')
+    assert json.loads(response.data)["pagination"]["limit"] == MAX_LIMIT
+
 # Test search posts with empty query
 @patch('server.db')
 def test_search_posts_with_empty_query(mock_db, client):
@@ -191,16 +488,10 @@ def test_search_posts_without_query_parameter(mock_db, client):
 
 # Test search posts with query matching no posts
 @patch('server.db')
-@patch('server.fix_ids')
-def test_search_posts_with_no_results(mock_fix_ids, mock_db, client):
+def test_search_posts_with_no_results(mock_db, client):
     """Test searching posts with a query that matches no posts."""
-    # Setup mocks
-    mock_cursor = MagicMock()
-    mock_cursor.sort.return_value = []  # No posts match
-    mock_db.posts.find.return_value = mock_cursor
-    
-    # Mock de la función fix_ids para devolver una lista vacía
-    mock_fix_ids.return_value = []
+    # Setup mocks: el término no existe en el índice
+    mock_db.search_terms.find.return_value = []
     
     # Make request
     response = client.get('/api/posts/search?q=nonexistentterm')
@@ -208,8 +499,9 @@ def test_search_posts_with_no_results(mock_fix_ids, mock_db, client):
     # Assertions
     assert response.status_code == 200
     data = json.loads(response.data)
-    assert len(data) == 0
-    assert isinstance(data, list)
+    assert data["posts"] == []
+    assert data["pagination"]["total"] == 0
     
-    # Verify correct query was used
-    mock_db.posts.find.assert_called_once()
\ No newline at end of file
+    # Verify the postings and posts were never read
+    mock_db.search_postings.find.assert_not_called()
+    mock_db.posts.find.assert_not_called()
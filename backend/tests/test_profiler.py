@@ -0,0 +1,109 @@
+import pytest
+import sys
+import time
+from unittest.mock import patch
+from flask import Flask
+from profiler import SamplingProfiler, collapse, flamegraph_svg, stack_tree
+from server import app, profiler
+
+@pytest.fixture
+def client():
+    """Create a test client for the app."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def profiled_app(**options):
+    """A small app with a slow and a fast route and its own profiler."""
+    test_app = Flask(__name__)
+    test_profiler = SamplingProfiler(interval=0.001, **options)
+    test_profiler.init_app(test_app)
+
+    @test_app.get("/slow")
+    def slow_view():
+        time.sleep(0.1)
+        return "ok"
+
+    @test_app.get("/fast")
+    def fast_view():
+        return "ok"
+
+    return test_app, test_profiler
+
+def test_collapse_current_stack():
+    """Test that stacks are collapsed from the root to the current function."""
+    stack = collapse(sys._getframe())
+
+    assert stack.split(";")[-1].startswith("test_collapse_current_stack (test_profiler.py:")
+
+def test_slow_requests_are_captured():
+    """Test that only requests over the threshold are sampled."""
+    test_app, test_profiler = profiled_app(threshold=0.02, sample_rate=0)
+    client = test_app.test_client()
+    try:
+        client.get("/fast")
+        client.get("/slow")
+        time.sleep(0.02)
+
+        captures = test_profiler.captures()
+        assert [c["route"] for c in captures] == ["/slow"]
+        assert captures[0]["reason"] == "slow"
+        assert captures[0]["samples"] > 0
+        assert "slow_view" in test_profiler.collapsed()
+    finally:
+        test_profiler.stop()
+
+def test_sampled_requests_are_captured_from_the_start():
+    """Test that sampled requests are profiled below the threshold."""
+    test_app, test_profiler = profiled_app(threshold=10, sample_rate=1)
+    try:
+        test_app.test_client().get("/slow")
+        time.sleep(0.02)
+
+        captures = test_profiler.captures("/slow")
+        assert captures[0]["reason"] == "sampled"
+    finally:
+        test_profiler.stop()
+
+def test_ring_buffer_is_bounded():
+    """Test that old captures are dropped once the buffer is full."""
+    test_app, test_profiler = profiled_app(threshold=0, sample_rate=0, capacity=2)
+    client = test_app.test_client()
+    try:
+        for _ in range(3):
+            client.get("/slow")
+        time.sleep(0.02)
+
+        assert len(test_profiler.captures()) == 2
+    finally:
+        test_profiler.stop()
+
+def test_flamegraph_svg():
+    """Test that the flame graph has a frame per function."""
+    stacks = {"main;handler;query": 3, "main;handler;render": 1}
+
+    assert stack_tree(stacks)[1]["main"][1]["handler"][0] == 4
+    svg = flamegraph_svg(stacks)
+    assert svg.startswith("<svg")
+    assert "query (3 samples)" in svg
+    assert "render (1 samples)" in svg
+
+def test_admin_endpoints_require_admin(client, auth_headers):
+    """Test that profiles are only available to admin users."""
+    response = client.get('/api/admin/profiles', headers=auth_headers)
+
+    assert response.status_code == 403
+
+def test_admin_downloads(client, auth_headers):
+    """Test the collapsed stack and flame graph downloads."""
+    with patch('server.ADMIN_USER_IDS', {"test_user_id"}), \
+            patch.object(profiler, "stacks", return_value={"main;get_posts": 2}):
+        collapsed = client.get('/api/admin/profiles/collapsed', headers=auth_headers)
+        flamegraph = client.get('/api/admin/profiles/flamegraph', headers=auth_headers)
+        listing = client.get('/api/admin/profiles', headers=auth_headers)
+
+    assert collapsed.data.decode() == "main;get_posts 2\n"
+    assert flamegraph.mimetype == "image/svg+xml"
+    assert "attachment" in flamegraph.headers["Content-Disposition"]
+    assert listing.status_code == 200
+    assert "captures" in listing.get_json()
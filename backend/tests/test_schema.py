@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import MagicMock
+from schema import INDEXES, ensure_indexes, plan_stages, winning_plan, audit_query_plans
+
+def ixscan_plan():
+    return {"queryPlanner": {"winningPlan": {
+        "stage": "LIMIT",
+        "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "status_created"}}
+    }}}
+
+def collscan_plan():
+    return {"queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}}}
+
+@pytest.fixture
+def db():
+    """A mocked database with one mocked collection per name."""
+    collections = {}
+    database = MagicMock()
+    database.__getitem__.side_effect = lambda name: collections.setdefault(name, MagicMock(name=name))
+    database.collections = collections
+    return database
+
+def index_options(collection):
+    return {index.document["name"]: index.document for index in INDEXES[collection]}
+
+def test_declared_indexes():
+    """Test that the queried fields have indexes and slugs are unique."""
+    posts = index_options("posts")
+    assert posts["slug_unique"]["unique"] is True
+    assert posts["slugs_unique"]["unique"] is True and posts["slugs_unique"]["sparse"] is True
+    assert list(posts["status_created"]["key"]) == ["status", "createdAt", "_id"]
+    assert list(posts["author_created"]["key"]) == ["author.userId", "createdAt", "_id"]
+    assert index_options("post_likes")["post_user_unique"]["unique"] is True
+
+def test_ensure_indexes_all_collections(db):
+    """Test that every declared collection gets its indexes in one call."""
+    ensure_indexes(db)
+
+    assert set(db.collections) == set(INDEXES)
+    for name, collection in db.collections.items():
+        collection.create_indexes.assert_called_once_with(INDEXES[name])
+
+def test_ensure_indexes_some_collections(db):
+    """Test that ensure_indexes can be limited to some collections."""
+    ensure_indexes(db, "comments")
+
+    assert list(db.collections) == ["comments"]
+
+def test_plan_stages_nested():
+    """Test that the stages of nested and SBE plans are all visited."""
+    sbe = {"queryPlanner": {"winningPlan": {"queryPlan": {
+        "stage": "OR",
+        "inputStages": [{"stage": "IXSCAN"}, {"stage": "FETCH", "inputStage": {"stage": "COLLSCAN"}}]
+    }}}}
+
+    assert list(plan_stages(winning_plan(sbe))) == ["OR", "IXSCAN", "FETCH", "COLLSCAN"]
+
+def test_audit_query_plans(db):
+    """Test that the audit ensures the indexes first and flags collection scans."""
+    def explain_for(name):
+        collection = db[name]
+        # Todas las consultas usan un índice salvo la de usuarios
+        plan = collscan_plan() if name == "users" else ixscan_plan()
+        collection.find.return_value.sort.return_value.limit.return_value.explain.return_value = plan
+        collection.find.return_value.limit.return_value.explain.return_value = plan
+    for name in INDEXES:
+        explain_for(name)
+
+    results = audit_query_plans(db)
+
+    db["posts"].create_indexes.assert_called_once()
+    collscans = [name for name, _, collscan in results if collscan]
+    assert collscans == ["get_user_data"]
+    assert ("get_posts", ["LIMIT", "FETCH", "IXSCAN"], False) in results
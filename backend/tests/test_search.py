@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import MagicMock
+from bson.objectid import ObjectId
+from search import (
+    TITLE_BOOST, normalize, tokenize, query_terms, build_postings, index_post,
+    remove_post, top_matches, make_snippet
+)
+
+# Test accent folding
+def test_normalize_folds_accents_and_case():
+    """Test that normalization removes accents and lowercases."""
+    assert normalize("Canción ÁRBOL Niño") == "cancion arbol nino"
+
+# Test tokenizer
+def test_tokenize_skips_short_tokens_and_punctuation():
+    """Test that tokenization splits on punctuation and drops one-letter tokens."""
+    assert tokenize("¡Hola, mundo! y adiós...") == ["hola", "mundo", "adios"]
+
+def test_query_terms_are_unique():
+    """Test that repeated query terms are only searched once."""
+    assert query_terms("Python python PYTHÓN flask") == ["python", "flask"]
+
+# Test postings
+def test_build_postings_boosts_title_terms():
+    """Test that postings store weighted term frequency and document length."""
+    post = {"_id": ObjectId(), "title": "Python", "content": "python y flask"}
+    postings = {p["term"]: p for p in build_postings(post)}
+    assert set(postings) == {"python", "flask"}
+    assert postings["python"]["tf"] == 1 + TITLE_BOOST
+    assert postings["python"]["length"] == 2 + TITLE_BOOST
+    assert postings["flask"]["postId"] == post["_id"]
+
+def test_index_post_updates_changed_terms_only():
+    """Test that reindexing a post prunes stale terms and adjusts document frequencies."""
+    db = MagicMock()
+    post_id = ObjectId()
+    db.search_docs.find_one_and_update.return_value = {"_id": post_id, "length": 2, "terms": ["hola", "viejo"]}
+    index_post(db, {"_id": str(post_id), "title": "", "content": "hola mundo", "status": "published"})
+
+    assert len(db.search_postings.bulk_write.call_args[0][0]) == 2
+    db.search_postings.delete_many.assert_called_once_with({"postId": post_id, "term": {"$in": ["viejo"]}})
+    df_updates = [op._doc for op in db.search_terms.bulk_write.call_args[0][0]]
+    assert {"$inc": {"df": 1}} in df_updates and {"$inc": {"df": -1}} in df_updates
+    db.search_stats.update_one.assert_called_once_with(
+        {"_id": "corpus"}, {"$inc": {"docs": 0, "length": 0}}, upsert=True
+    )
+
+def test_index_post_removes_drafts():
+    """Test that unpublished posts are removed from the index."""
+    db = MagicMock()
+    post_id = ObjectId()
+    db.search_docs.find_one_and_delete.return_value = {"_id": post_id, "length": 4, "terms": ["borrador"]}
+    index_post(db, {"_id": post_id, "title": "Borrador", "content": "texto", "status": "draft"})
+
+    db.search_postings.bulk_write.assert_not_called()
+    db.search_postings.delete_many.assert_called_once_with({"postId": post_id})
+    db.search_stats.update_one.assert_called_once_with(
+        {"_id": "corpus"}, {"$inc": {"docs": -1, "length": -4}}, upsert=True
+    )
+
+def test_remove_post_not_indexed():
+    """Test removing a post that was never indexed is a single round trip."""
+    db = MagicMock()
+    db.search_docs.find_one_and_delete.return_value = None
+    remove_post(db, str(ObjectId()))
+    db.search_postings.delete_many.assert_not_called()
+
+# Test ranking
+def test_top_matches_keeps_only_k_best():
+    """Test that BM25 ranking returns the k best posts and the total match count."""
+    db = MagicMock()
+    ids = [ObjectId() for _ in range(5)]
+    db.search_terms.find.return_value = [{"_id": "python", "df": 5}]
+    db.search_stats.find_one.return_value = {"docs": 100, "length": 1000}
+    db.search_postings.find.return_value.sort.return_value = [
+        {"term": "python", "postId": post_id, "tf": tf, "length": 10}
+        for post_id, tf in zip(ids, [1, 4, 2, 5, 3])
+    ]
+
+    ranked, total = top_matches(db, ["python"], 2)
+    assert total == 5
+    assert [post_id for _, post_id in ranked] == [ids[3], ids[1]]
+
+# Test snippets
+def test_make_snippet_highlights_accented_matches():
+    """Test that snippets highlight matches regardless of accents."""
+    text = " ".join(f"relleno{i}" for i in range(50)) + " Una canción sobre Python."
+    snippet, highlights = make_snippet(text, ["cancion", "python"], max_words=10)
+    assert snippet.startswith("…") and snippet.endswith("Python")
+    assert [snippet[a:b] for a, b in highlights] == ["canción", "Python"]
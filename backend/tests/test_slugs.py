@@ -0,0 +1,149 @@
+import pytest
+from unittest.mock import MagicMock, patch, call
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from server import app, view_counter
+from slugs import MAX_SLUG_ATTEMPTS, create_slug, slug_filter, write_with_slug, repair_slugs
+
+@pytest.fixture
+def client():
+    """Create a test client for the app."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def mock_db():
+    """Mock the database for testing."""
+    with patch('server.db') as mock_db:
+        yield mock_db
+        view_counter.flush()
+
+def duplicate(key_pattern):
+    """A DuplicateKeyError as raised by the server for a unique index."""
+    return DuplicateKeyError("E11000 duplicate key error", 11000, {"keyPattern": key_pattern})
+
+def counters(db, start=1):
+    """Make slug_counters return consecutive sequence values."""
+    values = iter(range(start, start + 100))
+    db.slug_counters.find_one_and_update.side_effect = lambda *args, **kwargs: {"seq": next(values)}
+
+# Test allocation
+def test_create_slug():
+    """Test that titles become lowercase slugs without special characters."""
+    assert create_slug("Hello World!") == "hello-world"
+
+def test_free_slug_is_written_directly():
+    """Test that a free slug needs no check and no counter."""
+    db = MagicMock()
+    write = MagicMock(return_value="result")
+
+    assert write_with_slug(db, "title", write) == ("result", "title")
+    write.assert_called_once_with("title")
+    db.slug_counters.find_one_and_update.assert_not_called()
+
+def test_taken_slugs_get_sequence_suffixes():
+    """Test deterministic suffixes from the per-base counter."""
+    db = MagicMock()
+    counters(db)
+    write = MagicMock(side_effect=[duplicate({"slug": 1}), duplicate({"slugs": 1}), "result"])
+
+    assert write_with_slug(db, "title", write) == ("result", "title-3")
+    assert [call[0][0] for call in write.call_args_list] == ["title", "title-2", "title-3"]
+    assert db.slug_counters.find_one_and_update.call_args[0][:2] == ({"_id": "title"}, {"$inc": {"seq": 1}})
+
+def test_other_duplicates_are_not_retried():
+    """Test that a duplicate on another unique index is raised as is."""
+    db = MagicMock()
+    write = MagicMock(side_effect=duplicate({"userId": 1}))
+
+    with pytest.raises(DuplicateKeyError):
+        write_with_slug(db, "title", write)
+    write.assert_called_once()
+
+def test_attempts_are_limited():
+    """Test that allocation gives up after MAX_SLUG_ATTEMPTS writes."""
+    db = MagicMock()
+    counters(db)
+    write = MagicMock(side_effect=duplicate({"slug": 1}))
+
+    with pytest.raises(DuplicateKeyError):
+        write_with_slug(db, "title", write)
+    assert write.call_count == MAX_SLUG_ATTEMPTS
+
+# Test endpoints
+def test_create_post_without_slug_lookup(client, mock_db, auth_headers, common_user):
+    """Test that creating a post inserts directly and retries on a taken slug."""
+    mock_db.users.find_one.return_value = common_user
+    counters(mock_db)
+    inserted = []
+
+    def insert_one(post):
+        inserted.append(dict(post))
+        if len(inserted) == 1:
+            raise duplicate({"slug": 1})
+        return MagicMock(inserted_id=ObjectId())
+
+    mock_db.posts.insert_one.side_effect = insert_one
+
+    response = client.post('/api/posts', json={"title": "Hello World", "content": "Text"}, headers=auth_headers)
+
+    assert response.status_code == 201
+    assert [post["slug"] for post in inserted] == ["hello-world", "hello-world-2"]
+    assert inserted[1]["slugs"] == ["hello-world-2"]
+    mock_db.posts.find_one.assert_not_called()
+
+def test_create_post_slug_unavailable(client, mock_db, auth_headers, common_user):
+    """Test that an exhausted allocation returns 409."""
+    mock_db.users.find_one.return_value = common_user
+    counters(mock_db)
+    mock_db.posts.insert_one.side_effect = duplicate({"slug": 1})
+
+    response = client.post('/api/posts', json={"title": "Hello", "content": "Text"}, headers=auth_headers)
+
+    assert response.status_code == 409
+
+def test_old_slug_resolves(client, mock_db):
+    """Test that a renamed post is found by its previous slug in one query."""
+    post = {"_id": ObjectId(), "title": "New", "slug": "new", "slugs": ["old", "new"], "views": 0}
+    mock_db.posts.find_one.return_value = post
+
+    response = client.get('/api/posts/slug/old')
+
+    assert response.status_code == 200
+    assert response.get_json()["slug"] == "new"
+    assert mock_db.posts.find_one.call_count == 1
+    assert mock_db.posts.find_one.call_args[0][0] == slug_filter("old")
+
+# Test repair
+def test_repair_renames_duplicate_slugs():
+    """Test that repeated slugs get the next free suffix before the unique indexes are built."""
+    db = MagicMock()
+    oldest, newer, renamed = ObjectId(), ObjectId(), ObjectId()
+    db.posts.aggregate.return_value = [
+        {"_id": "hello", "posts": [{"_id": oldest, "current": True}, {"_id": newer, "current": True}], "count": 2},
+        {"_id": "old", "posts": [{"_id": renamed, "current": False}, {"_id": oldest, "current": True}], "count": 2}
+    ]
+    counters(db)
+    # "hello-2" ya existe: se salta
+    db.posts.find_one.side_effect = [{"_id": ObjectId()}, None]
+
+    assert repair_slugs(db) == 1
+    assert db.posts.update_one.call_args_list[:2] == [
+        call({"_id": newer}, {"$set": {"slug": "hello-3"}, "$pull": {"slugs": "hello"}}),
+        call({"_id": newer, "slugs": {"$exists": True}}, {"$addToSet": {"slugs": "hello-3"}})
+    ]
+    # Un slug anterior lo pierde el post que no lo tiene como actual
+    db.posts.update_one.assert_called_with({"_id": renamed}, {"$pull": {"slugs": "old"}})
+    db.__getitem__.return_value.create_indexes.assert_called_once()
+
+def test_schema_ensure_fails_loudly():
+    """Test that an index build failure makes schema-ensure exit with an error."""
+    error = OperationFailure("E11000 duplicate key error", 11000)
+
+    with patch('server.ensure_indexes', side_effect=error):
+        result = app.test_cli_runner().invoke(args=["schema-ensure"])
+
+    assert result.exit_code != 0
+    assert "slugs-repair" in result.output
+    assert "slugs-repair" in app.cli.commands
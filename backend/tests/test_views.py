@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import MagicMock
+from bson.objectid import ObjectId
+from views import ViewCounter
+
+@pytest.fixture
+def collection():
+    """Mocked posts collection."""
+    return MagicMock()
+
+@pytest.fixture
+def counter(collection):
+    """View counter whose background thread never fires during a test."""
+    counter = ViewCounter(lambda: collection, interval=3600)
+    yield counter
+    counter._stop.set()
+
+# Test buffering
+def test_record_buffers_views(counter, collection):
+    """Test that recording views does not write to the database."""
+    post_id = ObjectId()
+    counter.record(post_id)
+    counter.record(post_id)
+    assert counter.pending(post_id) == 2
+    collection.bulk_write.assert_not_called()
+
+# Test flush
+def test_flush_writes_one_bulk_inc(counter, collection):
+    """Test that a flush sends all increments in a single bulk_write."""
+    first, second = ObjectId(), ObjectId()
+    for post_id in (first, second, first):
+        counter.record(post_id)
+
+    assert counter.flush() == 2
+
+    operations = collection.bulk_write.call_args[0][0]
+    assert {op._filter["_id"]: op._doc["$inc"]["views"] for op in operations} == {first: 2, second: 1}
+    assert counter.pending(first) == 0
+    assert counter.stats()["flushedViews"] == 3
+    assert counter.lag() == 0.0
+
+def test_flush_nothing_pending(counter, collection):
+    """Test that an empty flush does not touch the database."""
+    assert counter.flush() == 0
+    collection.bulk_write.assert_not_called()
+
+def test_failed_flush_keeps_views(counter, collection):
+    """Test that views are kept for the next flush when the write fails."""
+    post_id = ObjectId()
+    counter.record(post_id)
+    collection.bulk_write.side_effect = Exception("connection lost")
+
+    assert counter.flush() == 0
+    assert counter.pending(post_id) == 1
+    assert counter.stats()["failedFlushes"] == 1
+    assert counter.lag() > 0
+
+# Test shutdown
+def test_stop_flushes_pending_views(counter, collection):
+    """Test that stopping the counter flushes what is still buffered."""
+    counter.record(ObjectId())
+    counter.stop()
+    collection.bulk_write.assert_called_once()
@@ -0,0 +1,129 @@
+# Contador de vistas con escritura diferida.
+#
+# Leer un post no escribe en su documento: las vistas se acumulan en memoria
+# y un hilo en segundo plano las vuelca cada pocos segundos con un único
+# bulk_write de $inc. Así las lecturas de un post muy visitado no se
+# serializan sobre el mismo documento.
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from pymongo import UpdateOne
+
+FLUSH_INTERVAL = float(os.getenv("VIEWS_FLUSH_INTERVAL", 5))
+
+logger = logging.getLogger(__name__)
+
+class ViewCounter:
+    def __init__(self, get_collection, interval=FLUSH_INTERVAL, on_flush=None):
+        # get_collection se evalúa en cada volcado para usar siempre el cliente actual
+        self._get_collection = get_collection
+        # on_flush recibe los ids de los posts volcados (p. ej. para invalidar cachés)
+        self._on_flush = on_flush
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._oldest = None  # instante de la vista pendiente más antigua
+        self._stop = threading.Event()
+        self._thread = None
+        self.flushed_views = 0
+        self.failed_flushes = 0
+        self.last_flush_lag = 0.0
+        # Tras un fork (workers de gunicorn) el hilo del padre no existe en el
+        # hijo y las vistas pendientes son del padre: empezar de cero
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    # Registrar una vista de un post
+    def record(self, post_id):
+        self._ensure_started()
+        with self._lock:
+            self._pending[post_id] += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+
+    # Vistas aún no volcadas de un post
+    def pending(self, post_id):
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    # Volcar las vistas pendientes en un único bulk_write
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            oldest, self._oldest = self._oldest, None
+        if not batch:
+            return 0
+
+        try:
+            self._get_collection().bulk_write([
+                UpdateOne({"_id": post_id}, {"$inc": {"views": views}})
+                for post_id, views in batch.items()
+            ], ordered=False)
+        except Exception:
+            # Devolver las vistas al buffer para el siguiente intento
+            with self._lock:
+                self._pending.update(batch)
+                self._oldest = min(oldest, self._oldest or oldest)
+            self.failed_flushes += 1
+            logger.exception("Failed to flush %d buffered views", sum(batch.values()))
+            return 0
+
+        self.flushed_views += sum(batch.values())
+        self.last_flush_lag = time.monotonic() - oldest
+        if self._on_flush:
+            self._on_flush(list(batch))
+        logger.debug("Flushed %d posts, lag %.2fs", len(batch), self.last_flush_lag)
+        return len(batch)
+
+    # Segundos que lleva esperando la vista pendiente más antigua
+    def lag(self):
+        with self._lock:
+            return time.monotonic() - self._oldest if self._oldest is not None else 0.0
+
+    def stats(self):
+        with self._lock:
+            pending_posts = len(self._pending)
+            pending_views = sum(self._pending.values())
+        return {
+            "pendingPosts": pending_posts,
+            "pendingViews": pending_views,
+            "lagSeconds": round(self.lag(), 3),
+            "lastFlushLagSeconds": round(self.last_flush_lag, 3),
+            "flushedViews": self.flushed_views,
+            "failedFlushes": self.failed_flushes
+        }
+
+    # Detener el hilo y volcar lo pendiente (al apagar el proceso)
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self._interval)
+        self.flush()
+
+    # El hilo se arranca en el primer uso dentro de cada proceso
+    def _ensure_started(self):
+        if self._thread or self._stop.is_set():
+            return
+        with self._lock:
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+                self._thread.start()
+
+    def _reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._oldest = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.flush()
+
+def create_view_counter(get_collection, interval=FLUSH_INTERVAL, on_flush=None):
+    counter = ViewCounter(get_collection, interval, on_flush)
+    atexit.register(counter.stop)
+    return counter
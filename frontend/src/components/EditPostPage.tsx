@@ -4,6 +4,7 @@ import { useState, useEffect } from 'react'
 import { useRouter, useParams } from 'next/navigation'
 import { useSession } from 'next-auth/react'
 import { postService } from '@/services/api'
+import axios from 'axios'
 import { Post } from '@/types'
 import { Edit, Save, AlignLeft, Clock, AlertCircle, ImageIcon, X } from 'lucide-react'
 import Image from 'next/image'
@@ -160,14 +161,19 @@ export default function EditPostPage() {
                 title: title.trim(),
                 content: content.trim(),
                 status,
-                coverImage: selectedImage?.src.large || currentCoverImage
+                coverImage: selectedImage?.src.large || currentCoverImage,
+                version: post?.version
             });
 
             // Redirigir a la página del post
             router.push(`/posts/${updatedPost.slug}`);
         } catch (err) {
             console.error('Error updating post:', err);
-            setError('Error al actualizar el post. Inténtalo nuevamente.');
+            if (axios.isAxiosError(err) && err.response?.status === 409) {
+                setError('El post se modificó desde otra sesión. Recarga la página para ver los cambios antes de guardar.');
+            } else {
+                setError('Error al actualizar el post. Inténtalo nuevamente.');
+            }
         } finally {
             setSaving(false);
         }
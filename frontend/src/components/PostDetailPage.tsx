@@ -14,6 +14,9 @@ import remarkBreaks from 'remark-breaks';
 
 export default function PostDetailPage() {
     const [post, setPost] = useState<Post | null>(null)
+    const [comments, setComments] = useState<Comment[]>([])
+    const [commentsCursor, setCommentsCursor] = useState<string | null>(null)
+    const [moreCommentsLoading, setMoreCommentsLoading] = useState(false)
     const [newComment, setNewComment] = useState('')
     const [loading, setLoading] = useState(true)
     const [commentLoading, setCommentLoading] = useState(false)
@@ -41,6 +44,16 @@ export default function PostDetailPage() {
                 const postData = await postService.getPostBySlug(slug)
                 setPost(postData)
 
+                // Un slug anterior de un post renombrado: mostrar la URL actual sin volver a pedirlo
+                if (postData.slug !== slug) {
+                    window.history.replaceState(null, '', `/posts/${postData.slug}`)
+                }
+
+                // Primera página de comentarios
+                const commentPage = await commentService.getCommentsByPostId(postData._id)
+                setComments(commentPage.comments)
+                setCommentsCursor(commentPage.nextCursor)
+
                 // Si el usuario está autenticado, verificar si le dio like al post
                 if (session?.accessToken) {
                     const hasLiked = await postService.checkLike(postData._id)
@@ -61,6 +74,21 @@ export default function PostDetailPage() {
         }
     }, [slug, session])
 
+    const handleLoadMoreComments = async () => {
+        if (!post || !commentsCursor) return;
+
+        try {
+            setMoreCommentsLoading(true)
+            const commentPage = await commentService.getCommentsByPostId(post._id, commentsCursor)
+            setComments(prev => [...prev, ...commentPage.comments])
+            setCommentsCursor(commentPage.nextCursor)
+        } catch (err) {
+            console.error('Error fetching comments:', err)
+        } finally {
+            setMoreCommentsLoading(false)
+        }
+    }
+
     const handleSubmitComment = async (e: React.FormEvent) => {
         e.preventDefault()
 
@@ -72,13 +100,13 @@ export default function PostDetailPage() {
             setCommentLoading(true)
             const comment = await commentService.createComment(post._id, newComment)
 
-            // Actualizar el post con el nuevo comentario
+            // Añadir el nuevo comentario al final (solo si ya se cargaron todos) y actualizar el contador
+            if (!commentsCursor) {
+                setComments(prev => [...prev, comment])
+            }
             setPost(prevPost => {
                 if (!prevPost) return null;
-                return {
-                    ...prevPost,
-                    comments: [...prevPost.comments, comment]
-                }
+                return { ...prevPost, commentCount: (prevPost.commentCount ?? 0) + 1 }
             })
 
             setNewComment('')
@@ -101,13 +129,11 @@ export default function PostDetailPage() {
             setDeleteLoading(commentId)
             await commentService.deleteComment(post._id, commentId)
 
-            // Actualizar el post eliminando el comentario
+            // Quitar el comentario de la lista y actualizar el contador
+            setComments(prev => prev.filter(comment => comment._id !== commentId))
             setPost(prevPost => {
                 if (!prevPost) return null;
-                return {
-                    ...prevPost,
-                    comments: prevPost.comments.filter(comment => comment._id !== commentId)
-                }
+                return { ...prevPost, commentCount: Math.max(0, (prevPost.commentCount ?? 1) - 1) }
             })
         } catch (err) {
             console.error('Error deleting comment:', err)
@@ -287,7 +313,7 @@ export default function PostDetailPage() {
             <div className="bg-white rounded-lg shadow-md p-6">
                 <h2 className="text-xl font-bold text-gray-800 mb-6 flex items-center">
                     <MessageCircle className="w-5 h-5 mr-2 text-blue-600" />
-                    Comentarios ({post.comments.length})
+                    Comentarios ({post.commentCount ?? comments.length})
                 </h2>
 
                 {/* Formulario de comentario */}
@@ -337,12 +363,12 @@ export default function PostDetailPage() {
 
                 {/* Lista de comentarios */}
                 <div className="space-y-6">
-                    {post.comments.length === 0 ? (
+                    {comments.length === 0 ? (
                         <p className="text-center py-6 text-gray-500">
                             No hay comentarios aún. ¡Sé el primero en comentar!
                         </p>
                     ) : (
-                        post.comments.map((comment) => (
+                        comments.map((comment) => (
                             <div key={comment._id} className="border-b border-gray-100 pb-6">
                                 <div className="flex items-start space-x-3">
                                     {comment.author.profilePicture ? (
@@ -386,6 +412,16 @@ export default function PostDetailPage() {
                         ))
                     )}
                 </div>
+
+                {commentsCursor && (
+                    <button
+                        onClick={handleLoadMoreComments}
+                        disabled={moreCommentsLoading}
+                        className="mt-6 w-full text-blue-600 hover:text-blue-800 transition disabled:opacity-50"
+                    >
+                        {moreCommentsLoading ? 'Cargando...' : 'Cargar más comentarios'}
+                    </button>
+                )}
             </div>
         </div>
     )
@@ -170,7 +170,7 @@ export default function ProfilePage() {
                         </span>
                       )}
                     </span>
-                    <span>{post.comments.length} comentarios</span>
+                    <span>{post.commentCount ?? 0} comentarios</span>
                     <span>{post.views} vistas</span>
                   </div>
                 </div>
@@ -1,6 +1,6 @@
 'use client'
 
-import { useState, useEffect, Suspense } from 'react'
+import { useState, useEffect, Suspense, ReactNode } from 'react'
 import { useSearchParams, useRouter } from 'next/navigation'
 import { postService } from '@/services/api'
 import { Post } from '@/types'
@@ -27,6 +27,7 @@ function SearchLoading() {
 // Search content component that uses useSearchParams
 function SearchContent() {
   const [posts, setPosts] = useState<Post[]>([])
+  const [total, setTotal] = useState(0)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
   
@@ -41,7 +42,8 @@ function SearchContent() {
       try {
         setLoading(true)
         const results = await postService.searchPosts(query)
-        setPosts(results)
+        setPosts(results.posts)
+        setTotal(results.pagination.total)
         setError(null)
       } catch (err) {
         console.error('Error searching posts:', err)
@@ -58,6 +60,20 @@ function SearchContent() {
     router.push(`/posts/${slug}`)
   }
 
+  // Resaltar en el snippet los términos encontrados (posiciones en code points)
+  const renderSnippet = (post: Post) => {
+    const chars = Array.from(post.snippet ?? '')
+    const parts: ReactNode[] = []
+    let cursor = 0
+    for (const [start, end] of post.highlights ?? []) {
+      parts.push(chars.slice(cursor, start).join(''))
+      parts.push(<mark key={start} className="bg-yellow-200">{chars.slice(start, end).join('')}</mark>)
+      cursor = end
+    }
+    parts.push(chars.slice(cursor).join(''))
+    return parts
+  }
+
   // Formatear fecha
   const formatDate = (dateString: string) => {
     const date = new Date(dateString)
@@ -76,7 +92,7 @@ function SearchContent() {
           Resultados de búsqueda: &quot;{query}&quot;
         </h1>
         {posts.length > 0 && (
-          <p className="text-gray-600">Se encontraron {posts.length} resultados</p>
+          <p className="text-gray-600">Se encontraron {total} resultados</p>
         )}
       </div>
 
@@ -109,7 +125,7 @@ function SearchContent() {
             >
               <div className="p-6 flex-grow">
                 <h2 className="text-xl font-bold text-gray-800 mb-2">{post.title}</h2>
-                <p className="text-gray-600 mb-4 line-clamp-2">{post.content}</p>
+                <p className="text-gray-600 mb-4 line-clamp-2">{renderSnippet(post)}</p>
                 
                 <div className="flex flex-wrap gap-4 text-gray-500 text-sm mb-4">
                   <span className="flex items-center">
@@ -126,7 +142,7 @@ function SearchContent() {
                   </span>
                   <span className="flex items-center">
                     <MessageCircle className="w-4 h-4 mr-1" />
-                    {post.comments?.length || 0}
+                    {post.commentCount ?? 0}
                   </span>
                 </div>
                 
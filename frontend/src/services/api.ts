@@ -1,7 +1,7 @@
 // src/services/api.ts
 import axios from 'axios';
 import { getSession } from 'next-auth/react';
-import { Post, Comment, PaginatedResponse, User } from '@/types';
+import { Post, Comment, CommentPage, ReplyPage, PaginatedResponse, BatchResponse, User } from '@/types';
 
 // Crear instancia de axios con URL base
 const api = axios.create({
@@ -48,6 +48,7 @@ interface UpdatePostData {
 	content?: string;
 	status?: string;
 	coverImage?: string | null; // URL de la imagen de Pexels o null para quitar la imagen
+	version?: number; // versión editada; si otro cambio la incrementó la API responde 409
 }
 
 // Servicio para posts
@@ -64,6 +65,12 @@ export const postService = {
 		return response.data;
 	},
 
+	// Obtener varios posts por id o slug en una sola petición (resumen, sin contenido)
+	getPostsBatch: async (ids: string[]): Promise<BatchResponse<Post>> => {
+		const response = await api.post('/posts/batch', { ids });
+		return response.data;
+	},
+
 	// Obtener un post por slug
 	getPostBySlug: async (slug: string): Promise<Post> => {
 		const response = await api.get(`/posts/slug/${slug}`);
@@ -87,9 +94,9 @@ export const postService = {
 		await api.delete(`/posts/${id}`);
 	},
 
-	// Búsqueda de posts
-	searchPosts: async (query: string): Promise<Post[]> => {
-		const response = await api.get(`/posts/search?q=${encodeURIComponent(query)}`);
+	// Búsqueda de posts (ordenados por relevancia, con snippet en lugar del contenido)
+	searchPosts: async (query: string, page = 1, limit = 10): Promise<PaginatedResponse<Post>> => {
+		const response = await api.get(`/posts/search?q=${encodeURIComponent(query)}&page=${page}&limit=${limit}`);
 		return response.data;
 	},
 
@@ -109,6 +116,12 @@ export const postService = {
 		return response.data.liked;
 	},
 
+	// Saber a cuáles de varios posts (p. ej. una página del feed) dio like el usuario
+	getLikeStatuses: async (postIds: string[]): Promise<Record<string, boolean>> => {
+		const response = await api.post('/posts/likes/status', { postIds });
+		return response.data.liked;
+	},
+
 	// Obtener mis posts (incluyendo borradores)
 	getMyPosts: async (page = 1, limit = 10, status?: string): Promise<PaginatedResponse<Post>> => {
 		let url = `/users/me/posts?page=${page}&limit=${limit}`;
@@ -151,15 +164,25 @@ export const pexelsService = {
 
 // Servicio para comentarios
 export const commentService = {
-	// Obtener comentarios de un post
-	getCommentsByPostId: async (postId: string): Promise<Comment[]> => {
-		const response = await api.get(`/posts/${postId}/comments`);
+	// Obtener una página de comentarios de un post (cursor de la página anterior)
+	getCommentsByPostId: async (postId: string, cursor?: string | null, limit = 20): Promise<CommentPage> => {
+		let url = `/posts/${postId}/comments?limit=${limit}`;
+		if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+		const response = await api.get(url);
+		return response.data;
+	},
+
+	// Obtener una página de respuestas de un comentario ("cargar más respuestas")
+	getReplies: async (postId: string, commentId: string, cursor?: string | null, limit = 10): Promise<ReplyPage> => {
+		let url = `/posts/${postId}/comments/${commentId}/replies?limit=${limit}`;
+		if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+		const response = await api.get(url);
 		return response.data;
 	},
 
-	// Crear un comentario en un post
-	createComment: async (postId: string, content: string): Promise<Comment> => {
-		const response = await api.post(`/posts/${postId}/comments`, { content });
+	// Crear un comentario en un post (o una respuesta si se indica parentId)
+	createComment: async (postId: string, content: string, parentId?: string): Promise<Comment> => {
+		const response = await api.post(`/posts/${postId}/comments`, { content, parentId });
 		return response.data;
 	},
 
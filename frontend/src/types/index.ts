@@ -12,12 +12,17 @@ export interface Comment {
   author: Author;
   createdAt: string;
   likes: number;
+  // Hilos de respuestas
+  parentId?: string | null;
+  depth?: number;
+  replyCount?: number;
 }
 
 export interface Post {
   _id: string;
   title: string;
-  content: string;
+  content: string; // los listados no lo incluyen (ver excerpt)
+  excerpt?: string;
   author: Author;
   slug: string;
   createdAt: string;
@@ -26,8 +31,13 @@ export interface Post {
   readTime: number;
   views: number;
   likes: number;
-  comments: Comment[];
+  commentCount?: number; // los comentarios se piden aparte y paginados
+  version?: number; // se incrementa en cada edición (los posts antiguos no lo tienen)
   coverImage?: string; // Opcional porque algunos posts podrían no tener imagen
+  // Solo en resultados de búsqueda
+  score?: number;
+  snippet?: string;
+  highlights?: [number, number][]; // posiciones [inicio, fin) dentro de snippet
 }
 
 export interface User {
@@ -45,9 +55,25 @@ export interface PaginatedResponse<T> {
     page: number;
     limit: number;
     totalPages: number;
+    nextCursor?: string | null; // cursor opaco para pedir la página siguiente
   };
 }
 
+export interface BatchResponse<T> {
+  posts: T[]; // en el orden pedido
+  missing: string[]; // ids o slugs que no existen
+}
+
+export interface CommentPage {
+  comments: Comment[];
+  nextCursor: string | null;
+}
+
+export interface ReplyPage {
+  replies: Comment[]; // subárbol completo en orden de lectura (usar depth para sangrar)
+  nextCursor: string | null;
+}
+
 export interface AuthResponse {
   accessToken: string;
   user: User;